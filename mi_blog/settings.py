@@ -68,6 +68,8 @@ MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     # WhiteNoise inmediatamente después de SecurityMiddleware
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    # Métricas por request de las vistas de propiedades (PROPIEDADES_METRICAS)
+    "propiedades.middleware.MetricasMiddleware",
 
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -108,7 +110,8 @@ DATABASES = {
     "default": dj_database_url.config(
         default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}",
         conn_max_age=600,
-        ssl_require=True,   # <— fuerza TLS aunque falte en la URL
+        # TLS forzado sólo con DATABASE_URL (Postgres en Render); SQLite no acepta sslmode
+        ssl_require=bool(os.environ.get("DATABASE_URL")),
     )
 }
 
@@ -161,9 +164,67 @@ if USE_S3_MEDIA:
         "CacheControl": "public, max-age=31536000, s-maxage=31536000, immutable"
     }
 
+    # Memo de URLs pre-firmadas (mi_blog.storages): se reutilizan hasta el 75%
+    # de AWS_QUERYSTRING_EXPIRE. Con alias, se comparten entre workers de gunicorn.
+    AWS_PRESIGNED_URL_CACHE_SIZE = env.int("AWS_PRESIGNED_URL_CACHE_SIZE", default=4096)
+    AWS_PRESIGNED_URL_CACHE_TTL_RATIO = env.float("AWS_PRESIGNED_URL_CACHE_TTL_RATIO", default=0.75)
+    AWS_PRESIGNED_URL_CACHE_ALIAS = env("AWS_PRESIGNED_URL_CACHE_ALIAS", default=None)
+
     # Storage por defecto SOLO para MEDIA → usa tus pre-signed URLs
     STORAGES["default"] = {"BACKEND": "mi_blog.storages.MediaRootS3Boto3Storage"}
 
+# === PROPIEDADES: búsqueda ===
+# Full-text (tsquery + ts_rank sobre el índice GIN) en Postgres; en SQLite se ignora.
+PROPIEDADES_FULLTEXT = env.bool("PROPIEDADES_FULLTEXT", default=True)
+# Similitud trigram mínima para coincidencias aproximadas (parámetro de la consulta).
+# El índice filtra antes con pg_trgm.similarity_threshold del servidor (0.3 por
+# defecto): para un umbral menor, ALTER DATABASE ... SET pg_trgm.similarity_threshold.
+PROPIEDADES_FUZZY_UMBRAL = env.float("PROPIEDADES_FUZZY_UMBRAL", default=0.3)
+# Paginación de listados: "keyset" (cursor opaco, sin COUNT/OFFSET) u "offset" (?page=N)
+PROPIEDADES_PAGINACION = env.str("PROPIEDADES_PAGINACION", default="keyset")
+# Con keyset: mostrar un total aproximado (estimación del planner, no COUNT)
+PROPIEDADES_CONTEO_ESTIMADO = env.bool("PROPIEDADES_CONTEO_ESTIMADO", default=False)
+
+# === PROPIEDADES: codigo_unico ===
+# Clave de la permutación secuencia → código (propiedades.codigos). Fija por
+# entorno: cambiarla con datos cargados cambia el mapeo y provoca choques.
+PROPIEDADES_CODIGO_CLAVE = env.str("PROPIEDADES_CODIGO_CLAVE", default="propiedades")
+# Números de secuencia reservados por round trip en cada proceso
+PROPIEDADES_CODIGO_BLOQUE = env.int("PROPIEDADES_CODIGO_BLOQUE", default=50)
+
+# === CACHES ===
+# "propiedades": fragmentos de cards y otros caches de la app.
+# Dev: locmem. Prod: p.ej. PROPIEDADES_CACHE_URL=filecache:///var/tmp/propiedades
+# o dbcache://propiedades_cache (después de `manage.py createcachetable`).
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "propiedades": env.cache_url("PROPIEDADES_CACHE_URL", default="locmemcache://propiedades"),
+}
+PROPIEDADES_CACHE_ALIAS = "propiedades"
+PROPIEDADES_CARD_CACHE_TIMEOUT = env.int("PROPIEDADES_CARD_CACHE_TIMEOUT", default=86400)
+# Búsquedas: lista ordenada de ids por filtro normalizado (0 = sin cache).
+# Se invalida al guardar/borrar cualquier Propiedad (contador de versión).
+PROPIEDADES_BUSQUEDA_CACHE_TIMEOUT = env.int("PROPIEDADES_BUSQUEDA_CACHE_TIMEOUT", default=300)
+PROPIEDADES_BUSQUEDA_CACHE_MAX_IDS = env.int("PROPIEDADES_BUSQUEDA_CACHE_MAX_IDS", default=5000)
+# Home: bloque de destacadas pre-renderizado; pasado N segundos (o ante cualquier
+# cambio de Propiedad) se sirve igual y se re-arma en segundo plano.
+# Refresco periódico: `manage.py refrescar_destacadas` (cron).
+PROPIEDADES_DESTACADAS_FRESCO = env.int("PROPIEDADES_DESTACADAS_FRESCO", default=300)
+# Sitemap pre-generado (`manage.py generar_sitemap`): dominio de las URLs de detalle
+PROPIEDADES_SITEMAP_BASE_URL = env.str("PROPIEDADES_SITEMAP_BASE_URL", default="")
+# Cache-Control: public, max-age=N en lista y detalle (revalidan con ETag/Last-Modified)
+PROPIEDADES_HTTP_MAX_AGE = env.int("PROPIEDADES_HTTP_MAX_AGE", default=60)
+
+# Detalle, contacto y API de detalle con vistas async (ORM async, S3 en threads).
+# Sólo tiene sentido servido por ASGI (uvicorn worker); ver README.
+PROPIEDADES_VISTAS_ASYNC = env.bool("PROPIEDADES_VISTAS_ASYNC", default=False)
+
+# Instrumentación: queries/tiempo SQL/templates por request → log JSON + Server-Timing
+PROPIEDADES_METRICAS = env.bool("PROPIEDADES_METRICAS", default=False)
+
+# Variantes WebP/JPEG (160/480/960 px) al subir imágenes; si no, `manage.py generar_variantes`
+PROPIEDADES_IMAGE_VARIANTS_ON_SAVE = env.bool("PROPIEDADES_IMAGE_VARIANTS_ON_SAVE", default=True)
+
 # === DEFAULT PK FIELD ===
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -183,12 +244,16 @@ EMAILJS_TEMPLATE_ID = env("EMAILJS_TEMPLATE_ID", default="")
 
 
 
+# Una línea JSON por request (propiedades.middleware.MetricasMiddleware)
+_METRICAS_LOGGER = {"handlers": ["console"], "level": "INFO", "propagate": False}
+
 if not DEBUG:
     LOGGING = {
         "version": 1,
         "disable_existing_loggers": False,
         "handlers": {"console": {"class": "logging.StreamHandler"}},
         "loggers": {
+            "propiedades.metricas": _METRICAS_LOGGER,
             "django.request": {  # excepciones de vistas
                 "handlers": ["console"],
                 "level": "ERROR",
@@ -201,3 +266,11 @@ if not DEBUG:
             },
         },
     }
+elif PROPIEDADES_METRICAS:
+    # En DEBUG se deja el logging por defecto de Django y sólo se suma éste
+    LOGGING = {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "handlers": {"console": {"class": "logging.StreamHandler"}},
+        "loggers": {"propiedades.metricas": _METRICAS_LOGGER},
+    }
@@ -1,8 +1,108 @@
 # mi_blog/storages.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
 from storages.backends.s3boto3 import S3Boto3Storage
 
+
+class _PresignedUrlLRU:
+    """
+    LRU acotado con TTL para URLs pre-firmadas (thread-safe: gunicorn gthread).
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            url, vence = hit
+            if vence <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return url
+
+    def set(self, key, url, ttl):
+        with self._lock:
+            self._data[key] = (url, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Uno por proceso (compartido por todas las instancias del storage)
+_URL_LRU = _PresignedUrlLRU(getattr(settings, "AWS_PRESIGNED_URL_CACHE_SIZE", 4096))
+
+
 class MediaRootS3Boto3Storage(S3Boto3Storage):
     # Guardamos todo bajo "media/" en el bucket
     location = 'media'
     default_acl = None         # objetos privados por defecto (mejor práctica)
     file_overwrite = False     # no pisar si suben mismo nombre
+
+    def url_ttl(self, expire=None):
+        """
+        Cuánto se reutiliza una URL firmada: una fracción de AWS_QUERYSTRING_EXPIRE
+        (default 75%), así la URL que se sirve siempre tiene vida por delante.
+        """
+        expire = self.querystring_expire if expire is None else expire
+        ratio = getattr(settings, "AWS_PRESIGNED_URL_CACHE_TTL_RATIO", 0.75)
+        return max(0, int(expire * ratio))
+
+    def url_min_validity(self):
+        """
+        Vida mínima que le queda a cualquier URL devuelta por url().
+        Sirve para acotar caches de HTML que embeben estas URLs (cards).
+        """
+        if not self.querystring_auth:
+            return None
+        return self.querystring_expire - self.url_ttl()
+
+    def url(self, name, parameters=None, expire=None, http_method=None):
+        """
+        Igual que S3Boto3Storage.url, pero memoiza las URLs pre-firmadas:
+        primero en un LRU del proceso y, si AWS_PRESIGNED_URL_CACHE_ALIAS está
+        definido, en ese cache de Django (compartido entre workers).
+        """
+        ttl = self.url_ttl(expire)
+        if not self.querystring_auth or ttl <= 0:
+            return super().url(name, parameters, expire, http_method)
+
+        key = "|".join([
+            self.bucket_name or "", self.location, name,
+            repr(sorted((parameters or {}).items())), str(expire), str(http_method),
+        ])
+        url = _URL_LRU.get(key)
+        if url is not None:
+            return url
+
+        alias = getattr(settings, "AWS_PRESIGNED_URL_CACHE_ALIAS", None)
+        shared_key = "s3url:" + hashlib.sha1(key.encode()).hexdigest()
+        if alias:
+            url = caches[alias].get(shared_key)
+            if url is not None:
+                # vida local conservadora: no sabemos hace cuánto la firmó otro worker
+                _URL_LRU.set(key, url, ttl // 2)
+                return url
+
+        url = super().url(name, parameters, expire, http_method)
+        _URL_LRU.set(key, url, ttl)
+        if alias:
+            caches[alias].set(shared_key, url, ttl // 2)
+        return url
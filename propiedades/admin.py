@@ -1,4 +1,5 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from .lotes import ACCIONES, aplicar_accion
 from .models import Propiedad, PropiedadImagen
 
 class PropiedadImagenInline(admin.TabularInline):
@@ -7,7 +8,7 @@ class PropiedadImagenInline(admin.TabularInline):
     max_num = 10
     verbose_name = "Imagen adicional"
     verbose_name_plural = "Imágenes adicionales"
-    fields = ('imagen', 'descripcion_corta')
+    fields = ('imagen', 'descripcion_corta', 'orden')
     readonly_fields = ()
     help_text = "Subí hasta 10 imágenes adicionales para la propiedad."
 
@@ -18,6 +19,8 @@ class PropiedadAdmin(admin.ModelAdmin):
     search_fields = ('titulo', 'descripcion', 'direccion', 'localidad', 'provincia')
     ordering = ('-fecha_actualizacion',)
     inlines = [PropiedadImagenInline]
+    # Un UPDATE por lote, sin save() por fila (ver lotes.py)
+    actions = list(ACCIONES)
 
     fieldsets = (
         ("Información General", {
@@ -40,6 +43,26 @@ class PropiedadAdmin(admin.ModelAdmin):
 
     readonly_fields = ('fecha_creacion', 'fecha_actualizacion')
 
+    def _aplicar(self, request, queryset, accion):
+        n = aplicar_accion(queryset, accion)
+        self.message_user(request, f"{ACCIONES[accion][0]}: {n} propiedad(es) actualizada(s).", messages.SUCCESS)
+
+    @admin.action(description=ACCIONES['publicar'][0])
+    def publicar(self, request, queryset):
+        self._aplicar(request, queryset, 'publicar')
+
+    @admin.action(description=ACCIONES['archivar'][0])
+    def archivar(self, request, queryset):
+        self._aplicar(request, queryset, 'archivar')
+
+    @admin.action(description=ACCIONES['destacar'][0])
+    def destacar(self, request, queryset):
+        self._aplicar(request, queryset, 'destacar')
+
+    @admin.action(description=ACCIONES['quitar_destacada'][0])
+    def quitar_destacada(self, request, queryset):
+        self._aplicar(request, queryset, 'quitar_destacada')
+
     def get_form(self, request, obj=None, **kwargs):
         form = super().get_form(request, obj, **kwargs)
         # Agregar placeholders personalizados para que sea más claro para el usuario
@@ -0,0 +1,223 @@
+# propiedades/api.py
+"""
+API JSON de sólo lectura (widget móvil, portales de terceros).
+
+- Mismos filtros que busqueda_propiedades (busqueda.BusquedaSpec).
+- Filas serializadas directo desde values(): sin instanciar modelos ni
+  renderizar templates.
+- Paginación keyset (?cursor=) por fecha_actualizacion, id; con texto libre
+  el orden es por relevancia y se pagina con ?page= (sobre los ids cacheados).
+- ?fields=a,b elige columnas de una lista blanca; ?limit= (máx. API_LIMITE_MAX).
+- gzip si el cliente lo acepta.
+- detalle_async: versión ASGI del detalle (PROPIEDADES_VISTAS_ASYNC).
+"""
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.core.files.storage import default_storage
+from django.core.paginator import Paginator
+from django.http import JsonResponse
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+
+from .busqueda import BusquedaSpec, facetas_busqueda, resultado_cacheado
+from .models import CARD_FIELDS, Propiedad, PropiedadImagen
+from .pagination import KEYSET_ORDER, keyset_page
+
+API_LIMITE = 20
+API_LIMITE_MAX = 100
+
+# Listas blancas de ?fields= (nunca search_vector ni campos internos)
+LISTA_FIELDS = CARD_FIELDS + (
+    'codigo_unico', 'direccion', 'cocheras', 'metros_cuadrados_total',
+    'antiguedad', 'acepta_mascotas', 'is_destacada',
+)
+DETALLE_FIELDS = LISTA_FIELDS + (
+    'descripcion', 'amenidades', 'pais', 'tipo_mascota_permitida', 'galeria',
+)
+
+_JSON = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+def _respuesta(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=_JSON)
+
+
+def _error(status, mensaje):
+    return _respuesta({'error': mensaje}, status=status)
+
+
+def _campos(request, permitidos, default):
+    """
+    Campos pedidos en ?fields= (en ese orden, siempre con 'id').
+    ValueError si alguno no está en la lista blanca.
+    """
+    pedido = request.GET.get('fields')
+    if not pedido:
+        return list(default)
+    campos = list(dict.fromkeys(c.strip() for c in pedido.split(',') if c.strip()))
+    invalidos = [c for c in campos if c not in permitidos]
+    if invalidos:
+        raise ValueError(f"Campos no permitidos: {', '.join(invalidos)}")
+    if 'id' not in campos:
+        campos.insert(0, 'id')
+    return campos
+
+
+def _columnas(campos):
+    """Columnas para values(): las pedidas + las de la clave keyset."""
+    cols = [c for c in campos if c != 'galeria']
+    for c in ('id', 'fecha_actualizacion'):
+        if c not in cols:
+            cols.append(c)
+    return cols
+
+
+def _limite(request):
+    try:
+        n = int(request.GET.get('limit') or API_LIMITE)
+    except ValueError:
+        n = API_LIMITE
+    return max(1, min(n, API_LIMITE_MAX))
+
+
+def _fila(row, campos):
+    """Dict de values() -> objeto JSON con sólo los campos pedidos."""
+    out = {}
+    for c in campos:
+        if c == 'galeria':
+            continue
+        v = row[c]
+        if c == 'imagen_principal':
+            v = default_storage.url(v) if v else None
+        out[c] = v
+    return out
+
+
+def _url(request, **params):
+    qd = request.GET.copy()
+    for k in ('cursor', 'page'):
+        qd.pop(k, None)
+    qd.update(params)
+    return f"{request.path}?{urlencode(qd, doseq=True)}"
+
+
+def _pagina_keyset(request, qs, campos):
+    page = keyset_page(qs.values(*_columnas(campos)), request.GET.get('cursor'), _limite(request))
+    return {
+        'results': [_fila(r, campos) for r in page],
+        'next': _url(request, cursor=page.next_cursor) if page.has_next() else None,
+        'previous': _url(request, cursor=page.previous_cursor) if page.has_previous() else None,
+    }
+
+
+def _pagina_relevancia(request, spec, qs, campos):
+    """Texto libre: orden por relevancia, paginado por número de página."""
+    cols = _columnas(campos)
+    limite = _limite(request)
+    resultado = resultado_cacheado(spec, qs)
+    if resultado is not None:
+        page = Paginator(resultado[0], limite).get_page(request.GET.get('page'))
+        filas = {r['id']: r for r in Propiedad.objects.filter(pk__in=list(page.object_list)).values(*cols)}
+        rows = [filas[pk] for pk in page.object_list if pk in filas]
+    else:
+        page = Paginator(qs.values(*cols), limite).get_page(request.GET.get('page'))
+        rows = list(page.object_list)
+    return {
+        'results': [_fila(r, campos) for r in rows],
+        'next': _url(request, page=page.next_page_number()) if page.has_next() else None,
+        'previous': _url(request, page=page.previous_page_number()) if page.has_previous() else None,
+    }
+
+
+def _publicadas():
+    return Propiedad.objects.filter(estado_publicacion='publicada').order_by(*KEYSET_ORDER)
+
+
+@require_GET
+@gzip_page
+def lista(request):
+    """Publicadas, más recientes primero."""
+    try:
+        campos = _campos(request, LISTA_FIELDS, CARD_FIELDS)
+    except ValueError as e:
+        return _error(400, str(e))
+    return _respuesta(_pagina_keyset(request, _publicadas(), campos))
+
+
+@require_GET
+@gzip_page
+def busqueda(request):
+    """
+    Mismos parámetros que /propiedades/busqueda/. Con ?facetas=1 agrega los
+    conteos del filtro actual (los mismos, y el mismo cache, que la vista HTML).
+    """
+    try:
+        campos = _campos(request, LISTA_FIELDS, CARD_FIELDS)
+    except ValueError as e:
+        return _error(400, str(e))
+
+    spec = BusquedaSpec.desde_query(request.GET)
+    qs = spec.compilar(_publicadas())
+    if spec.palabras:
+        data = _pagina_relevancia(request, spec, qs, campos)
+    else:
+        data = _pagina_keyset(request, qs, campos)
+
+    if request.GET.get('facetas') == '1':
+        data['facetas'] = facetas_busqueda(spec, _publicadas())
+    return _respuesta(data)
+
+
+@require_GET
+@gzip_page
+def detalle(request, pk):
+    """Una publicada, con la galería ordenada (URLs) si se pide o por defecto."""
+    try:
+        campos = _campos(request, DETALLE_FIELDS, DETALLE_FIELDS)
+    except ValueError as e:
+        return _error(400, str(e))
+
+    row = (
+        Propiedad.objects.filter(pk=pk, estado_publicacion='publicada')
+        .values(*_columnas(campos)).first()
+    )
+    if row is None:
+        return _error(404, "No existe la propiedad.")
+
+    nombres = None
+    if 'galeria' in campos:
+        nombres = PropiedadImagen.objects.filter(propiedad_id=pk).values_list('imagen', flat=True)
+    return _respuesta(_detalle_data(row, campos, nombres))
+
+
+def _detalle_data(row, campos, nombres):
+    """Objeto JSON del detalle; firma las URLs (I/O si el storage es S3)."""
+    data = _fila(row, campos)
+    if nombres is not None:
+        data['galeria'] = [default_storage.url(n) for n in nombres]
+    return data
+
+
+@require_GET
+@gzip_page
+async def detalle_async(request, pk):
+    """detalle para ASGI: consultas por el ORM async, URLs firmadas en un thread."""
+    try:
+        campos = _campos(request, DETALLE_FIELDS, DETALLE_FIELDS)
+    except ValueError as e:
+        return _error(400, str(e))
+
+    row = await (
+        Propiedad.objects.filter(pk=pk, estado_publicacion='publicada')
+        .values(*_columnas(campos)).afirst()
+    )
+    if row is None:
+        return _error(404, "No existe la propiedad.")
+
+    nombres = None
+    if 'galeria' in campos:
+        qs = PropiedadImagen.objects.filter(propiedad_id=pk).values_list('imagen', flat=True)
+        nombres = [n async for n in qs]
+    data = await sync_to_async(_detalle_data, thread_sensitive=False)(row, campos, nombres)
+    return _respuesta(data)
@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+def _sqlite_unaccent(sender, connection, **kwargs):
+    """
+    En SQLite (desarrollo) no existe unaccent(): lo registramos en Python para
+    que el camino icontains de la búsqueda funcione igual que en Postgres.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    from .search_config import strip_accents
+    connection.connection.create_function('unaccent', 1, strip_accents, deterministic=True)
 
 
 class PropiedadesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'propiedades'
+
+    def ready(self):
+        connection_created.connect(_sqlite_unaccent, dispatch_uid='propiedades_sqlite_unaccent')
+        from . import signals  # noqa: F401  (invalidación de caches)
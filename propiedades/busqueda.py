@@ -0,0 +1,400 @@
+# propiedades/busqueda.py
+"""
+Búsqueda de propiedades en dos pasos, compartidos por la vista HTML y la API:
+
+1. BusquedaSpec.desde_query(GET): parsea el QueryDict una sola vez a una spec
+   canónica e inmutable. Dos URLs equivalentes ('dormitorios=02&tipo=casa' y
+   'tipo=casa&dormitorios=2') dan la misma spec: es hashable y es la clave
+   del cache de resultados y facetas.
+2. spec.compilar(qs): la traduce a un único queryset. Cada columna
+   normalizada (unaccent + lower) se define una sola vez y la reusan el texto
+   libre y los filtros de localidad/provincia; en Postgres es la misma
+   expresión de los índices trigram (0006) y la de filtrar_fulltext.
+"""
+import math
+from dataclasses import dataclass, field
+
+from django.db import connection
+from django.db.models import Count, F, Func, Q
+from django.db.models.functions import Lower
+
+from .cache import busqueda_key, busqueda_max_ids, busqueda_timeout, busqueda_version, propiedades_cache
+from .fulltext import FUnaccent, filtrar_fulltext, fulltext_activo
+from .models import Propiedad
+from .search_config import SYNONYMS, norm as _norm
+
+# Columnas donde busca el texto libre (camino icontains)
+CAMPOS_TEXTO = ('titulo', 'descripcion', 'localidad', 'provincia', 'amenidades', 'codigo_unico')
+
+
+# Función DB para usar unaccent() en consultas (en SQLite la registra apps.py)
+class Unaccent(Func):
+    function = 'unaccent'
+    template = '%(function)s(%(expressions)s)'
+
+
+def _fmt_int(n):
+    """
+    Formatea enteros con separador de miles estilo '10.000'.
+    Si no puede castear, devuelve str(n).
+    """
+    try:
+        return f"{int(float(n)):,}".replace(",", ".")
+    except Exception:
+        return str(n)
+
+
+def _expand_tokens(palabras):
+    """
+    Palabras ya normalizadas + sus sinónimos (pre-normalizados), sin repetidos.
+    """
+    return sorted(set(palabras) | {SYNONYMS[t] for t in palabras if t in SYNONYMS})
+
+
+def _num(x):
+    """
+    Convierte strings de precios/filtros a número:
+    soporta '$', 'ars', 'usd', puntos, comas y sufijos 'k'/'m'.
+    """
+    if not x:
+        return None
+    x = str(x).strip().lower().replace('.', '').replace(',', '')
+    x = x.replace('$', '').replace('ars', '').replace('usd', '')
+    mult = 1
+    if x.endswith('k'):
+        x, mult = x[:-1], 1000
+    elif x.endswith('m'):
+        x, mult = x[:-1], 1_000_000
+    try:
+        valor = float(x) * mult
+    except ValueError:
+        return None
+    # 'inf', '1e400', 'nan': float() los acepta, int() no (OverflowError/ValueError)
+    if not math.isfinite(valor):
+        return None
+    return int(valor)
+
+
+def _to_int(v):
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+
+class _Consulta:
+    """
+    Queryset en construcción que recuerda qué columnas normalizadas ya
+    definió (alias), para no repetirlas entre filtros.
+    """
+
+    def __init__(self, qs):
+        self.qs = qs
+        self._columnas = {}
+
+    def columna(self, campo):
+        """Nombre del alias con el campo normalizado (lo crea la primera vez)."""
+        if campo in self._columnas:
+            return self._columnas[campo]
+        if connection.vendor == 'postgresql':
+            # Misma expresión que el índice trigram: si filtrar_fulltext ya la definió, se reusa
+            alias, expr = f"trgm_{campo}", FUnaccent(Lower(F(campo)))
+        else:
+            alias, expr = f"n_{campo}", Lower(Unaccent(F(campo)))
+        if alias not in self.qs.query.annotations:
+            self.qs = self.qs.alias(**{alias: expr})
+        self._columnas[campo] = alias
+        return alias
+
+    def contiene(self, campo, valor_norm):
+        return Q(**{f"{self.columna(campo)}__contains": valor_norm})
+
+
+@dataclass(frozen=True)
+class BusquedaSpec:
+    """
+    Filtros de búsqueda ya parseados y normalizados. Los campos con
+    compare=False sólo sirven para mostrar (chips) y no cambian la clave.
+    """
+    palabras: tuple = ()                 # q normalizado, palabra por palabra
+    tipo: str = ''
+    tipo_operacion: str = ''
+    localidad: str = ''                  # normalizada (sin tildes, minúsculas)
+    provincia: str = ''
+    dormitorios: int = None              # mínimos (>=)
+    banios: int = None
+    cocheras: int = None
+    precio: tuple = None                 # (moneda, min, max) de price_min/price_max
+    precios: tuple = None                # (usd_min, usd_max, ars_min, ars_max)
+    currency: str = field(default='ars', compare=False, repr=False)
+    q: str = field(default='', compare=False, repr=False)
+    localidad_txt: str = field(default='', compare=False, repr=False)
+    provincia_txt: str = field(default='', compare=False, repr=False)
+
+    # ---------- Parseo ----------
+    @classmethod
+    def desde_query(cls, GET):
+        q = (GET.get('q') or '').strip()
+        currency = 'usd' if GET.get('currency') == 'usd' else 'ars'
+
+        price_min, price_max = _num(GET.get('price_min')), _num(GET.get('price_max'))
+        sueltos = tuple(_num(GET.get(k)) for k in ('usd_min', 'usd_max', 'ars_min', 'ars_max'))
+        precio = precios = None
+        if price_min is not None or price_max is not None:
+            precio = (currency, price_min, price_max)
+        elif any(v is not None for v in sueltos):
+            precios = sueltos
+
+        return cls(
+            palabras=tuple(_norm(q).split()),
+            tipo=GET.get('tipo') or '',
+            tipo_operacion=GET.get('tipo_operacion') or '',
+            localidad=_norm(GET.get('localidad') or ''),
+            provincia=_norm(GET.get('provincia') or ''),
+            dormitorios=_to_int(GET.get('dormitorios')),
+            banios=_to_int(GET.get('banios')),
+            cocheras=_to_int(GET.get('cocheras')),
+            precio=precio,
+            precios=precios,
+            currency=currency,
+            q=q,
+            localidad_txt=GET.get('localidad') or '',
+            provincia_txt=GET.get('provincia') or '',
+        )
+
+    def tiene_filtros(self) -> bool:
+        return self != BusquedaSpec()
+
+    def usa_fulltext(self) -> bool:
+        return bool(self.palabras) and fulltext_activo()
+
+    def clave(self) -> tuple:
+        """Clave de cache: full-text e icontains pueden dar resultados distintos."""
+        return ('fts' if self.usa_fulltext() else 'icontains', self)
+
+    # ---------- Compilación ----------
+    def _condiciones(self, c):
+        """{dimensión: Q} de los filtros estructurados (todo menos el texto libre)."""
+        cond = {}
+        for campo in ('tipo', 'tipo_operacion'):
+            if getattr(self, campo):
+                cond[campo] = Q(**{campo: getattr(self, campo)})
+        for campo in ('localidad', 'provincia'):
+            if getattr(self, campo):
+                cond[campo] = c.contiene(campo, getattr(self, campo))
+        for campo in ('dormitorios', 'banios', 'cocheras'):
+            if getattr(self, campo) is not None:
+                cond[campo] = Q(**{f"{campo}__gte": getattr(self, campo)})
+
+        precio = {}
+        if self.precio:
+            moneda, lo, hi = self.precio
+            col = 'precio_usd' if moneda == 'usd' else 'precio_pesos'
+            if lo is not None:
+                precio[f"{col}__gte"] = lo
+            if hi is not None:
+                precio[f"{col}__lte"] = hi
+        elif self.precios:
+            for (col, lookup), v in zip(
+                (('precio_usd', 'gte'), ('precio_usd', 'lte'), ('precio_pesos', 'gte'), ('precio_pesos', 'lte')),
+                self.precios,
+            ):
+                if v is not None:
+                    precio[f"{col}__{lookup}"] = v
+        # Si NO hay filtros de precio, no restringimos por moneda ni por campos no nulos.
+        if precio:
+            cond['precio'] = Q(**precio)
+        return cond
+
+    def compilar(self, qs, excluir=()):
+        """
+        Un solo queryset con todos los filtros (sin evaluarlo). `excluir`:
+        dimensiones que no se aplican (las facetas las cuentan aparte).
+        """
+        c = _Consulta(qs)
+        cond = Q()
+
+        if self.usa_fulltext():
+            # Postgres: tsquery contra el índice GIN + fuzzy trigram, en una sola consulta
+            c.qs = filtrar_fulltext(c.qs, self.q)
+        elif self.palabras:
+            # AND de ORs: todos los tokens deben aparecer en algún campo
+            for t in _expand_tokens(self.palabras):
+                alguno = Q()
+                for campo in CAMPOS_TEXTO:
+                    alguno |= c.contiene(campo, t)
+                cond &= alguno
+
+        for dimension, q in self._condiciones(c).items():
+            if dimension not in excluir:
+                cond &= q
+        if cond:
+            c.qs = c.qs.filter(cond)
+        return c.qs
+
+    # ---------- Presentación ----------
+    def chips(self):
+        """[(param, etiqueta)] de los filtros aplicados; 'price_range' agrupa price_min/price_max."""
+        out = []
+        if self.palabras:
+            out.append(('q', f'“{self.q}”'))
+        if self.tipo:
+            out.append(('tipo', f"Tipo: {dict(Propiedad.TIPO_PROPIEDAD_CHOICES).get(self.tipo, self.tipo)}"))
+        if self.tipo_operacion:
+            label = dict(Propiedad.TIPO_OPERACION_CHOICES).get(self.tipo_operacion, self.tipo_operacion)
+            out.append(('tipo_operacion', f"Operación: {label}"))
+        if self.localidad:
+            out.append(('localidad', f"Localidad: {self.localidad_txt}"))
+        if self.provincia:
+            out.append(('provincia', f"Provincia: {self.provincia_txt}"))
+        if self.dormitorios is not None:
+            out.append(('dormitorios', f"Dormitorios: {self.dormitorios}"))
+        if self.banios is not None:
+            out.append(('banios', f"Baños: {self.banios}"))
+        if self.cocheras is not None:
+            out.append(('cocheras', f"Cocheras: {self.cocheras}"))
+        if self.precio:
+            moneda, lo, hi = self.precio
+            out.append(('price_range', f"{'USD' if moneda == 'usd' else '$'} {lo or 0}–{hi or '∞'}"))
+        elif self.precios:
+            etiquetas = ("USD mín", "USD máx", "$ mín", "$ máx")
+            for param, etiqueta, v in zip(('usd_min', 'usd_max', 'ars_min', 'ars_max'), etiquetas, self.precios):
+                if v is not None:
+                    out.append((param, f"{etiqueta}: {_fmt_int(v)}"))
+        return out
+
+
+# =========================
+# Cache de resultados
+# =========================
+def resultado_cacheado(spec, qs):
+    """
+    (ids en orden, ¿aproximadas?) de una búsqueda, desde el cache o calculado
+    una vez y guardado bajo la versión actual (los signals la suben en cada
+    save/delete de Propiedad). None si el cache está apagado o si hay más de
+    PROPIEDADES_BUSQUEDA_CACHE_MAX_IDS resultados: se pagina sobre la DB.
+    """
+    timeout = busqueda_timeout()
+    if not timeout:
+        return None
+    cache = propiedades_cache()
+    key = busqueda_key(spec.clave(), busqueda_version())
+    hit = cache.get(key)
+    if hit is not None:
+        return hit if hit != "grande" else None
+
+    tope = busqueda_max_ids()
+    if spec.usa_fulltext():
+        # filtrar_fulltext deja sólo el mejor nivel: todas exactas o todas aproximadas
+        filas = list(qs.values_list('id', 'exacto')[:tope + 1])
+        ids = [pk for pk, _ in filas]
+        aproximadas = bool(filas) and not filas[0][1]
+    else:
+        ids = list(qs.values_list('id', flat=True)[:tope + 1])
+        aproximadas = False
+
+    if len(ids) > tope:
+        cache.set(key, "grande", timeout)
+        return None
+    resultado = (ids, aproximadas)
+    cache.set(key, resultado, timeout)
+    return resultado
+
+
+# =========================
+# Facetas
+# =========================
+# Buckets fijos: dormitorios con el mismo criterio ">=" del filtro; precios
+# por moneda (min inclusive, max inclusive como price_min/price_max).
+FACETA_DORMITORIOS = (1, 2, 3, 4)
+FACETA_PRECIOS = {
+    'usd': ((None, 50000), (50000, 100000), (100000, 200000), (200000, None)),
+    'ars': ((None, 300000), (300000, 700000), (700000, 1500000), (1500000, None)),
+}
+FACETA_LOCALIDADES = 12
+
+
+# Dimensiones con faceta: cada una se cuenta con todos los filtros menos el suyo
+FACETAS = ('tipo', 'tipo_operacion', 'localidad', 'dormitorios', 'precio')
+
+
+def _contar(cond):
+    return Count('id', filter=cond) if cond else Count('id')
+
+
+def _calcular_facetas(spec, qs):
+    """
+    Facetas disyuntivas en UNA consulta: el queryset lleva los filtros que no
+    son faceta y cada conteo (COUNT(*) FILTER (WHERE ...)) el valor de su
+    faceta más los filtros de las OTRAS facetas. Así, con tipo=casa elegido,
+    los demás tipos muestran cuántas habría si se cambiara a ese tipo.
+    GROUP BY localidad; el resto se suma en Python sobre las filas.
+    """
+    currency = spec.currency
+    campo = 'precio_usd' if currency == 'usd' else 'precio_pesos'
+    tipos = [k for k, _ in Propiedad.TIPO_PROPIEDAD_CHOICES]
+    operaciones = [k for k, _ in Propiedad.TIPO_OPERACION_CHOICES]
+    precios = FACETA_PRECIOS[currency]
+
+    base = spec.compilar(qs, excluir=FACETAS)
+    if spec.usa_fulltext():
+        # Full-text: el filtro por ventana no se puede agrupar; va como subconsulta
+        base = Propiedad.objects.filter(pk__in=base.values('pk'))
+    c = _Consulta(base)
+    conds = {d: q for d, q in spec._condiciones(c).items() if d in FACETAS}
+
+    def salvo(dimension=None):
+        cond = Q()
+        for d, q in conds.items():
+            if d != dimension:
+                cond &= q
+        return cond
+
+    aggs = {'n': _contar(salvo()), 'nl': _contar(salvo('localidad'))}
+    for i, k in enumerate(tipos):
+        aggs[f't{i}'] = _contar(Q(tipo=k) & salvo('tipo'))
+    for i, k in enumerate(operaciones):
+        aggs[f'o{i}'] = _contar(Q(tipo_operacion=k) & salvo('tipo_operacion'))
+    for i, d in enumerate(FACETA_DORMITORIOS):
+        aggs[f'd{i}'] = _contar(Q(dormitorios__gte=d) & salvo('dormitorios'))
+    for i, (lo, hi) in enumerate(precios):
+        cond = Q(**{f'{campo}__isnull': False})
+        if lo is not None:
+            cond &= Q(**{f'{campo}__gte': lo})
+        if hi is not None:
+            cond &= Q(**{f'{campo}__lte': hi})
+        aggs[f'p{i}'] = _contar(cond & salvo('precio'))
+
+    filas = list(c.qs.order_by().values('localidad').annotate(**aggs))
+
+    def _sumar(col):
+        return sum(f[col] for f in filas)
+
+    localidades = sorted(((f['localidad'], f['nl']) for f in filas if f['nl']), key=lambda x: (-x[1], x[0]))
+    return {
+        'total': _sumar('n'),
+        'tipo': {k: _sumar(f't{i}') for i, k in enumerate(tipos)},
+        'tipo_operacion': {k: _sumar(f'o{i}') for i, k in enumerate(operaciones)},
+        'localidad': localidades[:FACETA_LOCALIDADES],
+        'dormitorios': [(d, _sumar(f'd{i}')) for i, d in enumerate(FACETA_DORMITORIOS)],
+        'precio': [(lo, hi, _sumar(f'p{i}')) for i, (lo, hi) in enumerate(precios)],
+        'currency': currency,
+    }
+
+
+def facetas_busqueda(spec, qs):
+    """
+    Facetas de la búsqueda `spec` sobre `qs` (el queryset base, SIN filtrar),
+    cacheadas junto a los resultados: misma clave normalizada y misma versión
+    (un save/delete las invalida a la vez).
+    """
+    timeout = busqueda_timeout()
+    if not timeout:
+        return _calcular_facetas(spec, qs)
+    cache = propiedades_cache()
+    key = busqueda_key(('facetas', 'disyuntivas', spec.currency, spec.clave()), busqueda_version())
+    facetas = cache.get(key)
+    if facetas is None:
+        facetas = _calcular_facetas(spec, qs)
+        cache.set(key, facetas, timeout)
+    return facetas
@@ -0,0 +1,181 @@
+# propiedades/cache.py
+import hashlib
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.core.files.storage import default_storage
+from django.template.loader import render_to_string
+
+logger = logging.getLogger("propiedades.cache")
+
+# Subir este número si cambia _card.html (invalida todas las cards cacheadas)
+CARD_TEMPLATE_VERSION = 2  # 2: <picture> con srcset de variantes
+
+
+def propiedades_cache():
+    """
+    Cache propio de la app (alias PROPIEDADES_CACHE_ALIAS): locmem en dev,
+    file/DB cache en prod vía PROPIEDADES_CACHE_URL.
+    """
+    return caches[getattr(settings, "PROPIEDADES_CACHE_ALIAS", "propiedades")]
+
+
+def card_key(pk) -> str:
+    return f"card:v{CARD_TEMPLATE_VERSION}:{pk}"
+
+
+def _stamp(prop):
+    return prop.fecha_actualizacion.timestamp() if prop.fecha_actualizacion else None
+
+
+def card_timeout() -> int:
+    """
+    La card embebe imagen_principal.url: con URLs pre-firmadas (S3) no puede
+    vivir en cache más que la validez mínima garantizada de esas URLs.
+    """
+    timeout = getattr(settings, "PROPIEDADES_CARD_CACHE_TIMEOUT", 86400)
+    validez = getattr(default_storage, "url_min_validity", None)
+    vida = validez() if validez else None
+    return min(timeout, vida) if vida else timeout
+
+
+def render_card(prop) -> str:
+    """
+    HTML de _card.html para una propiedad, cacheado por pk.
+    El valor guarda el fecha_actualizacion con el que se renderizó: si la fila
+    cambió (aunque no haya pasado por save(), p.ej. un update()), se re-renderiza.
+    """
+    cache = propiedades_cache()
+    key = card_key(prop.pk)
+    stamp = _stamp(prop)
+
+    hit = cache.get(key)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+
+    html = render_to_string('propiedades/_card.html', {'prop': prop})
+    cache.set(key, (stamp, html), card_timeout())
+    return html
+
+
+def invalidate_card(pk):
+    propiedades_cache().delete(card_key(pk))
+
+
+# ---------- Resultados de búsqueda ----------
+BUSQUEDA_VERSION_KEY = "busqueda:version"
+
+
+def busqueda_version() -> int:
+    """
+    Versión global de los resultados cacheados. Arranca en un timestamp (ms):
+    si el cache la expulsa, la nueva nunca coincide con una anterior.
+    """
+    cache = propiedades_cache()
+    version = cache.get(BUSQUEDA_VERSION_KEY)
+    if version is None:
+        cache.add(BUSQUEDA_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(BUSQUEDA_VERSION_KEY)
+    return version
+
+
+def bump_busqueda_version():
+    """Invalida TODAS las búsquedas cacheadas (las claves viejas dejan de leerse)."""
+    cache = propiedades_cache()
+    try:
+        cache.incr(BUSQUEDA_VERSION_KEY)
+    except ValueError:
+        cache.set(BUSQUEDA_VERSION_KEY, int(time.time() * 1000), None)
+
+
+def busqueda_key(clave, version) -> str:
+    digest = hashlib.sha1(repr(clave).encode()).hexdigest()
+    return f"busqueda:v{version}:{digest}"
+
+
+def busqueda_timeout() -> int:
+    """0 desactiva el cache de búsquedas."""
+    return getattr(settings, "PROPIEDADES_BUSQUEDA_CACHE_TIMEOUT", 300)
+
+
+def busqueda_max_ids() -> int:
+    """Búsquedas con más resultados que esto no se cachean."""
+    return getattr(settings, "PROPIEDADES_BUSQUEDA_CACHE_MAX_IDS", 5000)
+
+
+# ---------- Bloque de destacadas (home) ----------
+# Subir si cambia _destacadas.html
+DESTACADAS_KEY = "home:destacadas:v1"
+DESTACADAS_LOCK = "home:destacadas:lock"
+DESTACADAS_LIMITE = 6
+
+
+def destacadas_fresco() -> int:
+    """Segundos en que el bloque se sirve sin revalidar (si no hubo cambios)."""
+    return getattr(settings, "PROPIEDADES_DESTACADAS_FRESCO", 300)
+
+
+def render_destacadas() -> str:
+    from .models import Propiedad
+
+    destacadas = (
+        Propiedad.objects.cards()
+        .filter(is_destacada=True, estado_publicacion='publicada')
+        .order_by('-fecha_actualizacion')[:DESTACADAS_LIMITE]
+    )
+    return render_to_string('propiedades/_destacadas.html', {'propiedades_destacadas': destacadas})
+
+
+def refrescar_destacadas() -> str:
+    """
+    Renderiza y guarda el bloque. Guarda la versión de búsquedas leída ANTES
+    de consultar: si un save la sube mientras tanto, el bloque nace vencido.
+    El timeout duro es el de las cards (URLs pre-firmadas embebidas).
+    """
+    version = busqueda_version()
+    html = render_destacadas()
+    propiedades_cache().set(DESTACADAS_KEY, (version, time.time(), html), card_timeout())
+    return html
+
+
+def refrescar_destacadas_en_segundo_plano():
+    """
+    Re-arma el bloque en un thread (nadie espera). Un solo refresco a la vez:
+    lock en el cache, compartido entre workers.
+    """
+    cache = propiedades_cache()
+    if not cache.add(DESTACADAS_LOCK, 1, 60):
+        return
+
+    def _run():
+        try:
+            refrescar_destacadas()
+        except Exception:
+            logger.exception("No se pudo refrescar el bloque de destacadas")
+        finally:
+            cache.delete(DESTACADAS_LOCK)
+            connections.close_all()
+
+    threading.Thread(target=_run, name="propiedades-destacadas", daemon=True).start()
+
+
+def destacadas_html() -> str:
+    """
+    HTML del bloque de destacadas de la home: una lectura del cache (bloque +
+    versión en un get_many). Vencido (por tiempo o porque cambió alguna
+    Propiedad) se sirve igual y se refresca en segundo plano
+    (stale-while-revalidate); sólo con el cache vacío un request lo arma.
+    """
+    cache = propiedades_cache()
+    hit = cache.get_many([DESTACADAS_KEY, BUSQUEDA_VERSION_KEY])
+    bloque = hit.get(DESTACADAS_KEY)
+    if bloque is None:
+        return refrescar_destacadas()
+    version, generado, html = bloque
+    if version != hit.get(BUSQUEDA_VERSION_KEY) or time.time() - generado > destacadas_fresco():
+        refrescar_destacadas_en_segundo_plano()
+    return html
@@ -0,0 +1,168 @@
+# propiedades/codigos.py
+"""
+Asignación de codigo_unico (AAA999) sin sondear la tabla.
+
+Un número de secuencia (sequence de Postgres, reservada por bloques) pasa por
+una permutación reversible del espacio de códigos (Feistel + cycle-walking):
+dos números distintos dan siempre dos códigos distintos, y los códigos
+salen "desordenados" como antes. El formato no cambia, así que convive con
+los códigos aleatorios ya existentes; si uno de ellos coincide, save()
+reintenta con el siguiente.
+"""
+import hashlib
+import threading
+from collections import deque
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+
+LETRAS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+ESPACIO = len(LETRAS) ** 3 * 1000   # 17.576.000 códigos
+SECUENCIA = "propiedades_codigo_seq"
+
+
+class Permutacion:
+    """
+    Biyección de [0, n) en [0, n): Feistel balanceada sobre 2*h bits y
+    cycle-walking para caer dentro de n.
+    """
+
+    def __init__(self, n: int, clave: str, rondas: int = 4):
+        self.n = n
+        self.h = max(1, ((n - 1).bit_length() + 1) // 2)
+        self.mask = (1 << self.h) - 1
+        self.rondas = rondas
+        self.clave = clave.encode()[:64]
+
+    def _f(self, r: int, ronda: int) -> int:
+        d = hashlib.blake2b(f"{ronda}:{r}".encode(), key=self.clave, digest_size=8).digest()
+        return int.from_bytes(d, "big") & self.mask
+
+    def _cifrar(self, x: int) -> int:
+        l, r = x >> self.h, x & self.mask
+        for i in range(self.rondas):
+            l, r = r, l ^ self._f(r, i)
+        return (l << self.h) | r
+
+    def _descifrar(self, y: int) -> int:
+        l, r = y >> self.h, y & self.mask
+        for i in reversed(range(self.rondas)):
+            l, r = r ^ self._f(l, i), l
+        return (l << self.h) | r
+
+    def aplicar(self, x: int) -> int:
+        if not 0 <= x < self.n:
+            raise ValueError(f"fuera de rango: {x}")
+        y = self._cifrar(x)
+        while y >= self.n:
+            y = self._cifrar(y)
+        return y
+
+    def invertir(self, y: int) -> int:
+        if not 0 <= y < self.n:
+            raise ValueError(f"fuera de rango: {y}")
+        x = self._descifrar(y)
+        while x >= self.n:
+            x = self._descifrar(x)
+        return x
+
+
+def codigo_desde_indice(i: int) -> str:
+    letras, numero = divmod(i, 1000)
+    a, resto = divmod(letras, 26 * 26)
+    b, c = divmod(resto, 26)
+    return f"{LETRAS[a]}{LETRAS[b]}{LETRAS[c]}{numero:03d}"
+
+
+def indice_desde_codigo(codigo: str) -> int:
+    a, b, c = (LETRAS.index(ch) for ch in codigo[:3])
+    return ((a * 26 + b) * 26 + c) * 1000 + int(codigo[3:])
+
+
+@lru_cache(maxsize=1)
+def _permutacion() -> Permutacion:
+    # Clave propia (no SECRET_KEY): si cambia, cambia el mapeo y aparecen choques
+    return Permutacion(ESPACIO, settings.PROPIEDADES_CODIGO_CLAVE)
+
+
+def codigo_para(seq: int) -> str:
+    """Código correspondiente al número de secuencia `seq`."""
+    return codigo_desde_indice(_permutacion().aplicar(seq % ESPACIO))
+
+
+_local_lock = threading.Lock()
+_local_tope = 0
+
+
+def reservar_secuencia(n: int) -> list:
+    """
+    n números de secuencia nuevos en un solo round trip. En Postgres salen de
+    la sequence (atómica entre procesos); en otros motores (SQLite de
+    desarrollo) de un contador del proceso que arranca después del id más alto.
+    """
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cur:
+            cur.execute(f"SELECT nextval('{SECUENCIA}') FROM generate_series(1, %s)", [n])
+            return [row[0] for row in cur.fetchall()]
+
+    from .models import Propiedad
+
+    global _local_tope
+    with _local_lock:
+        ultimo = Propiedad._base_manager.order_by("-id").values_list("id", flat=True).first() or 0
+        inicio = max(_local_tope, ultimo + 1)
+        _local_tope = inicio + n
+    return list(range(inicio, inicio + n))
+
+
+class Asignador:
+    """
+    Entrega códigos de a uno desde un bloque reservado de antemano: una
+    reserva (un round trip) cada `bloque` códigos. Thread-safe.
+    """
+
+    def __init__(self, reservar=reservar_secuencia, bloque=None):
+        self.reservar = reservar
+        self.bloque = bloque
+        self._cola = deque()
+        self._lock = threading.Lock()
+
+    def siguiente(self) -> str:
+        with self._lock:
+            if not self._cola:
+                n = self.bloque or settings.PROPIEDADES_CODIGO_BLOQUE
+                self._cola.extend(self.reservar(n))
+            return codigo_para(self._cola.popleft())
+
+    def descartar(self):
+        with self._lock:
+            self._cola.clear()
+
+
+_ASIGNADOR = Asignador()
+
+
+def siguiente_codigo() -> str:
+    return _ASIGNADOR.siguiente()
+
+
+def codigos_libres(n: int) -> list:
+    """
+    n códigos para carga masiva: una reserva de secuencia y un chequeo por
+    lote contra los códigos existentes (sólo choca con los aleatorios viejos).
+    """
+    from .models import Propiedad
+
+    out = []
+    while len(out) < n:
+        faltan = n - len(out)
+        lote = [codigo_para(s) for s in reservar_secuencia(faltan)]
+        usados = set()
+        for i in range(0, len(lote), 5000):
+            usados.update(
+                Propiedad._base_manager.filter(codigo_unico__in=lote[i:i + 5000])
+                .values_list("codigo_unico", flat=True)
+            )
+        out.extend(c for c in lote if c not in usados)
+    return out
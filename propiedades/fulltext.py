@@ -0,0 +1,125 @@
+# propiedades/fulltext.py
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db.models import Case, F, Func, IntegerField, Max, Q, Value, When, Window
+from django.db.models.functions import Greatest, Lower
+
+from .search_config import SYNONYMS, norm
+
+# Misma expresión que el trigger de la migración 0007 ({p} = prefijo de columna).
+# Se usa para el backfill por lotes (rebuild_search_vector).
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('spanish', public.f_unaccent("
+    "coalesce({p}titulo,'') || ' ' || coalesce({p}codigo_unico,''))), 'A') || "
+    "setweight(to_tsvector('spanish', public.f_unaccent("
+    "coalesce({p}localidad,'') || ' ' || coalesce({p}provincia,''))), 'B') || "
+    "setweight(to_tsvector('spanish', public.f_unaccent("
+    "coalesce({p}descripcion,'') || ' ' || coalesce({p}amenidades,''))), 'C')"
+)
+
+# Campos con índice trigram (migración 0006): public.f_unaccent(lower(<campo>))
+TRGM_FIELDS = ('titulo', 'localidad', 'provincia')
+
+# Todo lo que no sea letra/dígito rompe la sintaxis de to_tsquery
+_NO_LEXEMA = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def fulltext_activo() -> bool:
+    """
+    El modo full-text sólo existe en PostgreSQL (en SQLite se usa icontains).
+    Se puede apagar con PROPIEDADES_FULLTEXT=False.
+    """
+    return connection.vendor == "postgresql" and getattr(settings, "PROPIEDADES_FULLTEXT", True)
+
+
+class FUnaccent(Func):
+    """
+    public.f_unaccent(): la versión IMMUTABLE de unaccent que usan los índices
+    trigram. Con unaccent() a secas el planner no puede usar esos índices.
+    """
+    function = 'public.f_unaccent'
+
+
+def fuzzy_umbral() -> float:
+    """
+    Similitud mínima de una coincidencia aproximada. Va como parámetro de
+    cada consulta; el `%` que usa el índice filtra antes con el
+    pg_trgm.similarity_threshold del servidor (0.3 por defecto), así que un
+    umbral más bajo requiere bajarlo en la base (ALTER DATABASE ... SET).
+    """
+    return float(getattr(settings, "PROPIEDADES_FUZZY_UMBRAL", 0.3))
+
+
+def build_tsquery(q: str) -> str:
+    """
+    Arma el texto para to_tsquery a partir de la búsqueda del usuario:
+    - cada palabra (normalizada) es un grupo AND
+    - dentro del grupo, OR con su sinónimo (si hay)
+    - prefijo ':*' para conservar el comportamiento "contiene" de antes
+    Ej: 'depto posadas' -> '(apartamento:* | depto:*) & (posadas:*)'
+    """
+    grupos = []
+    for token in (q or "").split():
+        t = norm(token)
+        variantes = {t}
+        syn = SYNONYMS.get(t)
+        if syn:
+            variantes.add(syn)
+
+        alternativas = []
+        for v in sorted(variantes):
+            partes = [p for p in _NO_LEXEMA.split(v) if p]
+            if partes:
+                alternativas.append(" & ".join(f"{p}:*" for p in partes))
+        if alternativas:
+            grupos.append("(" + " | ".join(alternativas) + ")")
+    return " & ".join(grupos)
+
+
+def filtrar_fulltext(qs, q: str, fuzzy: bool = True):
+    """
+    Filtra por la columna search_vector (índice GIN) y ordena por ts_rank.
+    El vector ya incluye codigo_unico con peso A, así que 'ABC123' matchea solo.
+
+    Con fuzzy=True, exactas y aproximadas van en UNA sola consulta:
+    - candidatas = match full-text OR `%` trigram sobre f_unaccent(lower(campo))
+      (las mismas expresiones indexadas en 0006) con similitud >= fuzzy_umbral()
+    - si hay alguna exacta, se descartan las aproximadas (ventana MAX(exacto))
+    - cada fila trae `exacto` (1/0), `rank` y `sim` para ordenar y armar el chip
+    """
+    tsq = build_tsquery(q)
+    qn = norm(q)
+    if not tsq and not (fuzzy and qn):
+        return qs.none()
+
+    query = SearchQuery(tsq, config='spanish', search_type='raw')
+    exact = Q(search_vector=query) if tsq else Q(pk__in=[])
+    if not fuzzy:
+        return (
+            qs.filter(exact)
+            .annotate(rank=SearchRank(F('search_vector'), query))
+            .order_by('-rank', '-fecha_actualizacion')
+        )
+
+    trgm = {f"trgm_{f}": FUnaccent(Lower(F(f))) for f in TRGM_FIELDS}
+    aprox = Q()
+    for alias in trgm:
+        aprox |= Q(**{f"{alias}__trigram_similar": qn})
+
+    return (
+        qs.alias(**trgm)   # alias: sólo para filtrar/puntuar, no van al SELECT
+        .annotate(
+            exacto=Case(When(exact, then=Value(1)), default=Value(0), output_field=IntegerField()),
+            rank=SearchRank(F('search_vector'), query),
+            sim=Greatest(*[TrigramSimilarity(alias, qn) for alias in trgm]),
+        )
+        # `%` para el índice; el umbral configurado, explícito y por consulta
+        .filter(exact | (aprox & Q(sim__gte=fuzzy_umbral())))
+        .annotate(mejor=Window(Max('exacto')))
+        # conjuntivo a propósito: Django no soporta OR contra ventanas al paginar (COUNT)
+        .filter(exacto=F('mejor'))
+        .order_by('-exacto', '-rank', '-sim', '-fecha_actualizacion')
+    )
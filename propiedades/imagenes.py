@@ -0,0 +1,172 @@
+# propiedades/imagenes.py
+import logging
+import posixpath
+import re
+import threading
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .cache import propiedades_cache
+
+logger = logging.getLogger(__name__)
+
+# Anchos fijos: miniaturas de galería (h-20), cards (h-44) y detalle (h-96)
+VARIANT_WIDTHS = (160, 480, 960)
+
+# extensión -> (formato Pillow, kwargs de guardado)
+VARIANT_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+_VARIANTE_RE = re.compile(r"__w\d+\.(webp|jpg)$")
+
+
+def variant_name(name: str, width: int, ext: str) -> str:
+    """
+    'propiedades/galeria/12_3456.png' -> 'propiedades/galeria/12_3456__w480.webp'
+    (al lado del original, mismo directorio).
+    """
+    base, _ = posixpath.splitext(name)
+    return f"{base}__w{width}.{ext}"
+
+
+def es_variante(name: str) -> bool:
+    return bool(_VARIANTE_RE.search(name or ""))
+
+
+def base_de_variante(name: str):
+    """
+    'x/12_3456__w480.webp' -> 'x/12_3456' (original sin extensión); None si
+    no es una variante.
+    """
+    if not es_variante(name):
+        return None
+    return _VARIANTE_RE.sub("", name)
+
+
+def _marca_key(name: str) -> str:
+    return f"variantes:{name}"
+
+
+def _modo_base(img):
+    """RGBA si la imagen tiene transparencia (RGBA, LA, P con transparency); si no RGB/L."""
+    if img.has_transparency_data:
+        return img if img.mode == "RGBA" else img.convert("RGBA")
+    return img if img.mode in ("RGB", "L") else img.convert("RGB")
+
+
+def _para_formato(img, fmt):
+    """JPEG no tiene alfa: se aplana sobre blanco. WebP conserva la transparencia."""
+    if fmt == "JPEG" and img.mode == "RGBA":
+        fondo = Image.new("RGB", img.size, (255, 255, 255))
+        fondo.paste(img, mask=img.getchannel("A"))
+        return fondo
+    return img
+
+
+def generar_variantes(name: str, force: bool = False) -> list:
+    """
+    Genera las derivadas WebP/JPEG de `name` en VARIANT_WIDTHS y las guarda en
+    default_storage. Nunca agranda: si el original es más chico, la variante
+    queda con el ancho original (el nombre conserva el ancho nominal).
+    Devuelve los nombres escritos.
+    """
+    if not name or es_variante(name):
+        return []
+
+    with default_storage.open(name, "rb") as fh:
+        img = Image.open(fh)
+        img = ImageOps.exif_transpose(img)
+        img.load()
+    img = _modo_base(img)
+
+    escritos = []
+    for width in VARIANT_WIDTHS:
+        w = min(width, img.width)
+        h = max(1, round(img.height * w / img.width))
+        resized = img if w == img.width else img.resize((w, h), Image.Resampling.LANCZOS)
+        for ext, (fmt, opts) in VARIANT_FORMATS.items():
+            dest = variant_name(name, width, ext)
+            if default_storage.exists(dest):
+                if not force:
+                    continue
+                # file_overwrite=False renombraría: borramos antes de escribir
+                default_storage.delete(dest)
+            buf = BytesIO()
+            _para_formato(resized, fmt).save(buf, fmt, **opts)
+            escritos.append(default_storage.save(dest, ContentFile(buf.getvalue())))
+
+    propiedades_cache().set(_marca_key(name), True, None)
+    return escritos
+
+
+def variantes_disponibles(name: str) -> bool:
+    """
+    ¿Hay variantes para `name`? Se recuerda en cache para no hacer un
+    exists() (HEAD en S3) por imagen en cada render.
+    """
+    if not name:
+        return False
+    cache = propiedades_cache()
+    hit = cache.get(_marca_key(name))
+    if hit is not None:
+        return hit
+    ok = default_storage.exists(variant_name(name, VARIANT_WIDTHS[-1], "webp"))
+    cache.set(_marca_key(name), ok, None if ok else 300)
+    return ok
+
+
+def srcset(name: str, ext: str) -> str:
+    """
+    'url160 160w, url480 480w, url960 960w' o '' si no hay variantes.
+    """
+    if ext not in VARIANT_FORMATS or not variantes_disponibles(name):
+        return ""
+    return ", ".join(
+        f"{default_storage.url(variant_name(name, w, ext))} {w}w" for w in VARIANT_WIDTHS
+    )
+
+
+def generar_variantes_seguro(name: str) -> list:
+    """
+    Para hooks de subida: nunca rompe el guardado del modelo.
+    """
+    try:
+        return generar_variantes(name)
+    except Exception:
+        logger.exception("No se pudieron generar variantes de %s", name)
+        return []
+
+
+def generar_variantes_en_segundo_plano(name: str, despues=None):
+    """
+    Para los signals: descarga, 3 anchos x 2 formatos y 6 subidas no pueden
+    ir en el request del admin. Corre en un thread (como el refresco de
+    destacadas), con un lock por imagen en el cache; si ya hay variantes no
+    hace nada. `despues()` corre si se escribió alguna. Devuelve el thread
+    (None si otro ya la está generando).
+    """
+    cache = propiedades_cache()
+    lock = f"{_marca_key(name)}:lock"
+    if not cache.add(lock, 1, 300):
+        return None
+
+    def _run():
+        try:
+            if not variantes_disponibles(name) and generar_variantes_seguro(name) and despues:
+                despues()
+        finally:
+            cache.delete(lock)
+
+    hilo = threading.Thread(target=_run, name="propiedades-variantes", daemon=True)
+    hilo.start()
+    return hilo
+
+
+def variantes_al_guardar() -> bool:
+    return getattr(settings, "PROPIEDADES_IMAGE_VARIANTS_ON_SAVE", True)
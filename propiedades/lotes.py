@@ -0,0 +1,75 @@
+# propiedades/lotes.py
+"""
+Cambios masivos de propiedades sin save() por fila: acciones del admin y
+`manage.py editar_propiedades` (CSV) pasan por acá.
+
+- Un UPDATE por lote, con fecha_actualizacion=Now() en la misma sentencia
+  (auto_now no corre en update()): ETag/Last-Modified, orden por fecha,
+  sitemap y cards cacheadas (sellan la fecha, ver cache.render_card) ven el cambio.
+- update() no dispara post_save: lo que hacen las señales (versión de
+  búsquedas, bloque de destacadas) se hace una vez por lote, al confirmar.
+- search_vector lo mantiene el trigger de la DB también en un UPDATE.
+"""
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Now
+
+from .cache import bump_busqueda_version, refrescar_destacadas_en_segundo_plano
+from .models import Propiedad
+
+# acción del admin -> (descripción, valores)
+ACCIONES = {
+    'publicar': ("Publicar seleccionadas", {'estado_publicacion': 'publicada'}),
+    'archivar': ("Archivar seleccionadas", {'estado_publicacion': 'archivada'}),
+    'destacar': ("Marcar como destacadas", {'is_destacada': True}),
+    'quitar_destacada': ("Quitar de destacadas", {'is_destacada': False}),
+}
+
+# Columnas que acepta el CSV (sin texto libre ni imágenes)
+CAMPOS_EDITABLES = ('estado_publicacion', 'is_destacada', 'tipo_operacion', 'precio_usd', 'precio_pesos')
+
+# pks por UPDATE en aplicar_filas (un CASE por campo: acota el tamaño del SQL)
+LOTE = 500
+
+
+def _al_confirmar():
+    transaction.on_commit(bump_busqueda_version)
+    transaction.on_commit(refrescar_destacadas_en_segundo_plano)
+
+
+def aplicar(qs, **valores) -> int:
+    """
+    Los mismos valores para todo qs, en un UPDATE. Las filas que ya los
+    tienen no se tocan (su fecha y su ETag no cambian). Devuelve cuántas cambiaron.
+    """
+    n = qs.exclude(**valores).update(fecha_actualizacion=Now(), **valores)
+    if n:
+        _al_confirmar()
+    return n
+
+
+def aplicar_accion(qs, accion) -> int:
+    return aplicar(qs, **ACCIONES[accion][1])
+
+
+def aplicar_filas(cambios) -> int:
+    """
+    cambios: {pk: {campo: valor}} con valores distintos por fila. Un UPDATE
+    cada LOTE pks (CASE pk WHEN ... por campo; el que no cambia queda igual).
+    """
+    pks = sorted(cambios)
+    n = 0
+    for i in range(0, len(pks), LOTE):
+        lote = pks[i:i + LOTE]
+        valores = {}
+        for campo in sorted({c for pk in lote for c in cambios[pk]}):
+            field = Propiedad._meta.get_field(campo)
+            whens = [
+                When(pk=pk, then=Value(cambios[pk][campo], output_field=field))
+                for pk in lote if campo in cambios[pk]
+            ]
+            valores[campo] = Case(*whens, default=F(campo), output_field=field)
+        n += Propiedad.objects.filter(pk__in=lote).update(fecha_actualizacion=Now(), **valores)
+    if n:
+        _al_confirmar()
+    return n
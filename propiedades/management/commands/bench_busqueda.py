@@ -0,0 +1,73 @@
+# propiedades/management/commands/bench_busqueda.py
+from __future__ import annotations
+
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import QueryDict
+
+from propiedades.busqueda import BusquedaSpec
+from propiedades.models import Propiedad
+
+from .bench_props import FILTROS, FUZZY, TEXTOS, _percentil
+
+FASES = ("parseo", "compilacion", "sql", "total")
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark de la búsqueda sin DB ni HTTP: costo por request de parsear el "
+        "QueryDict (BusquedaSpec), compilar el queryset y generar el SQL. Reporta µs p50/p95."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iteraciones", type=int, default=2000, help="Repeticiones por query string.")
+        parser.add_argument("--query", action="append", default=[],
+                            help="Query string extra a medir (repetible), p.ej. 'q=casa&tipo=casa'.")
+        parser.add_argument("--out", help="Archivo JSON de resultados.")
+
+    def _queries(self, extra):
+        out = [f"q={t}" for t in TEXTOS] + [f"q={t}" for t in FUZZY] + list(FILTROS)
+        out.append(f"q={TEXTOS[0]}&{FILTROS[-1]}&dormitorios=2&currency=usd&price_max=150k")
+        return out + list(extra)
+
+    def _medir(self, query, n, base):
+        muestras = {f: [] for f in FASES}
+        for _ in range(n):
+            GET = QueryDict(query)
+            t0 = time.perf_counter()
+            spec = BusquedaSpec.desde_query(GET)
+            t1 = time.perf_counter()
+            qs = spec.compilar(base)
+            t2 = time.perf_counter()
+            qs.query.sql_with_params()
+            t3 = time.perf_counter()
+            for fase, dt in zip(FASES, (t1 - t0, t2 - t1, t3 - t2, t3 - t0)):
+                muestras[fase].append(dt * 1e6)
+        return {
+            fase: {"p50_us": round(_percentil(sorted(v), 50), 1), "p95_us": round(_percentil(sorted(v), 95), 1)}
+            for fase, v in muestras.items()
+        }
+
+    def handle(self, *args, **opts):
+        n = max(1, opts["iteraciones"])
+        base = Propiedad.objects.cards().filter(estado_publicacion="publicada").order_by("-fecha_actualizacion")
+        # una vuelta previa: imports perezosos, caches de Django
+        for query in self._queries(opts["query"]):
+            BusquedaSpec.desde_query(QueryDict(query)).compilar(base).query.sql_with_params()
+
+        resultado = {}
+        self.stdout.write(f"{'query':<60} " + " ".join(f"{f + ' p50/p95 µs':>24}" for f in FASES))
+        for query in self._queries(opts["query"]):
+            r = self._medir(query, n, base)
+            resultado[query] = r
+            self.stdout.write(
+                f"{query[:60]:<60} "
+                + " ".join(f"{r[f]['p50_us']:>11.1f} /{r[f]['p95_us']:>11.1f}" for f in FASES)
+            )
+
+        if opts["out"]:
+            with open(opts["out"], "w", encoding="utf-8") as fh:
+                json.dump({"iteraciones": n, "queries": resultado}, fh, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Resultados en {opts['out']}"))
@@ -0,0 +1,360 @@
+# propiedades/management/commands/bench_props.py
+from __future__ import annotations
+
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from propiedades.models import Propiedad
+from propiedades.pagination import keyset_activo, keyset_page
+
+# (tipo de request, peso relativo en la mezcla)
+MEZCLA = [
+    ("home", 10),
+    ("lista", 15),
+    ("lista_profunda", 10),
+    ("detalle", 30),
+    ("busqueda_texto", 10),
+    ("busqueda_filtros", 10),
+    ("busqueda_fuzzy", 5),
+    ("contacto", 10),
+]
+
+TEXTOS = ["casa", "depto balcon", "terreno ideal", "posadas", "pileta"]
+FUZZY = ["galpn", "dpto balcn", "terrrno", "obera luminsa"]
+FILTROS = [
+    "tipo=casa",
+    "tipo_operacion=venta&currency=usd&price_min=50000&price_max=150000",
+    "tipo_operacion=alquiler&ars_min=200000",
+    "dormitorios=3&banios=2",
+    "localidad=posadas&tipo=apartamento",
+]
+
+_SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def _percentil(valores, p):
+    """Percentil por rango más cercano (valores ya ordenados)."""
+    if not valores:
+        return None
+    k = max(0, min(len(valores) - 1, int(round(p / 100 * len(valores) + 0.5)) - 1))
+    return valores[k]
+
+
+def _resumen(muestras, duracion=None):
+    lat = sorted(m["ms"] for m in muestras)
+    qs = [m["queries"] for m in muestras if m["queries"] is not None]
+    out = {
+        "requests": len(muestras),
+        "errores": sum(1 for m in muestras if m["status"] >= 400 or m["status"] == 0),
+        "p50_ms": _percentil(lat, 50),
+        "p95_ms": _percentil(lat, 95),
+        "p99_ms": _percentil(lat, 99),
+        "media_ms": round(sum(lat) / len(lat), 2) if lat else None,
+        "queries_por_request": round(sum(qs) / len(qs), 2) if qs else None,
+    }
+    if duracion:
+        out["throughput_rps"] = round(len(muestras) / duracion, 1)
+    return out
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark HTTP de las vistas de propiedades: mezcla realista de requests "
+        "(listas, páginas profundas, detalle, búsquedas, contacto) y reporte p50/p95/p99, "
+        "throughput y queries por request. Resultado a JSON para comparar corridas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0,
+                            help="Antes de medir, BORRA y carga N propiedades (reset_and_seed_props --bulk).")
+        parser.add_argument("--src", help="Imágenes para el seed (opcional).")
+        parser.add_argument("--requests", type=int, default=500, help="Cantidad de requests medidos.")
+        parser.add_argument("--warmup", type=int, default=50, help="Requests previos que no se miden.")
+        parser.add_argument("--concurrency", type=int, default=4, help="Clientes simultáneos (threads).")
+        parser.add_argument("--base-url", help="Medir contra un servidor ya levantado (p.ej. http://127.0.0.1:8000).")
+        parser.add_argument("--gunicorn", action="store_true",
+                            help="Levanta gunicorn local (mi_blog.wsgi) y mide contra él.")
+        parser.add_argument("--gunicorn-workers", type=int, default=2)
+        parser.add_argument("--asgi", action="store_true",
+                            help="Con --gunicorn: mi_blog.asgi con workers uvicorn y PROPIEDADES_VISTAS_ASYNC=true. "
+                                 "Mismo -w que la corrida sync = mismo presupuesto de memoria (se reporta el RSS).")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--profundidad", type=int, default=10,
+                            help="Páginas a saltar para 'lista_profunda'.")
+        parser.add_argument("--random-seed", type=int, default=42, help="Semilla de la mezcla (repetible).")
+        parser.add_argument("--out", help="Archivo JSON de resultados.")
+        parser.add_argument("--compare", help="JSON de una corrida anterior: muestra diferencias.")
+        parser.add_argument("--umbral", type=float, default=10.0,
+                            help="Con --compare: % de empeoramiento de p95 que se marca como regresión.")
+
+    # ---------- preparación ----------
+
+    def _seed(self, opts):
+        self.stdout.write(f"Seed: {opts['seed']} propiedades…")
+        call_command(
+            "reset_and_seed_props", bulk=True, yes=True, count=opts["seed"],
+            src=opts["src"], stdout=self.stdout,
+        )
+
+    def _urls_lista_profunda(self, profundidad):
+        """URL de la página `profundidad` del listado, en el modo de paginación activo."""
+        if not keyset_activo():
+            return f"/propiedades/lista/?page={profundidad}"
+        qs = Propiedad.objects.filter(estado_publicacion="publicada")
+        token = None
+        for _ in range(profundidad - 1):
+            page = keyset_page(qs, token, 18)
+            if not page.has_next():
+                break
+            token = page.next_cursor
+        return f"/propiedades/lista/?cursor={token}" if token else "/propiedades/lista/"
+
+    def _plan(self, n, opts):
+        ids = list(
+            Propiedad.objects.filter(estado_publicacion="publicada").values_list("pk", flat=True)[:5000]
+        )
+        if not ids:
+            raise CommandError("No hay propiedades publicadas: usá --seed N.")
+        profunda = self._urls_lista_profunda(opts["profundidad"])
+        rnd = random.Random(opts["random_seed"])
+        tipos, pesos = zip(*MEZCLA)
+
+        def url(tipo):
+            if tipo == "home":
+                return "/propiedades/"
+            if tipo == "lista":
+                return "/propiedades/lista/"
+            if tipo == "lista_profunda":
+                return profunda
+            if tipo == "detalle":
+                return f"/propiedades/{rnd.choice(ids)}/"
+            if tipo == "busqueda_texto":
+                return f"/propiedades/busqueda/?q={rnd.choice(TEXTOS).replace(' ', '+')}"
+            if tipo == "busqueda_filtros":
+                return f"/propiedades/busqueda/?{rnd.choice(FILTROS)}"
+            if tipo == "busqueda_fuzzy":
+                return f"/propiedades/busqueda/?q={rnd.choice(FUZZY).replace(' ', '+')}"
+            return f"/propiedades/contacto/?propiedad_id={rnd.choice(ids)}"
+
+        return [(t, url(t)) for t in rnd.choices(tipos, weights=pesos, k=n)]
+
+    # ---------- ejecución ----------
+
+    def _runner_local(self):
+        """Un Client por thread (WSGI en proceso); queries contadas con CaptureQueriesContext."""
+        local = threading.local()
+        host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else "localhost"
+
+        def run(url):
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = Client(HTTP_HOST=host)
+            with CaptureQueriesContext(connection) as ctx:
+                t0 = time.perf_counter()
+                resp = client.get(url)
+                if resp.streaming:
+                    b"".join(resp.streaming_content)
+                ms = (time.perf_counter() - t0) * 1000
+            return resp.status_code, ms, len(ctx.captured_queries)
+
+        return run
+
+    def _runner_http(self, base_url):
+        """HTTP real; las queries salen del header Server-Timing (PROPIEDADES_METRICAS=True)."""
+        base = base_url.rstrip("/")
+
+        def run(url):
+            t0 = time.perf_counter()
+            try:
+                with urllib.request.urlopen(base + url, timeout=30) as resp:
+                    resp.read()
+                    status, timing = resp.status, resp.headers.get("Server-Timing", "")
+            except urllib.error.HTTPError as e:
+                status, timing = e.code, ""
+            except Exception:
+                status, timing = 0, ""
+            ms = (time.perf_counter() - t0) * 1000
+            m = _SERVER_TIMING_QUERIES.search(timing)
+            return status, ms, int(m.group(1)) if m else None
+
+        return run
+
+    def _gunicorn(self, opts):
+        env = dict(os.environ, PROPIEDADES_METRICAS="true")
+        app, extra = "mi_blog.wsgi", []
+        if opts["asgi"]:
+            env["PROPIEDADES_VISTAS_ASYNC"] = "true"
+            app, extra = "mi_blog.asgi", ["-k", "uvicorn_worker.UvicornWorker"]
+        cmd = [
+            sys.executable, "-m", "gunicorn", app, *extra,
+            "-b", f"127.0.0.1:{opts['port']}", "-w", str(opts["gunicorn_workers"]),
+            "--log-level", "warning",
+        ]
+        proc = subprocess.Popen(cmd, cwd=settings.BASE_DIR, env=env)
+        base = f"http://127.0.0.1:{opts['port']}"
+        limite = time.monotonic() + 30
+        while time.monotonic() < limite:
+            try:
+                urllib.request.urlopen(base + "/propiedades/", timeout=2).read()
+                return proc, base
+            except urllib.error.HTTPError:
+                return proc, base
+            except Exception:
+                if proc.poll() is not None:
+                    raise CommandError("gunicorn terminó al arrancar.")
+                time.sleep(0.3)
+        proc.terminate()
+        raise CommandError("gunicorn no respondió en 30s.")
+
+    def _rss_mb(self, pid):
+        """RSS del master + workers en MB (Linux, /proc); None si no se puede leer."""
+        def rss(p):
+            with open(f"/proc/{p}/status", encoding="ascii") as fh:
+                for linea in fh:
+                    if linea.startswith("VmRSS:"):
+                        return int(linea.split()[1])
+            return 0
+
+        try:
+            with open(f"/proc/{pid}/task/{pid}/children", encoding="ascii") as fh:
+                hijos = [int(p) for p in fh.read().split()]
+            return round(sum(rss(p) for p in [pid, *hijos]) / 1024, 1)
+        except (OSError, ValueError):
+            return None
+
+    def _correr(self, run, plan, concurrency):
+        def uno(item):
+            tipo, url = item
+            status, ms, queries = run(url)
+            return {"tipo": tipo, "url": url, "status": status, "ms": round(ms, 2), "queries": queries}
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            return list(pool.map(uno, plan))
+
+    # ---------- reporte ----------
+
+    def _imprimir(self, resultado):
+        g = resultado["global"]
+        rss = resultado["meta"].get("rss_mb")
+        self.stdout.write(
+            f"\n{g['requests']} requests | {g['throughput_rps']} req/s | errores: {g['errores']}"
+            + (f" | RSS servidor: {rss} MB" if rss else "")
+        )
+        self.stdout.write(f"{'tipo':<18}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}")
+        filas = [("TOTAL", g)] + sorted(resultado["por_tipo"].items())
+        for tipo, r in filas:
+            q = "-" if r["queries_por_request"] is None else f"{r['queries_por_request']:.1f}"
+            self.stdout.write(
+                f"{tipo:<18}{r['requests']:>6}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{q:>9}"
+            )
+
+    def _comparar(self, actual, path, umbral):
+        previo = json.loads(Path(path).read_text(encoding="utf-8"))
+        self.stdout.write(f"\nComparación contra {path} (p95 / queries):")
+        pm, am = previo.get("meta", {}), actual["meta"]
+        if previo.get("global", {}).get("throughput_rps"):
+            self.stdout.write(
+                f"  {pm.get('modo')} → {am['modo']}: {previo['global']['throughput_rps']} → "
+                f"{actual['global']['throughput_rps']} req/s | RSS {pm.get('rss_mb')} → {am.get('rss_mb')} MB"
+            )
+        regresiones = 0
+        filas = [("TOTAL", actual["global"], previo.get("global", {}))] + [
+            (t, r, previo.get("por_tipo", {}).get(t, {})) for t, r in sorted(actual["por_tipo"].items())
+        ]
+        for tipo, r, p in filas:
+            if not p.get("p95_ms"):
+                continue
+            delta = (r["p95_ms"] - p["p95_ms"]) / p["p95_ms"] * 100
+            dq = ""
+            if r.get("queries_por_request") is not None and p.get("queries_por_request") is not None:
+                dq = f" | queries {p['queries_por_request']} → {r['queries_por_request']}"
+            marca = ""
+            if delta > umbral:
+                regresiones += 1
+                marca = "  ← REGRESIÓN"
+            self.stdout.write(f"  {tipo:<18}{p['p95_ms']:>8.1f} → {r['p95_ms']:>8.1f} ms ({delta:+.1f}%){dq}{marca}")
+        if regresiones:
+            self.stdout.write(self.style.WARNING(f"{regresiones} regresión(es) de p95 > {umbral}%"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Sin regresiones de p95."))
+
+    def handle(self, *args, **opts):
+        if opts["seed"]:
+            self._seed(opts)
+
+        plan = self._plan(opts["warmup"] + opts["requests"], opts)
+        warmup, medidos = plan[:opts["warmup"]], plan[opts["warmup"]:]
+
+        proc = rss_mb = None
+        if opts["asgi"] and not opts["gunicorn"]:
+            raise CommandError("--asgi va con --gunicorn.")
+        if opts["gunicorn"]:
+            proc, base = self._gunicorn(opts)
+            run, modo = self._runner_http(base), "gunicorn-asgi" if opts["asgi"] else "gunicorn"
+        elif opts["base_url"]:
+            run, modo = self._runner_http(opts["base_url"]), "http"
+        else:
+            run, modo = self._runner_local(), "in-process"
+
+        try:
+            self.stdout.write(f"Modo: {modo} | concurrencia: {opts['concurrency']} | warmup: {len(warmup)}")
+            self._correr(run, warmup, opts["concurrency"])
+            t0 = time.perf_counter()
+            muestras = self._correr(run, medidos, opts["concurrency"])
+            duracion = time.perf_counter() - t0
+            if proc is not None:
+                rss_mb = self._rss_mb(proc.pid)
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait(timeout=10)
+
+        por_tipo = {}
+        for m in muestras:
+            por_tipo.setdefault(m["tipo"], []).append(m)
+        resultado = {
+            "meta": {
+                "modo": modo,
+                "concurrency": opts["concurrency"],
+                "requests": len(medidos),
+                "propiedades": Propiedad.objects.count(),
+                "db": connection.vendor,
+                "workers": opts["gunicorn_workers"] if opts["gunicorn"] else None,
+                "rss_mb": rss_mb,
+                "paginacion": "keyset" if keyset_activo() else "offset",
+                "random_seed": opts["random_seed"],
+                "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "global": _resumen(muestras, duracion),
+            "por_tipo": {t: _resumen(ms) for t, ms in por_tipo.items()},
+        }
+        self._imprimir(resultado)
+
+        errores = [m for m in muestras if m["status"] >= 400 or m["status"] == 0]
+        if errores:
+            self.stdout.write(self.style.WARNING(
+                f"Ejemplo de error: {errores[0]['status']} {errores[0]['url']}"
+            ))
+
+        if opts["out"]:
+            Path(opts["out"]).write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+            self.stdout.write(f"Resultados: {opts['out']}")
+        if opts["compare"]:
+            self._comparar(resultado, opts["compare"], opts["umbral"])
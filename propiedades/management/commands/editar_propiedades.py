@@ -0,0 +1,134 @@
+# propiedades/management/commands/editar_propiedades.py
+from __future__ import annotations
+
+import csv
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from propiedades.lotes import CAMPOS_EDITABLES, LOTE, aplicar_filas
+from propiedades.models import Propiedad
+
+CLAVES = ("id", "codigo_unico")
+_SI = {"1", "true", "t", "si", "sí", "s", "yes", "y"}
+_NO = {"0", "false", "f", "no", "n"}
+
+
+def _valor(campo, crudo):
+    """Celda del CSV -> valor validado del campo ('null' vacía un campo nullable)."""
+    field = Propiedad._meta.get_field(campo)
+    texto = crudo.strip()
+    if texto.lower() == "null":
+        valor = None
+    elif field.get_internal_type() == "BooleanField":
+        if texto.lower() not in _SI | _NO:
+            raise ValidationError(f"'{texto}' no es sí/no")
+        valor = texto.lower() in _SI
+    else:
+        valor = texto
+    return field.clean(valor, None)
+
+
+class Command(BaseCommand):
+    help = (
+        "Edición masiva desde un CSV: una columna clave (id o codigo_unico) y cualquiera de "
+        f"{', '.join(CAMPOS_EDITABLES)}. Celda vacía = no tocar; 'null' = vaciar. "
+        "Un UPDATE por lote (mismo camino que las acciones del admin)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo", help="Ruta del CSV (UTF-8, con encabezado).")
+        parser.add_argument("--delimitador", default=",", help="Separador de columnas (default ',').")
+        parser.add_argument("--yes", action="store_true", help="Aplica los cambios (si no, solo muestra).")
+        parser.add_argument("--mostrar", type=int, default=20, help="Cuántos ejemplos listar.")
+
+    def _leer(self, path, delimitador):
+        """({clave: {campo: valor}}, columna clave). CommandError si hay celdas inválidas."""
+        try:
+            fh = open(path, newline="", encoding="utf-8-sig")
+        except OSError as e:
+            raise CommandError(f"No se pudo abrir {path}: {e}")
+        with fh:
+            reader = csv.DictReader(fh, delimiter=delimitador)
+            columnas = [c.strip() for c in reader.fieldnames or []]
+            claves = [c for c in columnas if c in CLAVES]
+            if len(claves) != 1:
+                raise CommandError(f"El CSV necesita una (y sólo una) columna clave: {' o '.join(CLAVES)}.")
+            clave = claves[0]
+            extra = [c for c in columnas if c != clave and c not in CAMPOS_EDITABLES]
+            if extra:
+                raise CommandError(f"Columnas no editables: {', '.join(extra)}.")
+
+            filas, errores = {}, []
+            for linea, row in enumerate(reader, start=2):
+                row = {(k or "").strip(): (v or "") for k, v in row.items()}
+                k = row.pop(clave).strip()
+                if not k:
+                    errores.append(f"línea {linea}: falta {clave}")
+                    continue
+                try:
+                    k = int(k) if clave == "id" else k
+                except ValueError:
+                    errores.append(f"línea {linea}: id '{k}' no es un número")
+                    continue
+                valores = {}
+                for campo, crudo in row.items():
+                    if not crudo.strip():
+                        continue
+                    try:
+                        valores[campo] = _valor(campo, crudo)
+                    except ValidationError as e:
+                        errores.append(f"línea {linea}, {campo}: {' '.join(e.messages)}")
+                if k in filas:
+                    errores.append(f"línea {linea}: {clave} {k} repetido")
+                filas[k] = valores
+
+        if errores:
+            for e in errores[:50]:
+                self.stderr.write(f"  - {e}")
+            raise CommandError(f"{len(errores)} error(es) en el CSV: no se aplicó nada.")
+        return filas, clave
+
+    def _diferencias(self, filas, clave):
+        """Compara contra la DB (una consulta por LOTE claves): {pk: {campo: nuevo}}, faltantes."""
+        campos = sorted({c for v in filas.values() for c in v})
+        cambios, encontradas = {}, set()
+        claves = list(filas)
+        for i in range(0, len(claves), LOTE):
+            lote = claves[i:i + LOTE]
+            actuales = Propiedad.objects.filter(**{f"{clave}__in": lote}).values("pk", clave, *campos)
+            for actual in actuales:
+                k = actual[clave]
+                encontradas.add(k)
+                difiere = {c: v for c, v in filas[k].items() if actual[c] != v}
+                if difiere:
+                    cambios[actual["pk"]] = difiere
+        return cambios, [k for k in claves if k not in encontradas]
+
+    def handle(self, *args, **opts):
+        t0 = time.perf_counter()
+        filas, clave = self._leer(opts["archivo"], opts["delimitador"])
+        cambios, faltantes = self._diferencias(filas, clave)
+
+        self.stdout.write(
+            f"CSV: {len(filas)} filas | con cambios: {len(cambios)} | "
+            f"sin cambios: {len(filas) - len(cambios) - len(faltantes)} | no encontradas: {len(faltantes)}"
+        )
+        for k in faltantes[:opts["mostrar"]]:
+            self.stdout.write(f"  ? {clave} {k}")
+        for pk, valores in list(cambios.items())[:opts["mostrar"]]:
+            self.stdout.write(f"  - id {pk}: " + ", ".join(f"{c}={v}" for c, v in sorted(valores.items())))
+
+        if not cambios:
+            return
+        if not opts["yes"]:
+            self.stdout.write("\nModo vista previa (no se cambia nada). Añadí --yes para aplicar.")
+            return
+
+        with transaction.atomic():
+            n = aplicar_filas(cambios)
+        self.stdout.write(self.style.SUCCESS(
+            f"Propiedades actualizadas: {n} ({time.perf_counter() - t0:.1f}s)"
+        ))
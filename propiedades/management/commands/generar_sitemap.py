@@ -0,0 +1,110 @@
+# propiedades/management/commands/generar_sitemap.py
+from __future__ import annotations
+
+import json
+import posixpath
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from propiedades.sitemap import SITEMAP_TAMANO, indice, shards, urlset
+
+PREFIX = "sitemaps"
+INDICE = f"{PREFIX}/propiedades.xml"
+MANIFIESTO = f"{PREFIX}/manifest.json"
+
+
+def _nombre(k) -> str:
+    return f"{PREFIX}/propiedades-{k}.xml"
+
+
+def _guardar(name, partes):
+    """
+    Escribe el XML (generador de str) en el storage sin armarlo entero en
+    memoria: spool a disco pasado 8 MB y subida en streaming.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as tmp:
+        for parte in partes:
+            tmp.write(parte.encode("utf-8"))
+        tmp.seek(0)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        guardado = default_storage.save(name, File(tmp, name=posixpath.basename(name)))
+    if guardado != name:
+        raise CommandError(f"El storage guardó {guardado} en lugar de {name}")
+
+
+def _leer_manifiesto() -> dict:
+    if not default_storage.exists(MANIFIESTO):
+        return {}
+    try:
+        with default_storage.open(MANIFIESTO) as fh:
+            return json.loads(fh.read())
+    except (OSError, ValueError):
+        return {}
+
+
+class Command(BaseCommand):
+    help = (
+        f"Genera el sitemap de propiedades publicadas en el storage ({PREFIX}/): un índice y "
+        f"un archivo por shard de {SITEMAP_TAMANO} ids. Sólo reescribe los shards que cambiaron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default=getattr(settings, "PROPIEDADES_SITEMAP_BASE_URL", ""),
+                            help="Dominio público de las URLs de detalle (p.ej. https://midominio.com).")
+        parser.add_argument("--url-archivos",
+                            help="Prefijo público de los archivos para el índice (CDN o bucket público). "
+                                 "Por defecto default_storage.url(); ojo: con URLs pre-firmadas vencen.")
+        parser.add_argument("--forzar", action="store_true", help="Reescribe todos los shards.")
+
+    def _url_archivo(self, name, prefijo):
+        if prefijo:
+            return prefijo.rstrip("/") + "/" + name
+        return default_storage.url(name)
+
+    def handle(self, *args, **opts):
+        base_url = (opts["base_url"] or "").rstrip("/")
+        if not base_url:
+            raise CommandError("Falta --base-url (o PROPIEDADES_SITEMAP_BASE_URL).")
+        t0 = time.perf_counter()
+
+        previo = _leer_manifiesto()
+        mismo_contexto = previo.get("base_url") == base_url and previo.get("tamano") == SITEMAP_TAMANO
+        anteriores = previo.get("shards", {}) if mismo_contexto and not opts["forzar"] else {}
+
+        partes = shards()
+        firmas = {}
+        escritos = urls = 0
+        for k, n, _ultima, firma in partes:
+            firmas[str(k)] = firma
+            urls += n
+            if anteriores.get(str(k)) == firma and default_storage.exists(_nombre(k)):
+                continue
+            _guardar(_nombre(k), urlset(k, base_url))
+            escritos += 1
+            self.stdout.write(f"  {_nombre(k)}: {n} URLs")
+
+        sobrantes = set(previo.get("shards", {})) - set(firmas)
+        for k in sorted(sobrantes):
+            if default_storage.exists(_nombre(k)):
+                default_storage.delete(_nombre(k))
+            self.stdout.write(f"  {_nombre(k)}: borrado (shard vacío)")
+
+        if escritos or sobrantes or not mismo_contexto or not default_storage.exists(INDICE):
+            _guardar(INDICE, indice(partes, lambda k: self._url_archivo(_nombre(k), opts["url_archivos"])))
+            manifiesto = {"base_url": base_url, "tamano": SITEMAP_TAMANO, "shards": firmas}
+            if default_storage.exists(MANIFIESTO):
+                default_storage.delete(MANIFIESTO)
+            default_storage.save(MANIFIESTO, ContentFile(json.dumps(manifiesto, indent=2).encode("utf-8")))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Sitemap: {urls} URLs en {len(partes)} shards | reescritos: {escritos} | "
+            f"borrados: {len(sobrantes)} | índice: {self._url_archivo(INDICE, opts['url_archivos'])} "
+            f"({time.perf_counter() - t0:.1f}s)"
+        ))
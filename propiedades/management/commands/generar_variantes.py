@@ -0,0 +1,55 @@
+# propiedades/management/commands/generar_variantes.py
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from propiedades.cache import invalidate_card
+from propiedades.imagenes import VARIANT_WIDTHS, generar_variantes, variantes_disponibles
+from propiedades.models import Propiedad, PropiedadImagen
+
+
+class Command(BaseCommand):
+    help = f"Genera variantes WebP/JPEG ({', '.join(map(str, VARIANT_WIDTHS))} px) de las imágenes de propiedades."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Regenera aunque ya existan.")
+        parser.add_argument("--sin-galeria", action="store_true", help="Sólo imagen_principal.")
+
+    def handle(self, *args, **opts):
+        force = opts["force"]
+        t0 = time.perf_counter()
+        ok = errores = omitidas = 0
+
+        def _procesar(name, pk=None):
+            nonlocal ok, errores, omitidas
+            if not force and variantes_disponibles(name):
+                omitidas += 1
+                return
+            try:
+                escritos = generar_variantes(name, force=force)
+            except Exception as e:
+                errores += 1
+                self.stderr.write(f"  ERROR {name}: {e}")
+                return
+            ok += 1
+            self.stdout.write(f"  {name}: {len(escritos)} variantes")
+            if pk is not None:
+                invalidate_card(pk)
+
+        principales = (
+            Propiedad.objects.exclude(imagen_principal="").exclude(imagen_principal__isnull=True)
+            .values_list("pk", "imagen_principal").order_by("pk")
+        )
+        for pk, name in principales.iterator(chunk_size=500):
+            _procesar(name, pk)
+
+        if not opts["sin_galeria"]:
+            for name in PropiedadImagen.objects.values_list("imagen", flat=True).order_by("pk").iterator(chunk_size=500):
+                _procesar(name)
+
+        dt = time.perf_counter() - t0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imágenes procesadas: {ok} | ya tenían variantes: {omitidas} | errores: {errores} ({dt:.1f}s)"
+        ))
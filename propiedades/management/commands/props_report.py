@@ -2,11 +2,14 @@
 from __future__ import annotations
 
 import csv
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 from django.conf import settings
 from django.core.files.storage import default_storage
 from django.core.management.base import BaseCommand
 from django.utils import timezone
+from propiedades.media import walk_media_prefix
 from propiedades.models import Propiedad
 
 
@@ -36,30 +39,83 @@ def _parse_ids(expr: str) -> List[int]:
     return sorted(set(out))
 
 
+def _exists_pool(pool):
+    """
+    exists() concurrente: sigue siendo un HEAD por archivo en S3, pero varios a
+    la vez. Un error (timeout, 403, throttling) no es "falta": se devuelve la
+    excepción y el reporte la muestra aparte.
+    """
+    def _one(name):
+        try:
+            return default_storage.exists(name)
+        except Exception as e:
+            return e
+
+    def check(names):
+        return list(pool.map(_one, names))
+    return check
+
+
+def _exists_list(names_dirs):
+    """
+    exists() contra un listado: un LIST paginado por carpeta (en S3, 1000
+    claves por request) y después sólo búsquedas en un set.
+    """
+    existentes = set()
+    for d in names_dirs:
+        existentes.update(walk_media_prefix(d))
+
+    def check(names):
+        return [n in existentes for n in names]
+    return check
+
+
+def _url(name):
+    try:
+        return default_storage.url(name)
+    except Exception as e:
+        return f"ERROR_URL: {e}"
+
+
 class Command(BaseCommand):
     help = "Muestra un reporte de Propiedades y sus imágenes (opcionalmente exporta CSV)."
 
     def add_arguments(self, parser):
-        parser.add_argument("--limit", type=int, default=50, help="Máximo de propiedades a listar (si no usás --ids).")
+        parser.add_argument("--limit", type=int, default=50, help="Máximo de propiedades a listar (si no usás --ids). 0 = todas.")
         parser.add_argument("--ids", type=str, help='IDs puntuales, p.ej.: "1,2,10-20".')
         parser.add_argument("--related", action="store_true", help="Incluir imágenes relacionadas (galería).")
         parser.add_argument("--csv", type=str, help="Ruta a CSV para exportar filas (opcional).")
+        parser.add_argument("--chunk-size", type=int, default=500,
+                            help="Propiedades por lote (se leen con .iterator() y se escriben al CSV a medida).")
+        parser.add_argument("--exists", choices=["pool", "list", "none"], default="pool",
+                            help="Cómo verificar existencia: 'pool' (exists() en paralelo), 'list' (un listado "
+                                 "por carpeta y búsqueda en memoria; conviene para muchas propiedades) o 'none'.")
+        parser.add_argument("--workers", type=int, default=8, help="Threads para --exists pool.")
+        parser.add_argument("--quiet", action="store_true", help="No imprimir una línea por archivo (sólo el resumen).")
 
     def handle(self, *args, **opts):
         _print_env()
+        t0 = time.perf_counter()
 
-        qs = Propiedad.objects.all().order_by("id")
+        qs = Propiedad.objects.only("id", "titulo", "imagen_principal").order_by("id")
         if opts.get("ids"):
             ids = _parse_ids(opts["ids"])
             qs = qs.filter(id__in=ids)
-        else:
+        elif opts["limit"]:
             qs = qs[: opts["limit"]]
 
         if opts["related"]:
             qs = qs.prefetch_related("imagenes")
 
-        props = list(qs)
-        total_files = 0
+        pool = None
+        if opts["exists"] == "pool":
+            pool = ThreadPoolExecutor(max_workers=max(1, opts["workers"]))
+            check = _exists_pool(pool)
+        elif opts["exists"] == "list":
+            dirs = ["propiedades/imagenes_principal"] + (["propiedades/galeria"] if opts["related"] else [])
+            check = _exists_list(dirs)
+        else:
+            check = lambda names: [None] * len(names)
 
         writer = None
         csvfile = None
@@ -68,53 +124,86 @@ class Command(BaseCommand):
             writer = csv.writer(csvfile)
             writer.writerow([
                 "prop_id", "titulo", "es_principal",
-                "file_name", "exists", "url_o_error"
+                "file_name", "exists", "url_o_error", "error"
             ])
 
-        for p in props:
-            print(f"Propiedad #{p.id} — {p.titulo}")
-            # Imagen principal
-            if p.imagen_principal:
-                name = p.imagen_principal.name
-                try:
-                    exists = default_storage.exists(name)
-                except Exception:
-                    exists = False
-                try:
-                    url = default_storage.url(name)
-                except Exception as e:
-                    url = f"ERROR_URL: {e}"
-                print(f"  - imagen_principal: name='{name}' | exists={exists} | url={url}")
-                if writer:
-                    writer.writerow([p.id, p.titulo, True, name, exists, url])
-                total_files += 1
-            else:
-                print("  - imagen_principal: (sin asignar)")
-                if writer:
-                    writer.writerow([p.id, p.titulo, True, "", False, ""])
-
-            # Relacionadas
-            if opts["related"]:
-                for rel in getattr(p, "imagenes").all():
-                    name = rel.imagen.name
-                    try:
-                        exists = default_storage.exists(name)
-                    except Exception:
-                        exists = False
-                    try:
-                        url = default_storage.url(name)
-                    except Exception as e:
-                        url = f"ERROR_URL: {e}"
-                    print(f"  - [rel:PropiedadImagen#{rel.id}] imagen: name='{name}' | exists={exists} | url={url}")
+        total_props = 0
+        total_files = 0
+        faltantes = 0
+        errores = 0
+        quiet = opts["quiet"]
+        chunk = max(1, opts["chunk_size"])
+
+        def _lotes():
+            lote = []
+            for p in qs.iterator(chunk_size=chunk):
+                lote.append(p)
+                if len(lote) >= chunk:
+                    yield lote
+                    lote = []
+            if lote:
+                yield lote
+
+        try:
+            for lote in _lotes():
+                # (prop, es_principal, etiqueta, name) de todo el lote: un solo check concurrente
+                filas = []
+                for p in lote:
+                    if p.imagen_principal:
+                        filas.append((p, True, "imagen_principal", p.imagen_principal.name))
+                    else:
+                        filas.append((p, True, "imagen_principal", ""))
+                    if opts["related"]:
+                        for rel in p.imagenes.all():
+                            filas.append((p, False, f"[rel:PropiedadImagen#{rel.id}] imagen", rel.imagen.name))
+
+                names = [f[3] for f in filas if f[3]]
+                existe = dict(zip(names, check(names)))
+
+                actual = None
+                for p, es_principal, etiqueta, name in filas:
+                    if not quiet and p is not actual:
+                        if actual is not None:
+                            print()
+                        print(f"Propiedad #{p.id} — {p.titulo}")
+                        actual = p
+                    if not name:
+                        if not quiet:
+                            print("  - imagen_principal: (sin asignar)")
+                        if writer:
+                            writer.writerow([p.id, p.titulo, True, "", False, "", ""])
+                        continue
+                    exists = existe.get(name)
+                    error = ""
+                    if isinstance(exists, Exception):
+                        exists, error = "error", f"{type(exists).__name__}: {exists}"
+                        errores += 1
+                    url = _url(name)
+                    if not quiet:
+                        print(f"  - {etiqueta}: name='{name}' | exists={exists} | url={url}"
+                              + (f" | {error}" if error else ""))
                     if writer:
-                        writer.writerow([p.id, p.titulo, False, name, exists, url])
+                        writer.writerow([p.id, p.titulo, es_principal, name, exists, url, error])
                     total_files += 1
-
-            print()
-
+                    faltantes += exists is False
+                if not quiet and actual is not None:
+                    print()
+
+                total_props += len(lote)
+                if csvfile:
+                    csvfile.flush()
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            if csvfile:
+                csvfile.close()
+
+        dt = time.perf_counter() - t0
         if writer:
-            csvfile.close()
             print(f"CSV escrito en {opts['csv']} ({total_files} filas)")
 
-        print(f"Propiedades listadas: {len(props)}")
-        print(f"Registros de archivos inspeccionados: {total_files}")
+        print(f"Propiedades listadas: {total_props}")
+        print(f"Registros de archivos inspeccionados: {total_files} (faltantes: {faltantes}, "
+              f"sin verificar por error: {errores})")
+        print(f"Tiempo: {dt:.2f}s | {total_props / dt:.0f} propiedades/s | {total_files / dt:.0f} archivos/s "
+              f"(exists: {opts['exists']}{', workers=' + str(opts['workers']) if opts['exists'] == 'pool' else ''})")
@@ -0,0 +1,48 @@
+# propiedades/management/commands/rebuild_search_vector.py
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Max, Min
+
+from propiedades.fulltext import SEARCH_VECTOR_SQL
+from propiedades.models import Propiedad
+
+
+class Command(BaseCommand):
+    help = "Recalcula Propiedad.search_vector por lotes de IDs (sólo PostgreSQL)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="IDs por lote (default 1000).")
+        parser.add_argument("--only-missing", action="store_true", help="Sólo filas con search_vector NULL.")
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "postgresql":
+            self.stdout.write("search_vector sólo se usa en PostgreSQL; nada que hacer.")
+            return
+
+        rng = Propiedad.objects.aggregate(lo=Min("id"), hi=Max("id"))
+        if rng["lo"] is None:
+            self.stdout.write("No hay propiedades.")
+            return
+
+        size = max(1, opts["batch_size"])
+        where_extra = " AND search_vector IS NULL" if opts["only_missing"] else ""
+        sql = (
+            f"UPDATE propiedades_propiedad SET search_vector = {SEARCH_VECTOR_SQL.format(p='')} "
+            f"WHERE id >= %s AND id < %s{where_extra}"
+        )
+
+        t0 = time.perf_counter()
+        total = 0
+        # Un UPDATE (y un commit, en autocommit) por lote: no se bloquea la tabla entera
+        for lo in range(rng["lo"], rng["hi"] + 1, size):
+            with connection.cursor() as cur:
+                cur.execute(sql, [lo, lo + size])
+                total += cur.rowcount
+            self.stdout.write(f"  ids {lo}–{lo + size - 1}: {total} filas actualizadas")
+
+        dt = time.perf_counter() - t0
+        self.stdout.write(self.style.SUCCESS(f"search_vector recalculado en {total} filas ({dt:.1f}s)."))
@@ -0,0 +1,121 @@
+# propiedades/management/commands/reconciliar_media.py
+from __future__ import annotations
+
+import posixpath
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from propiedades.imagenes import base_de_variante
+from propiedades.lotes import aplicar
+from propiedades.media import delete_many, walk_media_prefix
+from propiedades.models import Propiedad, PropiedadImagen
+from propiedades.signals import sin_tocar_propiedad
+
+PREFIX = "propiedades"
+
+
+def _referenciados() -> set:
+    """Nombres usados por la DB (imagen_principal + galería), sin instanciar modelos."""
+    refs = set(
+        Propiedad.objects.exclude(imagen_principal="").exclude(imagen_principal__isnull=True)
+        .values_list("imagen_principal", flat=True).iterator(chunk_size=5000)
+    )
+    refs.update(PropiedadImagen.objects.values_list("imagen", flat=True).iterator(chunk_size=5000))
+    refs.discard("")
+    return refs
+
+
+def _chunks(seq, size=1000):
+    seq = list(seq)
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara los archivos bajo 'propiedades/' del storage con lo referenciado en la DB: "
+        "reporta (y con --yes corrige) archivos huérfanos y referencias a archivos inexistentes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--borrar-huerfanos", action="store_true",
+                            help="Borra archivos que ninguna fila referencia (incluye sus variantes).")
+        parser.add_argument("--limpiar-faltantes", action="store_true",
+                            help="imagen_principal vacía y borra filas de galería cuyo archivo no existe.")
+        parser.add_argument("--yes", action="store_true", help="Ejecuta los cambios (si no, solo muestra).")
+        parser.add_argument("--workers", type=int, default=4, help="Borrados concurrentes (storage no S3).")
+        parser.add_argument("--mostrar", type=int, default=20, help="Cuántos ejemplos listar de cada tipo.")
+
+    def _muestra(self, titulo, nombres, n):
+        self.stdout.write(f"{titulo}: {len(nombres)}")
+        for name in sorted(nombres)[:n]:
+            self.stdout.write(f"  - {name}")
+        if len(nombres) > n:
+            self.stdout.write(f"  … y {len(nombres) - n} más")
+
+    def handle(self, *args, **opts):
+        t0 = time.perf_counter()
+        archivos = set(walk_media_prefix(PREFIX))
+        refs = _referenciados()
+        if not archivos and any(r.startswith(f"{PREFIX}/") for r in refs):
+            # Un listado vacío con la DB llena es casi seguro un error de storage
+            # (bucket, prefijo, credenciales): todo contaría como faltante.
+            raise CommandError(
+                f"El storage no lista ningún archivo bajo '{PREFIX}/' pero la DB referencia "
+                f"{len(refs)}: revisá la configuración del storage. No se cambió nada."
+            )
+        self.stdout.write(
+            f"Storage: {len(archivos)} archivos bajo '{PREFIX}/' | DB: {len(refs)} referencias "
+            f"({time.perf_counter() - t0:.1f}s)"
+        )
+
+        # Una variante (base__w480.webp) es de quien tenga la misma base
+        bases = {posixpath.splitext(r)[0] for r in refs}
+        huerfanos = {
+            f for f in archivos - refs
+            if base_de_variante(f) not in bases
+        }
+        faltantes = {r for r in refs if r.startswith(f"{PREFIX}/") and r not in archivos}
+
+        self._muestra("Huérfanos (sin fila en la DB)", huerfanos, opts["mostrar"])
+        self._muestra("Faltantes (fila apunta a un archivo inexistente)", faltantes, opts["mostrar"])
+
+        if not (opts["borrar_huerfanos"] or opts["limpiar_faltantes"]):
+            return
+        if not opts["yes"]:
+            self.stdout.write("\nModo vista previa (no se borra nada). Añadí --yes para ejecutar.")
+            return
+
+        if opts["borrar_huerfanos"] and huerfanos:
+            # Re-chequeo: una subida que se confirmó mientras listábamos ya no es huérfana
+            recien = set()
+            for lote in _chunks(huerfanos):
+                recien.update(Propiedad.objects.filter(imagen_principal__in=lote).values_list("imagen_principal", flat=True))
+                recien.update(PropiedadImagen.objects.filter(imagen__in=lote).values_list("imagen", flat=True))
+            borrados = delete_many(sorted(huerfanos - recien), workers=opts["workers"])
+            self.stdout.write(self.style.SUCCESS(f"Archivos huérfanos borrados: {borrados}"))
+
+        if opts["limpiar_faltantes"] and faltantes:
+            props = imgs = 0
+            tocadas = set()
+            with transaction.atomic():
+                for lote in _chunks(faltantes):
+                    principal = Propiedad.objects.filter(imagen_principal__in=lote)
+                    tocadas.update(principal.values_list("pk", flat=True))
+                    props += principal.update(imagen_principal="")
+                    # sin _tocar_propiedad: haría un UPDATE del padre y subiría
+                    # la versión de búsquedas por cada fila borrada
+                    galeria = PropiedadImagen.objects.filter(imagen__in=lote)
+                    tocadas.update(galeria.values_list("propiedad_id", flat=True))
+                    with sin_tocar_propiedad():
+                        imgs += galeria.delete()[0]
+                # fecha_actualizacion de las afectadas (cards, ETag, búsquedas
+                # cacheadas) en un UPDATE, invalidación una vez (ver lotes.py)
+                aplicar(Propiedad.objects.filter(pk__in=sorted(tocadas)))
+            self.stdout.write(self.style.SUCCESS(
+                f"Propiedades sin imagen principal: {props} | filas de galería borradas: {imgs}"
+            ))
+
+        self.stdout.write(f"Listo ({time.perf_counter() - t0:.1f}s)")
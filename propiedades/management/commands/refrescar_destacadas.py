@@ -0,0 +1,36 @@
+# propiedades/management/commands/refrescar_destacadas.py
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from propiedades.cache import DESTACADAS_LOCK, propiedades_cache, refrescar_destacadas
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-arma el bloque de destacadas de la home en el cache. Pensado para cron "
+        "(p.ej. cada minuto): los requests nunca esperan el armado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cada", type=int, default=0,
+                            help="Repetir cada N segundos (sin cron); 0 = una sola vez.")
+
+    def handle(self, *args, **opts):
+        cache = propiedades_cache()
+        while True:
+            t0 = time.perf_counter()
+            # Mismo lock que el refresco en segundo plano: no se pisan
+            if cache.add(DESTACADAS_LOCK, 1, 60):
+                try:
+                    html = refrescar_destacadas()
+                finally:
+                    cache.delete(DESTACADAS_LOCK)
+                self.stdout.write(f"Destacadas: {len(html)} bytes ({(time.perf_counter() - t0) * 1000:.1f} ms)")
+            else:
+                self.stdout.write("Destacadas: ya hay un refresco en curso.")
+            if opts["cada"] <= 0:
+                break
+            time.sleep(opts["cada"])
@@ -4,17 +4,22 @@ from __future__ import annotations
 import os
 import re
 import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from decimal import Decimal
 from typing import List, Dict, Tuple
 
 from django.conf import settings
-from django.core.files.base import ContentFile
+from django.core.files import File
 from django.core.files.storage import default_storage
 from django.core.management.base import BaseCommand
 from django.db import transaction, DataError, connection
 from django.utils import timezone
 
+from propiedades.codigos import codigos_libres
+from propiedades.media import delete_many, walk_media_prefix
+from propiedades.imagenes import generar_variantes_seguro, variantes_al_guardar
 from propiedades.models import Propiedad, PropiedadImagen
 
 
@@ -33,54 +38,23 @@ def _print_env(src: Path):
     print(f"Fecha: {timezone.now().isoformat()} (TZ={settings.TIME_ZONE})")
     print(f"DB ENGINE: {engine} | NAME={name}")
     print(f"USE_S3_MEDIA={getattr(settings, 'USE_S3_MEDIA', False)} | STORAGE={default_storage.__class__.__name__}")
-    print(f"Origen: {str(src)}")
+    print(f"Origen: {str(src) if src else '(sin imágenes)'}")
 
 
-def _walk_media_prefix(prefix: str) -> List[str]:
-    """
-    Lista (recursivo) de archivos bajo un prefijo dentro del storage por defecto.
-    Funciona tanto con FileSystemStorage como con S3Boto3Storage.
-    """
-    files: List[str] = []
-    pending: List[str] = [prefix.rstrip("/") + "/"]
-    while pending:
-        base = pending.pop()
-        try:
-            dirs, fls = default_storage.listdir(base)
-        except Exception:
-            # Si el directorio no existe, salir silenciosamente
-            continue
-        for d in dirs:
-            pending.append(f"{base}{d}/")
-        for f in fls:
-            files.append(f"{base}{f}")
-    return files
-
-
-def _purge_media_under_propiedades() -> int:
+def _purge_media_under_propiedades(workers: int = 4) -> int:
     """Elimina TODO archivo bajo 'propiedades/' del storage."""
-    prefix = "propiedades"
-    files = _walk_media_prefix(prefix)
-    deleted = 0
-    for f in files:
-        try:
-            default_storage.delete(f)
-            deleted += 1
-        except Exception:
-            pass
-    return deleted
+    return delete_many(walk_media_prefix("propiedades"), workers=workers)
 
 
 def _copy_file_to_storage(src_file: Path, dest_relpath: str) -> str:
     """
     Copia un archivo desde el filesystem local (src_file) al storage por defecto,
     guardándolo con la ruta relativa dest_relpath. Retorna la ruta final guardada.
+    Se pasa el file handle (streaming): S3 lo sube por partes sin leerlo entero.
     """
     with src_file.open("rb") as fh:
-        data = fh.read()
-    # default_storage.save devuelve el nombre final (puede variar si existe)
-    final_name = default_storage.save(dest_relpath, ContentFile(data))
-    return final_name
+        # default_storage.save devuelve el nombre final (puede variar si existe)
+        return default_storage.save(dest_relpath, File(fh, name=src_file.name))
 
 
 def _chunked(lst: List[Path], size: int) -> List[List[Path]]:
@@ -158,33 +132,117 @@ def _choose(seq: List[str]) -> str:
     return random.choice(seq)
 
 
+# Datos base para seeding
+LOCALIDADES = ["Posadas", "Oberá", "Garupá", "Eldorado", "Iguazú", "Encarnación"]
+PROVINCIAS = ["Misiones", "Buenos Aires", "Córdoba", "Santa Fe", "Mendoza"]
+AMEN_POOL = ["pileta", "parrilla", "cochera", "parque", "gimnasio", "sum", "seguridad 24h"]
+
+
+def _synthetic_kwargs(idx: int) -> dict:
+    """Campos sintéticos para la propiedad número idx."""
+    tipos = [c[0] for c in Propiedad.TIPO_PROPIEDAD_CHOICES]
+    tipos_oper = [c[0] for c in Propiedad.TIPO_OPERACION_CHOICES]
+    tipos_masc = [c[0] for c in Propiedad.TIPO_MASCOTA_CHOICES]
+    estados_pub = [c[0] for c in Propiedad.ESTADO_PUBLICACION_CHOICES]
+
+    tipo = _choose(tipos)
+    tipo_op = _choose(tipos_oper)
+    acepta = _rand_bool(0.4)
+    tipo_masc = "no_especificado" if not acepta else _choose([x for x in tipos_masc if x != "no_especificado"])
+    estado = _choose(estados_pub)
+
+    titulo = f"Propiedad #{idx} — {_choose(['Casa luminosa', 'Depto con balcón', 'Galpón', 'Terreno ideal', 'Local sobre avenida'])}"
+    descripcion = "Propiedad de prueba generada automáticamente para verificación de flujo."
+    direccion = f"Calle {random.choice(list('ABCDE'))} {random.randint(100, 999)}"
+    localidad = _choose(LOCALIDADES)
+    provincia = _choose(PROVINCIAS)
+
+    precio_usd = None
+    precio_pesos = None
+    if tipo_op == "venta":
+        precio_usd = _rand_price(25000, 250000, 5000)
+    else:
+        precio_pesos = _rand_price(120000, 1500000, 10000)
+
+    return dict(
+        titulo=titulo[:200],
+        descripcion=descripcion,
+        tipo=tipo,                       # <= 50
+        tipo_operacion=tipo_op,          # <= 50
+        precio_usd=precio_usd,
+        precio_pesos=precio_pesos,
+        direccion=direccion[:255],
+        localidad=localidad[:100],
+        provincia=provincia[:100],
+        pais="Argentina",
+        acepta_mascotas=acepta,
+        tipo_mascota_permitida=tipo_masc,    # <= 20
+        metros_cuadrados_total=Decimal(random.randint(100, 800)),
+        metros_cuadrados_cubierta=Decimal(random.randint(30, 400)),
+        dormitorios=random.choice([1, 2, 3, 4, None]),
+        banios=random.choice([1, 2, 3, None]),
+        cocheras=random.choice([0, 1, 2, None]),
+        antiguedad=random.choice([0, 2, 5, 10, 20, None]),
+        amenidades=", ".join(sorted(set(random.sample(AMEN_POOL, k=random.randint(2, 4))))),
+        is_destacada=_rand_bool(0.2),
+        estado_publicacion=estado,           # <= 20
+    )
+
+
+def _upload(src_file: Path, dest_relpath: str) -> str:
+    """
+    Tarea del pool: sube el archivo y, si corresponde, genera sus variantes
+    WebP/JPEG acá mismo (en paralelo). La marca en cache hace que el signal
+    post_save no las vuelva a generar al confirmar.
+    """
+    saved = _copy_file_to_storage(src_file, dest_relpath)
+    if variantes_al_guardar():
+        generar_variantes_seguro(saved)
+    return saved
+
+
 class Command(BaseCommand):
     help = "Borra propiedades existentes y vuelve a cargarlas a partir de imágenes locales (copiando al storage)."
 
     def add_arguments(self, parser):
-        parser.add_argument("--src", required=True, help="Carpeta de origen con imágenes (puede contener subcarpetas).")
+        parser.add_argument("--src", help="Carpeta de origen con imágenes (puede contener subcarpetas). "
+                                          "Obligatoria salvo con --bulk.")
         parser.add_argument("--yes", action="store_true", help="Confirma el borrado/creación (si no, solo muestra).")
         parser.add_argument("--purge-media", action="store_true", help="Borra archivos bajo 'propiedades/' del storage.")
         parser.add_argument("--limit", type=int, default=50, help="Cantidad máxima de grupos a procesar.")
         parser.add_argument("--chunk", type=int, default=4, help="Tamaño de grupo cuando se usa modo 'chunk'.")
         parser.add_argument("--mode", choices=["auto", "subdirs", "prefix", "chunk"], default="auto",
                             help="Estrategia de agrupación. Por defecto 'auto'.")
+        parser.add_argument("--workers", type=int, default=4,
+                            help="Subidas/borrados concurrentes al storage (1 = secuencial).")
+        parser.add_argument("--bulk", action="store_true",
+                            help="Carga masiva con bulk_create (para pruebas de carga). Las imágenes de --src "
+                                 "se suben una sola vez y se reparten entre las propiedades.")
+        parser.add_argument("--count", type=int, default=None,
+                            help="Con --bulk: cantidad de propiedades a crear (default: --limit).")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Con --bulk: filas por INSERT.")
 
     def handle(self, *args, **opts):
-        src = Path(opts["src"]).expanduser()
-        if not src.exists() or not src.is_dir():
+        src = Path(opts["src"]).expanduser() if opts["src"] else None
+        if src is None and not opts["bulk"]:
+            self.stderr.write(self.style.ERROR("Falta --src (sólo es opcional con --bulk)."))
+            return
+        if src is not None and (not src.exists() or not src.is_dir()):
             self.stderr.write(self.style.ERROR(f"Origen no válido: {src}"))
             return
 
         _print_env(src)
 
-        groups = _discover_groups(src, mode=opts["mode"], chunk=opts["chunk"])
+        groups = _discover_groups(src, mode=opts["mode"], chunk=opts["chunk"]) if src else []
         total_imgs = sum(len(g) for g in groups)
         print(f"Agrupación: {opts['mode']}")
         print(f"Total grupos detectados: {len(groups)} (se usarán {min(opts['limit'], len(groups))})")
         print(f"Total imágenes consideradas: {total_imgs}")
         print(f"Galería: usando modelo {PropiedadImagen.__module__}.{PropiedadImagen.__name__}")
 
+        if opts["bulk"]:
+            print(f"Modo bulk: {opts['count'] or opts['limit']} propiedades en lotes de {opts['batch_size']}")
+
         if not opts["yes"]:
             print("\nModo vista previa (no se borra ni crea nada). Añadí --yes para ejecutar.")
             if groups:
@@ -195,11 +253,13 @@ class Command(BaseCommand):
             return
 
         to_use = groups[:opts["limit"]]
+        workers = max(1, opts["workers"])
+        t0 = time.perf_counter()
 
         # Purga media opcional
         if opts["purge_media"]:
             print("Eliminando archivos bajo 'propiedades/' en storage…")
-            deleted = _purge_media_under_propiedades()
+            deleted = _purge_media_under_propiedades(workers=workers)
             print(f"Archivos eliminados: {deleted}")
 
         # Borrado de datos
@@ -208,104 +268,138 @@ class Command(BaseCommand):
             deleted, _ = Propiedad.objects.all().delete()
             print(f"Propiedades eliminadas: {deleted}")
 
-        # Datos base para seeding
-        localidades = ["Posadas", "Oberá", "Garupá", "Eldorado", "Iguazú", "Encarnación"]
-        provincias = ["Misiones", "Buenos Aires", "Córdoba", "Santa Fe", "Mendoza"]
-        amen_pool = ["pileta", "parrilla", "cochera", "parque", "gimnasio", "sum", "seguridad 24h"]
-
-        tipos = [c[0] for c in Propiedad.TIPO_PROPIEDAD_CHOICES]
-        tipos_oper = [c[0] for c in Propiedad.TIPO_OPERACION_CHOICES]
-        tipos_masc = [c[0] for c in Propiedad.TIPO_MASCOTA_CHOICES]
-        estados_pub = [c[0] for c in Propiedad.ESTADO_PUBLICACION_CHOICES]
+        if opts["bulk"]:
+            self._handle_bulk(to_use, opts["count"] or opts["limit"], max(1, opts["batch_size"]), workers, t0)
+            return
 
         created_props = 0
         created_imgs = 0
+        subidos = 0
+        errores = 0
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # 1) Filas + encolado de subidas: la red trabaja mientras se crean las siguientes
+            pendientes = []
+            for idx, group in enumerate(to_use, start=1):
+                if not group:
+                    continue
+
+                kwargs = _synthetic_kwargs(idx)
+                try:
+                    prop = Propiedad.objects.create(**kwargs)
+                except DataError as e:
+                    # Mensaje claro si vuelve a pasar varchar(6), mostrando longitudes
+                    print("ERROR DataError al crear Propiedad. Valores que se intentaron grabar:")
+                    for k, v in kwargs.items():
+                        if isinstance(v, str):
+                            print(f" - {k}: '{v}' (len={len(v)})")
+                        else:
+                            print(f" - {k}: {v}")
+                    print("Excepción:", e)
+                    continue
+                created_props += 1
+
+                # imagen principal = primer archivo del grupo; resto a galería
+                first = group[0]
+                main = pool.submit(
+                    _upload, first, f"propiedades/imagenes_principal/{prop.pk}_principal{first.suffix.lower()}"
+                )
+                galeria = [
+                    pool.submit(_upload, pic, f"propiedades/galeria/{prop.pk}_{i:02d}{pic.suffix.lower()}")
+                    for i, pic in enumerate(group[1:], start=1)
+                ]
+                pendientes.append((prop, main, galeria))
+
+            # 2) Cierre por propiedad: transacción corta, sólo escrituras a la DB
+            for prop, main, galeria in pendientes:
+                saved_gal = []
+                for fut in galeria:
+                    try:
+                        saved_gal.append(fut.result())
+                        subidos += 1
+                    except Exception as e:
+                        errores += 1
+                        print(f"ERROR subiendo galería de #{prop.pk}: {e}")
+                try:
+                    saved_main = main.result()
+                    subidos += 1
+                except Exception as e:
+                    errores += 1
+                    saved_main = None
+                    print(f"ERROR subiendo imagen principal de #{prop.pk}: {e}")
 
-        for idx, group in enumerate(to_use, start=1):
-            if not group:
-                continue
+                with transaction.atomic():
+                    if saved_main:
+                        # asignar al ImageField (guardar sólo el path relativo)
+                        prop.imagen_principal.name = saved_main
+                        prop.save(update_fields=["imagen_principal"])
+                    PropiedadImagen.objects.bulk_create([
+                        PropiedadImagen(propiedad=prop, imagen=name, descripcion_corta="", orden=i)
+                        for i, name in enumerate(saved_gal)
+                    ])
+                    created_imgs += len(saved_gal)
+
+        dt = time.perf_counter() - t0
+        print(f"\nPropiedades creadas: {created_props}")
+        print(f"Imágenes de galería creadas: {created_imgs}")
+        print(f"Archivos subidos: {subidos} | errores: {errores} | workers: {workers} | {dt:.1f}s")
+        print("Listo ✅")
 
-            # Datos sintéticos
-            tipo = _choose(tipos)
-            tipo_op = _choose(tipos_oper)
-            acepta = _rand_bool(0.4)
-            tipo_masc = "no_especificado" if not acepta else _choose([x for x in tipos_masc if x != "no_especificado"])
-            estado = _choose(estados_pub)
-
-            titulo = f"Propiedad #{idx} — {_choose(['Casa luminosa', 'Depto con balcón', 'Galpón', 'Terreno ideal', 'Local sobre avenida'])}"
-            descripcion = "Propiedad de prueba generada automáticamente para verificación de flujo."
-            direccion = f"Calle {random.choice(list('ABCDE'))} {random.randint(100, 999)}"
-            localidad = _choose(localidades)
-            provincia = _choose(provincias)
-
-            precio_usd = None
-            precio_pesos = None
-            if tipo_op == "venta":
-                precio_usd = _rand_price(25000, 250000, 5000)
-            else:
-                precio_pesos = _rand_price(120000, 1500000, 10000)
-
-            kwargs = dict(
-                titulo=titulo[:200],
-                descripcion=descripcion,
-                tipo=tipo,                       # <= 50
-                tipo_operacion=tipo_op,          # <= 50
-                precio_usd=precio_usd,
-                precio_pesos=precio_pesos,
-                direccion=direccion[:255],
-                localidad=localidad[:100],
-                provincia=provincia[:100],
-                pais="Argentina",
-                acepta_mascotas=acepta,
-                tipo_mascota_permitida=tipo_masc,    # <= 20
-                metros_cuadrados_total=Decimal(random.randint(100, 800)),
-                metros_cuadrados_cubierta=Decimal(random.randint(30, 400)),
-                dormitorios=random.choice([1, 2, 3, 4, None]),
-                banios=random.choice([1, 2, 3, None]),
-                cocheras=random.choice([0, 1, 2, None]),
-                antiguedad=random.choice([0, 2, 5, 10, 20, None]),
-                amenidades=", ".join(sorted(set(random.sample(amen_pool, k=random.randint(2, 4))))),
-                is_destacada=_rand_bool(0.2),
-                estado_publicacion=estado,           # <= 20
-            )
+    def _handle_bulk(self, groups, count, batch_size, workers, t0):
+        """
+        Carga masiva: sube cada grupo de imágenes una vez (en paralelo), reserva
+        los códigos de una vez (propiedades.codigos) y crea Propiedad/PropiedadImagen con
+        bulk_create por lotes. Sin signals: las variantes se generan al subir.
+        """
+        # 1) Imágenes compartidas: [(principal, [galería...]), ...]
+        media = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futs = []
+            for g, group in enumerate(groups, start=1):
+                if not group:
+                    continue
+                first = group[0]
+                main = pool.submit(
+                    _upload, first, f"propiedades/imagenes_principal/seed_{g:04d}_principal{first.suffix.lower()}"
+                )
+                galeria = [
+                    pool.submit(_upload, pic, f"propiedades/galeria/seed_{g:04d}_{i:02d}{pic.suffix.lower()}")
+                    for i, pic in enumerate(group[1:], start=1)
+                ]
+                futs.append((main, galeria))
+            for main, galeria in futs:
+                media.append((main.result(), [f.result() for f in galeria]))
+        print(f"Imágenes subidas: {sum(1 + len(gal) for _, gal in media)} ({time.perf_counter() - t0:.1f}s)")
+
+        # 2) Propiedades
+        codigos = codigos_libres(count)
+        created_props = 0
+        created_imgs = 0
+        for start in range(0, count, batch_size):
+            objs = []
+            for i in range(start, min(start + batch_size, count)):
+                prop = Propiedad(codigo_unico=codigos[i], **_synthetic_kwargs(i + 1))
+                if media:
+                    prop.imagen_principal.name = media[i % len(media)][0]
+                objs.append(prop)
 
             try:
                 with transaction.atomic():
-                    prop = Propiedad.objects.create(**kwargs)
-                    created_props += 1
-
-                    # imagen principal = primer archivo del grupo
-                    first = group[0]
-                    ext = first.suffix.lower()
-                    dest_main = f"propiedades/imagenes_principal/{prop.pk}_principal{ext}"
-                    saved_main = _copy_file_to_storage(first, dest_main)
-                    # asignar al ImageField (guardar sólo el path relativo)
-                    prop.imagen_principal.name = saved_main
-                    prop.save(update_fields=["imagen_principal"])
-
-                    # resto a galería
-                    for pic in group[1:]:
-                        ext2 = pic.suffix.lower()
-                        dest_gal = f"propiedades/galeria/{prop.pk}_{random.randint(1000,9999)}{ext2}"
-                        saved_gal = _copy_file_to_storage(pic, dest_gal)
-                        PropiedadImagen.objects.create(
-                            propiedad=prop,
-                            imagen=saved_gal,
-                            descripcion_corta=""
-                        )
-                        created_imgs += 1
-
+                    Propiedad.objects.bulk_create(objs, batch_size=batch_size)
+                    imgs = [
+                        PropiedadImagen(propiedad=prop, imagen=name, descripcion_corta="", orden=j)
+                        for i, prop in enumerate(objs, start=start) if media
+                        for j, name in enumerate(media[i % len(media)][1])
+                    ]
+                    PropiedadImagen.objects.bulk_create(imgs, batch_size=batch_size)
             except DataError as e:
-                # Mensaje claro si vuelve a pasar varchar(6), mostrando longitudes
-                print("ERROR DataError al crear Propiedad. Valores que se intentaron grabar:")
-                for k, v in kwargs.items():
-                    if isinstance(v, str):
-                        print(f" - {k}: '{v}' (len={len(v)})")
-                    else:
-                        print(f" - {k}: {v}")
-                print("Excepción:", e)
+                print(f"ERROR DataError en el lote {start}–{start + len(objs) - 1}: {e}")
                 continue
+            created_props += len(objs)
+            created_imgs += len(imgs)
+            print(f"  {created_props}/{count} ({time.perf_counter() - t0:.1f}s)")
 
         print(f"\nPropiedades creadas: {created_props}")
         print(f"Imágenes de galería creadas: {created_imgs}")
+        print(f"Tiempo total: {time.perf_counter() - t0:.1f}s")
         print("Listo ✅")
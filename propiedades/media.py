@@ -0,0 +1,82 @@
+# propiedades/media.py
+"""
+Operaciones masivas sobre el storage de media (FileSystemStorage o S3):
+listados por prefijo y borrados por lotes. Las usan los comandos de
+seed, reporte y reconciliación.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from django.core.files.storage import default_storage
+
+
+def s3_bucket():
+    """
+    Si el storage por defecto es S3 (django-storages), devuelve (bucket, location)
+    para usar la API por lotes; si no (FileSystemStorage), None.
+    """
+    bucket = getattr(default_storage, "bucket", None)
+    if bucket is None:
+        return None
+    location = (getattr(default_storage, "location", "") or "").strip("/")
+    return bucket, location
+
+
+def walk_media_prefix(prefix: str) -> List[str]:
+    """
+    Lista (recursivo) de archivos bajo un prefijo dentro del storage por defecto.
+    Funciona tanto con FileSystemStorage como con S3Boto3Storage; en S3 usa un
+    único LIST paginado por prefijo en vez de un listdir por "carpeta".
+    Un error del listado se propaga: una lista vacía por error haría pasar
+    todo por "faltante" (reconciliar_media) o "inexistente" (props_report).
+    """
+    s3 = s3_bucket()
+    if s3 is not None:
+        bucket, location = s3
+        full = f"{location}/{prefix.strip('/')}/" if location else f"{prefix.strip('/')}/"
+        cut = len(location) + 1 if location else 0
+        return [obj.key[cut:] for obj in bucket.objects.filter(Prefix=full)]
+
+    files: List[str] = []
+    pending: List[str] = [prefix.rstrip("/") + "/"]
+    while pending:
+        base = pending.pop()
+        try:
+            dirs, fls = default_storage.listdir(base)
+        except FileNotFoundError:
+            # El prefijo todavía no existe: no hay archivos
+            continue
+        for d in dirs:
+            pending.append(f"{base}{d}/")
+        for f in fls:
+            files.append(f"{base}{f}")
+    return files
+
+
+def delete_many(names: List[str], workers: int = 4) -> int:
+    """
+    Borra muchos archivos del storage. En S3: delete_objects de a 1000 claves
+    por request; en otros storages, delete() en un pool de threads.
+    """
+    if not names:
+        return 0
+    s3 = s3_bucket()
+    if s3 is not None:
+        bucket, location = s3
+        client = bucket.meta.client
+        deleted = 0
+        for i in range(0, len(names), 1000):
+            keys = [{"Key": f"{location}/{n}" if location else n} for n in names[i:i + 1000]]
+            resp = client.delete_objects(Bucket=bucket.name, Delete={"Objects": keys, "Quiet": True})
+            deleted += len(keys) - len(resp.get("Errors", []))
+        return deleted
+
+    def _one(name):
+        try:
+            default_storage.delete(name)
+            return 1
+        except Exception:
+            return 0
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return sum(pool.map(_one, names))
@@ -0,0 +1,150 @@
+# propiedades/middleware.py
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends.django import Template as _BackendTemplate
+
+logger = logging.getLogger("propiedades.metricas")
+
+# Métricas del request en curso (None fuera de una vista instrumentada)
+_actual = ContextVar("propiedades_metricas", default=None)
+
+
+class _Metricas:
+    __slots__ = ("queries", "sql", "template", "_nivel")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.template = 0.0
+        self._nivel = 0
+
+
+def _medir_sql(execute, sql, params, many, context):
+    m = _actual.get()
+    if m is None:
+        return execute(sql, params, many, context)
+    t0 = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        m.queries += 1
+        m.sql += time.perf_counter() - t0
+
+
+def _instalar_en_conexion(connection, **kwargs):
+    if _medir_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir_sql)
+
+
+def _instalar_medicion_sql():
+    """
+    execute_wrapper permanente en todas las conexiones (las de cualquier
+    thread, incluidas las que usa el ORM async vía sync_to_async). Fuera de
+    un request medido sólo cuesta leer la ContextVar, que asgiref copia al
+    thread de la consulta.
+    """
+    for conn in connections.all(initialized_only=True):
+        _instalar_en_conexion(conn)
+    connection_created.connect(_instalar_en_conexion, dispatch_uid="propiedades_metricas_sql")
+
+
+def _instalar_medicion_templates():
+    """
+    Envuelve Template.render del backend de Django una sola vez. Sólo cuenta
+    el render de nivel superior: las cards renderizadas dentro de la página
+    ya están incluidas en su tiempo. Las queries hechas durante el render
+    (querysets perezosos) se cuentan en SQL y también en template.
+    """
+    if getattr(_BackendTemplate.render, "_propiedades_medido", False):
+        return
+    original = _BackendTemplate.render
+
+    def render(self, context=None, request=None):
+        m = _actual.get()
+        if m is None or m._nivel:
+            return original(self, context, request)
+        m._nivel += 1
+        t0 = time.perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            m._nivel -= 1
+            m.template += time.perf_counter() - t0
+
+    render._propiedades_medido = True
+    _BackendTemplate.render = render
+
+
+class MetricasMiddleware:
+    """
+    Por request a las vistas de propiedades: cantidad de queries, tiempo SQL,
+    tiempo de templates y tamaño de la respuesta. Una línea JSON al logger
+    "propiedades.metricas" y header Server-Timing (visible en devtools).
+    Se activa con PROPIEDADES_METRICAS = True. Sirve en WSGI y en ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PROPIEDADES_METRICAS", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        _instalar_medicion_sql()
+        _instalar_medicion_templates()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        m = _Metricas()
+        token = _actual.set(m)
+        t0 = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _actual.reset(token)
+        return self._reportar(request, response, m, time.perf_counter() - t0)
+
+    async def __acall__(self, request):
+        m = _Metricas()
+        token = _actual.set(m)
+        t0 = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _actual.reset(token)
+        return self._reportar(request, response, m, time.perf_counter() - t0)
+
+    def _reportar(self, request, response, m, total):
+        match = getattr(request, "resolver_match", None)
+        if match is None or "propiedades" not in match.namespaces:
+            return response
+
+        size = None if response.streaming else len(response.content)
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={m.sql * 1000:.1f};desc="{m.queries} queries"',
+            f"tpl;dur={m.template * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        ])
+        logger.info(json.dumps({
+            "view": match.view_name,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": m.queries,
+            "sql_ms": round(m.sql * 1000, 2),
+            "template_ms": round(m.template * 1000, 2),
+            "total_ms": round(total * 1000, 2),
+            "bytes": size,
+        }, separators=(",", ":")))
+        return response
@@ -0,0 +1,35 @@
+from importlib import import_module
+
+from django.db import migrations
+
+# Mismo SQL que 0006, que queda tal cual: las bases que ya la aplicaron
+# (Postgres en Render) sólo registran esta como aplicada.
+base = import_module("propiedades.migrations.0006_search_extensions_and_indexes")
+
+
+def _run_pg(sql):
+    """
+    Ejecuta SQL sólo en PostgreSQL (en SQLite de desarrollo no hay
+    extensiones ni índices GIN, y la búsqueda usa el camino icontains).
+    """
+    def _op(apps, schema_editor):
+        if schema_editor.connection.vendor == "postgresql":
+            schema_editor.execute(sql)
+    return _op
+
+
+class Migration(migrations.Migration):
+
+    replaces = [
+        ('propiedades', '0006_search_extensions_and_indexes'),
+    ]
+
+    dependencies = [
+        ('propiedades', '0005_propiedad_codigo_unico'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run_pg(base.SQL_ENABLE), reverse_code=migrations.RunPython.noop),
+        migrations.RunPython(_run_pg(base.SQL_FN), reverse_code=_run_pg("DROP FUNCTION IF EXISTS public.f_unaccent(text);")),
+        migrations.RunPython(_run_pg(base.SQL_INDEXES), reverse_code=_run_pg(base.SQL_DROP_INDEXES)),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:45
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Pesos: A = titulo/codigo_unico, B = localidad/provincia, C = descripcion/amenidades
+SQL_TRIGGER = """
+CREATE OR REPLACE FUNCTION propiedades_propiedad_search_vector_update()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.search_vector :=
+    setweight(to_tsvector('spanish', public.f_unaccent(
+      coalesce(NEW.titulo,'') || ' ' || coalesce(NEW.codigo_unico,''))), 'A') ||
+    setweight(to_tsvector('spanish', public.f_unaccent(
+      coalesce(NEW.localidad,'') || ' ' || coalesce(NEW.provincia,''))), 'B') ||
+    setweight(to_tsvector('spanish', public.f_unaccent(
+      coalesce(NEW.descripcion,'') || ' ' || coalesce(NEW.amenidades,''))), 'C');
+  RETURN NEW;
+END
+$$;
+
+DROP TRIGGER IF EXISTS propiedades_propiedad_search_vector_trg ON propiedades_propiedad;
+CREATE TRIGGER propiedades_propiedad_search_vector_trg
+BEFORE INSERT OR UPDATE OF titulo, codigo_unico, localidad, provincia, descripcion, amenidades
+ON propiedades_propiedad
+FOR EACH ROW EXECUTE FUNCTION propiedades_propiedad_search_vector_update();
+
+CREATE INDEX IF NOT EXISTS propiedades_propiedad_search_vector_gin
+  ON propiedades_propiedad USING GIN (search_vector);
+
+-- El índice de expresión de 0006 queda reemplazado por la columna
+DROP INDEX IF EXISTS propiedades_propiedad_search_gin;
+"""
+
+SQL_TRIGGER_REVERSE = """
+CREATE INDEX IF NOT EXISTS propiedades_propiedad_search_gin
+ON propiedades_propiedad
+USING GIN (
+  to_tsvector(
+    'spanish',
+    public.f_unaccent(
+      coalesce(titulo,'') || ' ' ||
+      coalesce(descripcion,'') || ' ' ||
+      coalesce(localidad,'') || ' ' ||
+      coalesce(provincia,'') || ' ' ||
+      coalesce(amenidades,'')
+    )
+  )
+);
+DROP INDEX IF EXISTS propiedades_propiedad_search_vector_gin;
+DROP TRIGGER IF EXISTS propiedades_propiedad_search_vector_trg ON propiedades_propiedad;
+DROP FUNCTION IF EXISTS propiedades_propiedad_search_vector_update();
+"""
+
+# Backfill inicial sólo si la tabla es chica; si no, correr
+# `manage.py rebuild_search_vector` (por lotes) después del deploy.
+BACKFILL_MAX_ROWS = 50_000
+
+
+def _trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(SQL_TRIGGER)
+    with schema_editor.connection.cursor() as cur:
+        cur.execute("SELECT count(*) FROM propiedades_propiedad")
+        (total,) = cur.fetchone()
+        if total <= BACKFILL_MAX_ROWS:
+            # UPDATE OF titulo dispara el trigger, que recalcula el vector
+            cur.execute("UPDATE propiedades_propiedad SET titulo = titulo")
+
+
+def _trigger_reverse(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(SQL_TRIGGER_REVERSE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0006_search_extensions_and_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propiedad',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(_trigger, reverse_code=_trigger_reverse),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0007_propiedad_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='propiedad',
+            index=models.Index(condition=models.Q(('estado_publicacion', 'publicada')), fields=['-fecha_actualizacion', '-id'], name='prop_pub_fecha_id_idx'),
+        ),
+    ]
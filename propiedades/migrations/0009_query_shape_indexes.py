@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0008_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='propiedad',
+            index=models.Index(condition=models.Q(('estado_publicacion', 'publicada'), ('is_destacada', True)), fields=['-fecha_actualizacion'], name='prop_pub_dest_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propiedad',
+            index=models.Index(condition=models.Q(('estado_publicacion', 'publicada')), fields=['tipo', 'tipo_operacion', '-fecha_actualizacion'], name='prop_pub_tipo_op_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propiedad',
+            index=models.Index(condition=models.Q(('estado_publicacion', 'publicada')), fields=['tipo_operacion', '-fecha_actualizacion'], name='prop_pub_op_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propiedad',
+            index=models.Index(condition=models.Q(('estado_publicacion', 'publicada')), fields=['precio_usd'], name='prop_pub_usd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propiedad',
+            index=models.Index(condition=models.Q(('estado_publicacion', 'publicada')), fields=['precio_pesos'], name='prop_pub_ars_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propiedad',
+            index=models.Index(condition=models.Q(('estado_publicacion', 'publicada')), fields=['dormitorios'], name='prop_pub_dorm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propiedad',
+            index=models.Index(condition=models.Q(('estado_publicacion', 'publicada')), fields=['banios'], name='prop_pub_banios_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='propiedad',
+            index=models.Index(condition=models.Q(('estado_publicacion', 'publicada')), fields=['cocheras'], name='prop_pub_cocheras_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+# Igual a propiedades.codigos.SECUENCIA
+SECUENCIA = "propiedades_codigo_seq"
+
+
+def _run_pg(sql):
+    """
+    Sólo PostgreSQL: en SQLite de desarrollo codigos.reservar_secuencia usa
+    un contador del proceso.
+    """
+    def _op(apps, schema_editor):
+        if schema_editor.connection.vendor == "postgresql":
+            schema_editor.execute(sql)
+    return _op
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0009_query_shape_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run_pg(f"CREATE SEQUENCE IF NOT EXISTS {SECUENCIA} AS bigint START 1;"),
+            reverse_code=_run_pg(f"DROP SEQUENCE IF EXISTS {SECUENCIA};"),
+        ),
+    ]
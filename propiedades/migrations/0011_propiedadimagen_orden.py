@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-17 00:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('propiedades', '0010_codigo_seq'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='propiedadimagen',
+            options={'ordering': ['orden', 'id']},
+        ),
+        migrations.AddField(
+            model_name='propiedadimagen',
+            name='orden',
+            field=models.PositiveIntegerField(default=0, help_text='Posición en la galería (menor primero).'),
+        ),
+        migrations.AddIndex(
+            model_name='propiedadimagen',
+            index=models.Index(fields=['propiedad', 'orden'], name='propimg_prop_orden_idx'),
+        ),
+    ]
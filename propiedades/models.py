@@ -1,6 +1,32 @@
-import random
-import string
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import IntegrityError, models, router, transaction
+
+from .codigos import siguiente_codigo
+
+
+# Columnas que usa _card.html (+ fecha_actualizacion: sello de la card cacheada
+# y clave del keyset). Sin descripcion/amenidades/search_vector.
+CARD_FIELDS = (
+    'id', 'titulo', 'tipo', 'tipo_operacion', 'precio_usd', 'precio_pesos',
+    'localidad', 'provincia', 'dormitorios', 'banios', 'metros_cuadrados_cubierta',
+    'imagen_principal', 'fecha_actualizacion',
+)
+
+
+class PropiedadQuerySet(models.QuerySet):
+    def cards(self):
+        """
+        Proyección para listados (home, lista, búsqueda): sólo CARD_FIELDS.
+        Si _card.html empieza a usar otro campo, agregarlo acá (si no, cada
+        card dispara una consulta extra).
+        """
+        return self.only(*CARD_FIELDS)
+
+
+class PropiedadManager(models.Manager.from_queryset(PropiedadQuerySet)):
+    def get_queryset(self):
+        # search_vector lo mantiene un trigger en la DB: no hace falta traerlo
+        return super().get_queryset().defer('search_vector')
 
 
 class Propiedad(models.Model):
@@ -171,21 +197,89 @@ class Propiedad(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
 
+    # Vector full-text materializado (pesos A/B/C). Lo completa el trigger
+    # propiedades_propiedad_search_vector_trg en Postgres (migración 0007);
+    # para filas viejas: manage.py rebuild_search_vector.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = PropiedadManager()
+
+    class Meta:
+        # Todos parciales sobre publicadas: es lo único que consultan las vistas públicas
+        indexes = [
+            # Paginación keyset de listados públicos: WHERE publicada ORDER BY fecha DESC, id DESC
+            models.Index(
+                fields=['-fecha_actualizacion', '-id'],
+                name='prop_pub_fecha_id_idx',
+                condition=models.Q(estado_publicacion='publicada'),
+            ),
+            # home: destacadas ORDER BY fecha DESC LIMIT 6
+            models.Index(
+                fields=['-fecha_actualizacion'],
+                name='prop_pub_dest_fecha_idx',
+                condition=models.Q(estado_publicacion='publicada', is_destacada=True),
+            ),
+            # búsqueda: selects tipo / tipo_operacion (+ orden por fecha)
+            models.Index(
+                fields=['tipo', 'tipo_operacion', '-fecha_actualizacion'],
+                name='prop_pub_tipo_op_fecha_idx',
+                condition=models.Q(estado_publicacion='publicada'),
+            ),
+            models.Index(
+                fields=['tipo_operacion', '-fecha_actualizacion'],
+                name='prop_pub_op_fecha_idx',
+                condition=models.Q(estado_publicacion='publicada'),
+            ),
+            # búsqueda: rangos de precio
+            models.Index(
+                fields=['precio_usd'],
+                name='prop_pub_usd_idx',
+                condition=models.Q(estado_publicacion='publicada'),
+            ),
+            models.Index(
+                fields=['precio_pesos'],
+                name='prop_pub_ars_idx',
+                condition=models.Q(estado_publicacion='publicada'),
+            ),
+            # búsqueda: numéricos >= (se combinan con BitmapAnd)
+            models.Index(
+                fields=['dormitorios'],
+                name='prop_pub_dorm_idx',
+                condition=models.Q(estado_publicacion='publicada'),
+            ),
+            models.Index(
+                fields=['banios'],
+                name='prop_pub_banios_idx',
+                condition=models.Q(estado_publicacion='publicada'),
+            ),
+            models.Index(
+                fields=['cocheras'],
+                name='prop_pub_cocheras_idx',
+                condition=models.Q(estado_publicacion='publicada'),
+            ),
+        ]
+
     def save(self, *args, **kwargs):
-        if not self.codigo_unico:
+        if self.codigo_unico:
+            return super().save(*args, **kwargs)
+
+        # Código asignado sin consultar la tabla; el unique de la DB es el
+        # árbitro. Si choca con un código viejo (aleatorio), se toma otro.
+        using = kwargs.get("using") or router.db_for_write(Propiedad, instance=self)
+        for intento in range(5):
             self.codigo_unico = self._generar_codigo_unico()
-        super().save(*args, **kwargs)
+            try:
+                # savepoint: el error no invalida una transacción exterior
+                with transaction.atomic(using=using):
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                choco = Propiedad._base_manager.using(using).filter(codigo_unico=self.codigo_unico).exists()
+                if not choco or intento == 4:
+                    self.codigo_unico = None
+                    raise
 
     def _generar_codigo_unico(self):
-        letras = ''.join(random.choices(string.ascii_uppercase, k=3))
-        numeros = ''.join(random.choices(string.digits, k=3))
-        codigo = letras + numeros
-
-        while Propiedad.objects.filter(codigo_unico=codigo).exists():
-            letras = ''.join(random.choices(string.ascii_uppercase, k=3))
-            numeros = ''.join(random.choices(string.digits, k=3))
-            codigo = letras + numeros
-        return codigo
+        return siguiente_codigo()
 
     def __str__(self):
         return f"{self.titulo} ({self.tipo}) - {self.localidad}"
@@ -210,6 +304,17 @@ class PropiedadImagen(models.Model):
         blank=True,
         help_text="Breve descripción de la imagen.",
     )
+    orden = models.PositiveIntegerField(
+        default=0,
+        help_text="Posición en la galería (menor primero).",
+    )
+
+    class Meta:
+        # "primera imagen" determinística; el índice cubre el prefetch del detalle
+        ordering = ['orden', 'id']
+        indexes = [
+            models.Index(fields=['propiedad', 'orden'], name='propimg_prop_orden_idx'),
+        ]
 
     def __str__(self):
         return f"Imagen de {self.propiedad.titulo} (ID: {self.id})"
@@ -0,0 +1,179 @@
+# propiedades/pagination.py
+import base64
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+# Clave de orden compuesta: la misma del índice parcial prop_pub_fecha_id_idx
+KEYSET_ORDER = ('-fecha_actualizacion', '-id')
+
+
+def keyset_activo() -> bool:
+    """
+    'keyset' (default) o 'offset' (Paginator clásico con ?page=N).
+    """
+    return getattr(settings, "PROPIEDADES_PAGINACION", "keyset") == "keyset"
+
+
+def encode_cursor(obj, direccion: str) -> str:
+    """
+    Token opaco para la URL: (fecha_actualizacion, id, dirección) en base64.
+    direccion: 'n' = página siguiente (después de obj), 'p' = anterior (antes de obj).
+    obj puede ser una instancia o una fila de values() (dict con fecha_actualizacion e id).
+    """
+    if isinstance(obj, dict):
+        fecha, pk = obj["fecha_actualizacion"], obj["id"]
+    else:
+        fecha, pk = obj.fecha_actualizacion, obj.pk
+    raw = json.dumps([fecha.isoformat(), pk, direccion], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str):
+    """
+    Devuelve (fecha, pk, direccion) o None si el token es inválido.
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        fecha, pk, direccion = json.loads(raw)
+        if direccion not in ("n", "p"):
+            return None
+        return datetime.fromisoformat(fecha), int(pk), direccion
+    except Exception:
+        return None
+
+
+def estimated_count(qs) -> int:
+    """
+    Conteo aproximado sin COUNT(*): en Postgres toma las filas estimadas por
+    el planner (EXPLAIN); en otros motores cae a count().
+    """
+    if connection.vendor != "postgresql":
+        return qs.count()
+    sql, params = qs.order_by().query.sql_with_params()
+    with connection.cursor() as cur:
+        cur.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class KeysetPage:
+    """
+    Página de resultados por keyset (seek) sobre (fecha_actualizacion, id).
+    Imita lo que los templates usan de Page: iterable, has_next/has_previous.
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, estimated_count=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.estimated_count = estimated_count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def keyset_page(qs, token, per_page):
+    """
+    Una página de `qs` (ya filtrado) ordenada por -fecha_actualizacion, -id.
+    Trae per_page + 1 filas para saber si hay más, sin COUNT ni OFFSET.
+    Un token inválido se trata como primera página (igual que Paginator.get_page).
+    """
+    cursor = decode_cursor(token)
+    conteo = estimated_count(qs) if getattr(settings, "PROPIEDADES_CONTEO_ESTIMADO", False) else None
+
+    if cursor is None:
+        rows = list(qs.order_by(*KEYSET_ORDER)[:per_page + 1])
+        hay_mas = len(rows) > per_page
+        rows = rows[:per_page]
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor(rows[-1], "n") if hay_mas else None,
+            estimated_count=conteo,
+        )
+
+    fecha, pk, direccion = cursor
+    if direccion == "n":
+        # (fecha, id) < cursor; el fecha__lte va como condición de índice
+        rows = list(
+            qs.filter(Q(fecha_actualizacion__lte=fecha) & (Q(fecha_actualizacion__lt=fecha) | Q(id__lt=pk)))
+            .order_by(*KEYSET_ORDER)[:per_page + 1]
+        )
+        hay_mas = len(rows) > per_page
+        rows = rows[:per_page]
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor(rows[-1], "n") if hay_mas else None,
+            previous_cursor=encode_cursor(rows[0], "p") if rows else None,
+            estimated_count=conteo,
+        )
+
+    # Hacia atrás: se recorre en orden ascendente y se invierte
+    rows = list(
+        qs.filter(Q(fecha_actualizacion__gte=fecha) & (Q(fecha_actualizacion__gt=fecha) | Q(id__gt=pk)))
+        .order_by('fecha_actualizacion', 'id')[:per_page + 1]
+    )
+    hay_mas = len(rows) > per_page
+    rows = list(reversed(rows[:per_page]))
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(rows[-1], "n") if rows else None,
+        previous_cursor=encode_cursor(rows[0], "p") if hay_mas else None,
+        estimated_count=conteo,
+    )
+
+
+def keyset_page_ids(ids, token, per_page, cargar):
+    """
+    La misma paginación por cursor sobre una lista de ids ya ordenada por
+    KEYSET_ORDER (búsquedas cacheadas): el token es el de keyset_page y se
+    ubica por id en la lista, así los links ?cursor= valen con o sin cache.
+    cargar(ids) devuelve los objetos de esos ids en el mismo orden.
+    None si el id del cursor ya no está en la lista (cambió entre requests):
+    el llamador pagina sobre la DB con keyset_page.
+    """
+    cursor = decode_cursor(token)
+    if cursor is None:
+        inicio, fin = 0, per_page
+    else:
+        _, pk, direccion = cursor
+        try:
+            pos = ids.index(pk)
+        except ValueError:
+            return None
+        if direccion == "n":
+            inicio, fin = pos + 1, pos + 1 + per_page
+        else:
+            inicio, fin = max(pos - per_page, 0), pos
+
+    rows = cargar(ids[inicio:fin])
+    conteo = len(ids) if getattr(settings, "PROPIEDADES_CONTEO_ESTIMADO", False) else None
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(rows[-1], "n") if rows and fin < len(ids) else None,
+        previous_cursor=encode_cursor(rows[0], "p") if rows and inicio > 0 else None,
+        estimated_count=conteo,
+    )
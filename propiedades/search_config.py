@@ -1,12 +1,18 @@
 # propiedades/search_config.py
 import unicodedata
 
+def strip_accents(s):
+    # sólo saca acentos (equivalente Python de unaccent())
+    if s is None:
+        return None
+    s = unicodedata.normalize("NFKD", s)
+    return "".join(c for c in s if not unicodedata.combining(c))
+
 def norm(s: str) -> str:
     # minúsculas, un solo espacio, sin tildes
     s = (s or "").strip().lower()
     s = " ".join(s.split())
-    s = unicodedata.normalize("NFKD", s)
-    s = "".join(c for c in s if not unicodedata.combining(c))  # saca acentos
+    s = strip_accents(s)  # saca acentos
     return s
 
 RAW_SYNONYMS = {
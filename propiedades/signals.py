@@ -0,0 +1,105 @@
+# propiedades/signals.py
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models.functions import Now
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .cache import bump_busqueda_version, invalidate_card, refrescar_destacadas_en_segundo_plano
+from .imagenes import generar_variantes_en_segundo_plano, variantes_al_guardar
+from .models import Propiedad, PropiedadImagen
+
+
+@receiver(post_save, sender=Propiedad, dispatch_uid="propiedades_card_save")
+@receiver(post_delete, sender=Propiedad, dispatch_uid="propiedades_card_delete")
+def _invalidar_card(sender, instance, **kwargs):
+    invalidate_card(instance.pk)
+
+
+@receiver(post_save, sender=Propiedad, dispatch_uid="propiedades_busqueda_save")
+@receiver(post_delete, sender=Propiedad, dispatch_uid="propiedades_busqueda_delete")
+def _invalidar_busquedas(sender, instance, **kwargs):
+    # al confirmar: una búsqueda concurrente que vio el estado viejo queda invalidada igual
+    transaction.on_commit(bump_busqueda_version)
+    # el bloque de destacadas de la home quedó vencido (misma versión): se re-arma de fondo
+    transaction.on_commit(refrescar_destacadas_en_segundo_plano)
+
+
+# Campo de imagen de cada modelo: las variantes sólo se generan si cambió
+_CAMPO_IMAGEN = {Propiedad: "imagen_principal", PropiedadImagen: "imagen"}
+
+
+def _nombre(valor):
+    return getattr(valor, "name", valor) or ""
+
+
+@receiver(post_init, sender=Propiedad, dispatch_uid="propiedades_imagen_cargada")
+@receiver(post_init, sender=PropiedadImagen, dispatch_uid="propiedades_galeria_imagen_cargada")
+def _recordar_imagen(sender, instance, **kwargs):
+    # __dict__: sin disparar el descriptor (y sin cargarlo si vino diferido)
+    instance._imagen_cargada = _nombre(instance.__dict__.get(_CAMPO_IMAGEN[sender]))
+
+
+def _imagen_cambiada(instance, created, update_fields):
+    """Nombre de la imagen nueva si este save la cambió; si no, ''."""
+    campo = _CAMPO_IMAGEN[type(instance)]
+    if update_fields is not None and campo not in update_fields:
+        return ""
+    name = _nombre(instance.__dict__.get(campo))
+    if not created and name == instance._imagen_cargada:
+        return ""
+    instance._imagen_cargada = name
+    return name
+
+
+def _programar_variantes(name, despues=None):
+    """
+    Genera las variantes al confirmar la transacción (la subida ya está en
+    storage), fuera del request: nada de storage en el save.
+    """
+    if not name or not variantes_al_guardar():
+        return
+    transaction.on_commit(lambda: generar_variantes_en_segundo_plano(name, despues))
+
+
+@receiver(post_save, sender=Propiedad, dispatch_uid="propiedades_variantes_principal")
+def _variantes_principal(sender, instance, created, update_fields, **kwargs):
+    # la card cacheada se renderizó sin srcset: se invalida al terminar
+    pk = instance.pk
+    _programar_variantes(_imagen_cambiada(instance, created, update_fields), despues=lambda: invalidate_card(pk))
+
+
+_sin_tocar = ContextVar("propiedades_sin_tocar_propiedad", default=False)
+
+
+@contextmanager
+def sin_tocar_propiedad():
+    """
+    Para trabajos por lote sobre la galería: dentro del bloque, guardar o
+    borrar PropiedadImagen no actualiza al padre fila por fila. Quien lo usa
+    toca las propiedades afectadas una vez al final (lotes.aplicar). El resto
+    de los receivers corre igual.
+    """
+    token = _sin_tocar.set(True)
+    try:
+        yield
+    finally:
+        _sin_tocar.reset(token)
+
+
+@receiver(post_save, sender=PropiedadImagen, dispatch_uid="propiedades_galeria_toca_save")
+@receiver(post_delete, sender=PropiedadImagen, dispatch_uid="propiedades_galeria_toca_delete")
+def _tocar_propiedad(sender, instance, **kwargs):
+    if _sin_tocar.get():
+        return
+    # El detalle muestra la galería: su Last-Modified/ETag sale de fecha_actualizacion
+    Propiedad.objects.filter(pk=instance.propiedad_id).update(fecha_actualizacion=Now())
+    # y el orden por fecha de las búsquedas cacheadas cambió
+    transaction.on_commit(bump_busqueda_version)
+
+
+@receiver(post_save, sender=PropiedadImagen, dispatch_uid="propiedades_variantes_galeria")
+def _variantes_galeria(sender, instance, created, update_fields, **kwargs):
+    _programar_variantes(_imagen_cambiada(instance, created, update_fields))
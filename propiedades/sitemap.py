@@ -0,0 +1,82 @@
+# propiedades/sitemap.py
+"""
+Sitemap de los detalles publicados, particionado por rangos de id.
+
+El shard k tiene las publicadas con id en [k*SITEMAP_TAMANO, (k+1)*SITEMAP_TAMANO):
+nunca supera el máximo de 50.000 URLs del protocolo y una propiedad no cambia
+de shard, así que un cambio sólo toca su archivo. Las filas se leen con
+.iterator() (id + fecha, sin instanciar modelos) y el XML sale en streaming.
+"""
+import hashlib
+from xml.sax.saxutils import escape
+
+from django.db.models import BigIntegerField, Count, ExpressionWrapper, F, Max, Sum
+from django.urls import reverse
+
+from .models import Propiedad
+
+SITEMAP_TAMANO = 50_000
+_NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def _publicadas():
+    return Propiedad.objects.filter(estado_publicacion='publicada')
+
+
+def _lastmod(fecha):
+    return fecha.isoformat(timespec='seconds') if fecha else ''
+
+
+def shards():
+    """
+    [(k, n, ultima, firma)] en UNA consulta agrupada por id // SITEMAP_TAMANO.
+    La firma (cantidad, última fecha, suma de ids) cambia si se publica,
+    despublica, borra o modifica alguna propiedad del shard.
+    """
+    filas = (
+        _publicadas().order_by()
+        .values(shard=ExpressionWrapper(F('id') / SITEMAP_TAMANO, output_field=BigIntegerField()))
+        .annotate(n=Count('id'), ultima=Max('fecha_actualizacion'), suma=Sum('id'))
+        .order_by('shard')
+    )
+    out = []
+    for f in filas:
+        # fecha completa (con microsegundos): dos cambios en el mismo segundo también cuentan
+        ultima = f['ultima'].isoformat() if f['ultima'] else ''
+        firma = hashlib.sha1(f"{f['n']}|{ultima}|{f['suma']}".encode()).hexdigest()
+        out.append((f['shard'], f['n'], f['ultima'], firma))
+    return out
+
+
+def ultima_del_shard(k):
+    return _publicadas().filter(
+        id__gte=k * SITEMAP_TAMANO, id__lt=(k + 1) * SITEMAP_TAMANO,
+    ).aggregate(ultima=Max('fecha_actualizacion'))['ultima']
+
+
+def urlset(k, base_url, chunk_size=2000):
+    """Genera el XML del shard k (str por fila); base_url = 'https://dominio'."""
+    marca = 987654321
+    plantilla = escape(base_url.rstrip('/') + reverse('propiedades:detalle', args=[marca]))
+    antes, despues = plantilla.split(str(marca))
+    filas = (
+        _publicadas()
+        .filter(id__gte=k * SITEMAP_TAMANO, id__lt=(k + 1) * SITEMAP_TAMANO)
+        .order_by('id')
+        .values_list('id', 'fecha_actualizacion')
+    )
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset {_NS}>\n'
+    for pk, fecha in filas.iterator(chunk_size=chunk_size):
+        yield f"<url><loc>{antes}{pk}{despues}</loc><lastmod>{_lastmod(fecha)}</lastmod></url>\n"
+    yield "</urlset>\n"
+
+
+def indice(partes, url_de):
+    """
+    XML del índice. partes: [(k, n, ultima, firma)] (ver shards());
+    url_de(k) -> URL absoluta del shard k.
+    """
+    yield f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex {_NS}>\n'
+    for k, _n, ultima, _firma in partes:
+        yield f"<sitemap><loc>{escape(url_de(k))}</loc><lastmod>{_lastmod(ultima)}</lastmod></sitemap>\n"
+    yield "</sitemapindex>\n"
@@ -0,0 +1,26 @@
+# propiedades/templatetags/propiedades_tags.py
+from django import template
+from django.utils.safestring import mark_safe
+
+from propiedades import imagenes
+from propiedades.cache import render_card
+
+register = template.Library()
+
+
+@register.simple_tag
+def propiedad_card(prop):
+    """
+    {% propiedad_card prop %} == {% include '_card.html' with prop=prop %}, pero cacheado.
+    """
+    return mark_safe(render_card(prop))
+
+
+@register.simple_tag
+def srcset(fieldfile, ext="webp"):
+    """
+    {% srcset prop.imagen_principal 'webp' as ss %} -> "url 160w, url 480w, ..."
+    Vacío si la imagen no tiene variantes generadas (se usa el original).
+    """
+    name = getattr(fieldfile, "name", fieldfile)
+    return imagenes.srcset(name, ext) if name else ""
@@ -1,3 +1,1557 @@
-from django.test import TestCase
+import json
+import os
+import random
+import threading
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import caches
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from . import codigos
+from .models import Propiedad
+
+# Los templates usan {% static %}: en tests no hay manifest de collectstatic
+STATIC_SIN_MANIFEST = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+def _seed_propiedades(n, seed=1234):
+    """
+    Carga n propiedades sintéticas con una distribución parecida a la real
+    (un tercio publicadas, ~20% destacadas, precios según operación).
+    """
+    rnd = random.Random(seed)
+    tipos = [c[0] for c in Propiedad.TIPO_PROPIEDAD_CHOICES]
+    localidades = ["Posadas", "Oberá", "Garupá", "Eldorado", "Iguazú", "Encarnación"]
+    objs = []
+    for i in range(n):
+        venta = rnd.random() < 0.5
+        objs.append(Propiedad(
+            titulo=f"{rnd.choice(['Casa luminosa', 'Depto con balcón', 'Galpón', 'Terreno ideal'])} {i}",
+            descripcion="Propiedad de prueba generada para tests. " * 5,
+            tipo=rnd.choice(tipos),
+            tipo_operacion="venta" if venta else "alquiler",
+            precio_usd=Decimal(rnd.randrange(25000, 250000, 5000)) if venta else None,
+            precio_pesos=None if venta else Decimal(rnd.randrange(120000, 1500000, 10000)),
+            direccion=f"Calle {i}",
+            localidad=rnd.choice(localidades),
+            provincia="Misiones",
+            dormitorios=rnd.choice([1, 2, 3, 4, None]),
+            banios=rnd.choice([1, 2, 3, None]),
+            cocheras=rnd.choice([0, 1, 2, None]),
+            amenidades="pileta, parrilla",
+            is_destacada=rnd.random() < 0.2,
+            estado_publicacion=rnd.choice(["borrador", "publicada", "archivada"]),
+            codigo_unico=f"TS{chr(65 + i // 1000 % 26)}{i % 1000:03d}",
+        ))
+    Propiedad.objects.bulk_create(objs, batch_size=1000)
+
+
+def _nodos(plan):
+    yield plan
+    for hijo in plan.get("Plans", []):
+        yield from _nodos(hijo)
+
+
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN de índices: requiere PostgreSQL")
+@override_settings(STORAGES=STATIC_SIN_MANIFEST)
+class IndicesVistasExplainTests(TestCase):
+    """
+    Corre cada vista pública, captura su SQL sobre propiedades_propiedad y
+    hace EXPLAIN con enable_seqscan=off: si aun así aparece un Seq Scan es
+    porque NINGÚN índice sirve para esa forma de consulta. Eso solo no
+    alcanza (cualquier consulta de publicadas puede recorrer
+    prop_pub_fecha_id_idx): para las formas de 0009 el plan tiene que nombrar
+    su índice (valores selectivos, para que el índice propio sea el más barato).
+    """
+
+    URLS = [
+        "/propiedades/",
+        "/propiedades/lista/",
+        "/propiedades/busqueda/?tipo=casa",
+        "/propiedades/busqueda/?tipo_operacion=venta",
+        "/propiedades/busqueda/?tipo=casa&tipo_operacion=alquiler",
+        "/propiedades/busqueda/?dormitorios=3",
+        "/propiedades/busqueda/?banios=2&cocheras=1",
+        "/propiedades/busqueda/?currency=usd&price_min=50000&price_max=90000",
+        "/propiedades/busqueda/?ars_min=200000",
+        "/propiedades/busqueda/?localidad=obera",
+        "/propiedades/busqueda/?q=casa+luminosa",
+        "/propiedades/busqueda/?q=galpn",
+    ]
+
+    # forma de consulta -> índices de 0009 aceptables (alguno tiene que aparecer en el plan)
+    INDICES = {
+        "/propiedades/": {"prop_pub_dest_fecha_idx"},
+        "/propiedades/busqueda/?tipo=casa": {"prop_pub_tipo_op_fecha_idx"},
+        "/propiedades/busqueda/?tipo_operacion=venta": {"prop_pub_op_fecha_idx"},
+        "/propiedades/busqueda/?tipo=casa&tipo_operacion=alquiler": {"prop_pub_tipo_op_fecha_idx"},
+        "/propiedades/busqueda/?dormitorios=4": {"prop_pub_dorm_idx"},
+        "/propiedades/busqueda/?banios=3&cocheras=2": {"prop_pub_banios_idx", "prop_pub_cocheras_idx"},
+        "/propiedades/busqueda/?currency=usd&price_min=50000&price_max=60000": {"prop_pub_usd_idx"},
+        "/propiedades/busqueda/?ars_min=1400000": {"prop_pub_ars_idx"},
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        _seed_propiedades(3000)
+        with connection.cursor() as cur:
+            cur.execute("ANALYZE propiedades_propiedad")
+
+    def setUp(self):
+        # home y búsquedas cacheadas no consultarían nada
+        caches["propiedades"].clear()
+
+    def _planes(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200, url)
+        sqls = [
+            q["sql"] for q in ctx.captured_queries
+            if q["sql"].lstrip().upper().startswith("SELECT") and "propiedades_propiedad" in q["sql"]
+        ]
+        self.assertTrue(sqls, f"{url}: no se capturó SQL de propiedades")
+        with connection.cursor() as cur:
+            cur.execute("SET LOCAL enable_seqscan = off")
+            try:
+                for sql in sqls:
+                    cur.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+                    plan = cur.fetchone()[0]
+                    if isinstance(plan, str):
+                        plan = json.loads(plan)
+                    yield sql, plan[0]["Plan"]
+            finally:
+                cur.execute("RESET enable_seqscan")
+
+    def test_sin_seq_scan(self):
+        for url in self.URLS:
+            for sql, plan in self._planes(url):
+                seq = [
+                    n for n in _nodos(plan)
+                    if n["Node Type"] == "Seq Scan" and n.get("Relation Name") == "propiedades_propiedad"
+                ]
+                with self.subTest(url=url):
+                    self.assertFalse(seq, f"Seq Scan en {url}:\n{sql}")
+
+    def test_cada_forma_usa_su_indice(self):
+        for url, esperados in self.INDICES.items():
+            usados = {
+                n["Index Name"] for _sql, plan in self._planes(url)
+                for n in _nodos(plan) if "Index Name" in n
+            }
+            with self.subTest(url=url):
+                self.assertTrue(usados & esperados, f"{url}: se esperaba {sorted(esperados)}, el plan usa {sorted(usados)}")
+
+
+@skipUnless(connection.vendor == "postgresql", "full-text y trigram: requiere PostgreSQL")
+class FullTextPostgresTests(TestCase):
+    """
+    filtrar_fulltext sobre filas reales (el trigger de 0007 arma search_vector).
+    Similitudes trigram contra 'galpn': 'galpo' 0.5, 'galpon' 0.44.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        def crear(titulo, descripcion="Propiedad de prueba.", localidad="Iguazú"):
+            return Propiedad.objects.create(
+                titulo=titulo, descripcion=descripcion, tipo="galpon", tipo_operacion="venta",
+                direccion="x", localidad=localidad, provincia="Misiones",
+            )
+        cls.galpon = crear("Galpón")
+        cls.galpo = crear("Galpo")
+        # "posadas" en el título (peso A) y sólo en la descripción (peso C, más nueva)
+        cls.titulo = crear("Casa en Posadas", localidad="Posadas")
+        cls.desc = crear("Casa amplia", descripcion="Cerca del centro de Posadas.", localidad="Oberá")
+
+    def _buscar(self, q, **kw):
+        from .fulltext import filtrar_fulltext
+        return list(filtrar_fulltext(Propiedad.objects.all(), q, **kw))
+
+    def test_si_hay_exactas_se_descartan_las_aproximadas(self):
+        filas = self._buscar("galpon")
+        self.assertEqual([p.pk for p in filas], [self.galpon.pk])
+        self.assertEqual([p.exacto for p in filas], [1])
+        # sin fuzzy, el mismo resultado por el otro camino
+        self.assertEqual([p.pk for p in self._buscar("galpon", fuzzy=False)], [self.galpon.pk])
+
+    def test_sin_exactas_aproximadas_por_similitud(self):
+        filas = self._buscar("galpn")
+        self.assertEqual([p.pk for p in filas], [self.galpo.pk, self.galpon.pk])
+        self.assertEqual([p.exacto for p in filas], [0, 0])
+        self.assertGreater(filas[0].sim, filas[1].sim)
+
+    @override_settings(PROPIEDADES_FUZZY_UMBRAL=0.48)
+    def test_umbral_configurado(self):
+        self.assertEqual([p.pk for p in self._buscar("galpn")], [self.galpo.pk])
+
+    def test_exactas_por_rank(self):
+        filas = self._buscar("posadas")
+        self.assertEqual([p.pk for p in filas], [self.titulo.pk, self.desc.pk])
+        self.assertGreater(filas[0].rank, filas[1].rank)
+
+
+@override_settings(AWS_PRESIGNED_URL_CACHE_ALIAS=None)
+class PresignedUrlCacheTests(SimpleTestCase):
+    """
+    Memo de URLs pre-firmadas de MediaRootS3Boto3Storage. boto3 firma en
+    local, así que con credenciales falsas no hace falta red ni moto.
+    """
+
+    def setUp(self):
+        from mi_blog import storages
+        self.mod = storages
+        storages._URL_LRU.clear()
+        self.storage = storages.MediaRootS3Boto3Storage(
+            bucket_name="bucket-test", access_key="AKIDTEST", secret_key="secret",
+            region_name="us-east-1", querystring_auth=True, querystring_expire=3600,
+        )
+        s3 = self.storage.connection.meta.client
+        patcher = mock.patch.object(s3, "generate_presigned_url", wraps=s3.generate_presigned_url)
+        self.firmar = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_memoiza_por_nombre(self):
+        u1 = self.storage.url("propiedades/galeria/1_a.jpg")
+        u2 = self.storage.url("propiedades/galeria/1_a.jpg")
+        self.storage.url("propiedades/galeria/1_b.jpg")
+        self.assertEqual(u1, u2)
+        self.assertIn("Signature=", u1)
+        self.assertEqual(self.firmar.call_count, 2)
+
+    def test_refirma_antes_de_vencer(self):
+        ahora = 1000.0
+        with mock.patch.object(self.mod.time, "monotonic", side_effect=lambda: ahora):
+            self.storage.url("propiedades/x.jpg")
+            ahora += self.storage.url_ttl() - 1
+            self.storage.url("propiedades/x.jpg")
+            self.assertEqual(self.firmar.call_count, 1)
+            ahora += 2
+            self.storage.url("propiedades/x.jpg")
+            self.assertEqual(self.firmar.call_count, 2)
+        # la URL servida siempre tiene al menos esta vida por delante
+        self.assertEqual(self.storage.url_min_validity(), 3600 - 2700)
+
+    def test_lru_acotado(self):
+        with mock.patch.object(self.mod._URL_LRU, "maxsize", 3):
+            for i in range(5):
+                self.storage.url(f"propiedades/{i}.jpg")
+            self.assertEqual(len(self.mod._URL_LRU), 3)
+            self.storage.url("propiedades/0.jpg")
+        self.assertEqual(self.firmar.call_count, 6)
+
+    @override_settings(AWS_PRESIGNED_URL_CACHE_ALIAS="propiedades")
+    def test_cache_compartido_entre_workers(self):
+        caches["propiedades"].clear()
+        u1 = self.storage.url("propiedades/y.jpg")
+        self.mod._URL_LRU.clear()  # "otro worker": LRU local vacío
+        u2 = self.storage.url("propiedades/y.jpg")
+        self.assertEqual(u1, u2)
+        self.assertEqual(self.firmar.call_count, 1)
+
+
+class CodigoUnicoTests(TestCase):
+    """
+    Asignación de codigo_unico: permutación reversible + reserva por bloques.
+    """
+
+    def test_permutacion_biyectiva(self):
+        perm = codigos.Permutacion(10_000, "test")
+        imagen = [perm.aplicar(x) for x in range(10_000)]
+        self.assertEqual(sorted(imagen), list(range(10_000)))
+        self.assertTrue(all(perm.invertir(y) == x for x, y in enumerate(imagen)))
+
+    def test_ida_y_vuelta_en_el_espacio_real(self):
+        perm = codigos._permutacion()
+        rnd = random.Random(7)
+        for x in [0, 1, codigos.ESPACIO - 1] + [rnd.randrange(codigos.ESPACIO) for _ in range(500)]:
+            c = codigos.codigo_desde_indice(perm.aplicar(x))
+            self.assertRegex(c, r"^[A-Z]{3}\d{3}$")
+            self.assertEqual(perm.invertir(codigos.indice_desde_codigo(c)), x)
+
+    def test_clave_de_settings(self):
+        antes = [codigos.codigo_para(s) for s in range(20)]
+        self.addCleanup(codigos._permutacion.cache_clear)
+        with override_settings(PROPIEDADES_CODIGO_CLAVE="otra-clave"):
+            codigos._permutacion.cache_clear()
+            otra = [codigos.codigo_para(s) for s in range(20)]
+        self.assertNotEqual(otra, antes)
+        self.assertEqual(len(set(otra)), 20)
+
+    def test_asignador_concurrente_sin_repetidos(self):
+        contador = iter(range(10**9))
+        lock = threading.Lock()
+        reservas = []
+
+        def reservar(n):
+            with lock:
+                reservas.append(n)
+                return [next(contador) for _ in range(n)]
+
+        asignador = codigos.Asignador(reservar=reservar, bloque=25)
+        por_thread = [[] for _ in range(16)]
+
+        def trabajar(out):
+            for _ in range(500):
+                out.append(asignador.siguiente())
+
+        threads = [threading.Thread(target=trabajar, args=(out,)) for out in por_thread]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        todos = [c for out in por_thread for c in out]
+        self.assertEqual(len(todos), 16 * 500)
+        self.assertEqual(len(set(todos)), len(todos))
+        self.assertEqual(len(reservas), 16 * 500 // 25)
+
+    def test_save_reintenta_si_choca_con_codigo_viejo(self):
+        _seed_propiedades(1)
+        viejo = Propiedad.objects.get().codigo_unico
+        with mock.patch.object(Propiedad, "_generar_codigo_unico", side_effect=[viejo, "ZZZ999"]):
+            p = Propiedad.objects.create(
+                titulo="Nueva", descripcion="x", tipo="casa", tipo_operacion="venta",
+                direccion="x", localidad="Posadas", provincia="Misiones",
+            )
+        self.assertEqual(p.codigo_unico, "ZZZ999")
+
+    def test_save_sin_round_trips_extra(self):
+        Propiedad.objects.create(titulo="a", descripcion="x", tipo="casa", tipo_operacion="venta",
+                                 direccion="x", localidad="Posadas", provincia="Misiones")
+        with mock.patch.object(codigos, "_ASIGNADOR", codigos.Asignador(reservar=lambda n: list(range(n)))):
+            with CaptureQueriesContext(connection) as ctx:
+                Propiedad.objects.create(titulo="b", descripcion="x", tipo="casa", tipo_operacion="venta",
+                                         direccion="x", localidad="Posadas", provincia="Misiones")
+        # sólo el INSERT (más SAVEPOINT/RELEASE), ningún SELECT de sondeo
+        self.assertFalse([q for q in ctx.captured_queries if q["sql"].lstrip().upper().startswith("SELECT")])
+
+    def test_codigos_libres_evita_existentes(self):
+        _seed_propiedades(3)
+        existentes = set(Propiedad.objects.values_list("codigo_unico", flat=True))
+        seq = iter(range(1000))
+        with mock.patch.object(codigos, "codigo_para", side_effect=lambda s: f"TSA{s:03d}"):
+            with mock.patch.object(codigos, "reservar_secuencia", side_effect=lambda n: [next(seq) for _ in range(n)]):
+                out = codigos.codigos_libres(5)
+        self.assertEqual(len(out), 5)
+        self.assertFalse(existentes & set(out))
+
+
+@skipUnless(connection.vendor == "postgresql", "sequence compartida: requiere PostgreSQL")
+class CodigoUnicoConcurrenteTests(TransactionTestCase):
+    """
+    Saves reales desde varios threads (una conexión cada uno): ningún
+    IntegrityError y ningún código repetido.
+    """
+
+    def test_saves_concurrentes(self):
+        errores = []
+
+        def trabajar(n):
+            try:
+                for i in range(n):
+                    Propiedad.objects.create(
+                        titulo=f"c{i}", descripcion="x", tipo="casa", tipo_operacion="venta",
+                        direccion="x", localidad="Posadas", provincia="Misiones",
+                    )
+            except Exception as e:  # pragma: no cover
+                errores.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=trabajar, args=(100,)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errores, [])
+        self.assertEqual(Propiedad.objects.count(), 800)
+        self.assertEqual(Propiedad.objects.values("codigo_unico").distinct().count(), 800)
+
+
+@override_settings(STORAGES=STATIC_SIN_MANIFEST, PROPIEDADES_METRICAS=True)
+class MetricasMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        _seed_propiedades(30)
+
+    def test_log_json_y_server_timing(self):
+        with self.assertLogs("propiedades.metricas", "INFO") as logs:
+            with CaptureQueriesContext(connection) as ctx:
+                resp = self.client.get("/propiedades/lista/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("db;dur=", resp["Server-Timing"])
+        linea = json.loads(logs.records[0].getMessage())
+        self.assertEqual(linea["view"], "propiedades:lista")
+        self.assertEqual(linea["queries"], len(ctx.captured_queries))
+        self.assertEqual(linea["bytes"], len(resp.content))
+        self.assertGreater(linea["template_ms"], 0)
+
+    @override_settings(PROPIEDADES_METRICAS=False)
+    def test_desactivado(self):
+        resp = self.client.get("/propiedades/lista/")
+        self.assertNotIn("Server-Timing", resp)
+
+
+@override_settings(STORAGES=STATIC_SIN_MANIFEST)
+class BusquedaCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        _seed_propiedades(60)
+
+    def setUp(self):
+        caches["propiedades"].clear()
+
+    def _get(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return resp, ctx.captured_queries
+
+    def test_repetida_sale_del_cache(self):
+        url = "/propiedades/busqueda/?tipo_operacion=venta&dormitorios=2"
+        r1, q1 = self._get(url)
+        # misma búsqueda con otra forma de escribir los parámetros
+        r2, q2 = self._get("/propiedades/busqueda/?dormitorios=02&tipo_operacion=venta")
+        self.assertEqual(
+            [p.pk for p in r1.context["page_obj"]], [p.pk for p in r2.context["page_obj"]]
+        )
+        self.assertEqual(len(q2), 1)  # sólo las filas de la página, por pk
+        self.assertNotIn("COUNT", q2[0]["sql"].upper())
+        self.assertLess(len(q2), len(q1))
+
+    @override_settings(PROPIEDADES_CONTEO_ESTIMADO=True)
+    def test_save_invalida(self):
+        url = "/propiedades/busqueda/?tipo_operacion=venta"
+        antes = self._get(url)[0].context["page_obj"].estimated_count
+        p = Propiedad.objects.filter(estado_publicacion="publicada", tipo_operacion="alquiler").first()
+        p.tipo_operacion = "venta"
+        with mock.patch("propiedades.signals.refrescar_destacadas_en_segundo_plano"), \
+                self.captureOnCommitCallbacks(execute=True):
+            p.save()
+        self.assertEqual(self._get(url)[0].context["page_obj"].estimated_count, antes + 1)
+
+    def _recorrer(self, url):
+        paginas, cursor = [], ""
+        while cursor is not None:
+            page = self._get(url + cursor)[0].context["page_obj"]
+            self.assertTrue(page.is_keyset)
+            paginas.append([p.pk for p in page])
+            cursor = f"&cursor={page.next_cursor}" if page.next_cursor else None
+        return paginas, page
+
+    def test_cursor_sobre_la_lista_cacheada(self):
+        url = "/propiedades/busqueda/?tipo_operacion=venta"
+        with override_settings(PROPIEDADES_BUSQUEDA_CACHE_TIMEOUT=0):
+            sin_cache, _ = self._recorrer(url)
+        con_cache, ultima = self._recorrer(url)
+        self.assertGreater(len(con_cache), 1)
+        self.assertEqual(con_cache, sin_cache)
+
+        # hacia atrás con el mismo token, una sola consulta por pk
+        resp, queries = self._get(f"{url}&cursor={ultima.previous_cursor}")
+        self.assertEqual([p.pk for p in resp.context["page_obj"]], con_cache[-2])
+        self.assertEqual(len(queries), 1)
+
+    def test_cursor_fuera_de_la_lista_sigue_sobre_la_db(self):
+        from .pagination import encode_cursor, keyset_page
+        url = "/propiedades/busqueda/?tipo_operacion=venta"
+        self._get(url)  # deja la lista en cache
+        fuera = Propiedad.objects.filter(estado_publicacion="publicada").exclude(tipo_operacion="venta").first()
+        token = encode_cursor(fuera, "n")
+        resp, _ = self._get(f"{url}&cursor={token}")
+        venta = Propiedad.objects.filter(estado_publicacion="publicada", tipo_operacion="venta")
+        self.assertEqual(
+            [p.pk for p in resp.context["page_obj"]], [p.pk for p in keyset_page(venta, token, 12)]
+        )
+
+    @override_settings(PROPIEDADES_BUSQUEDA_CACHE_MAX_IDS=3)
+    def test_demasiados_resultados_no_se_cachean(self):
+        _, q1 = self._get("/propiedades/busqueda/?tipo_operacion=venta")
+        _, q2 = self._get("/propiedades/busqueda/?tipo_operacion=venta")
+        self.assertEqual(len(q2), len(q1) - 2)  # ya no vuelve a traer los ids ni las facetas
+
+
+@override_settings(STORAGES=STATIC_SIN_MANIFEST)
+class GetCondicionalTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        _seed_propiedades(40)
+
+    def _revalidar(self, url, last_modified=True):
+        r1 = self.client.get(url)
+        self.assertEqual(r1.status_code, 200)
+        self.assertIn("public", r1["Cache-Control"])
+        with self.assertNumQueries(1), self.assertTemplateNotUsed("propiedades/_card.html"):
+            r2 = self.client.get(url, HTTP_IF_NONE_MATCH=r1["ETag"])
+        self.assertEqual(r2.status_code, 304)
+        self.assertIn("max-age=", r2["Cache-Control"])
+        if last_modified:
+            r3 = self.client.get(url, HTTP_IF_MODIFIED_SINCE=r1["Last-Modified"])
+            self.assertEqual(r3.status_code, 304)
+        return r1
+
+    def test_lista_304_y_cambia_al_guardar(self):
+        r1 = self._revalidar("/propiedades/lista/", last_modified=False)
+        # otra página => otro ETag
+        self.assertNotEqual(self.client.get("/propiedades/lista/?page=2")["ETag"], r1["ETag"])
+        Propiedad.objects.filter(estado_publicacion="publicada").first().save()
+        r2 = self.client.get("/propiedades/lista/", HTTP_IF_NONE_MATCH=r1["ETag"])
+        self.assertEqual(r2.status_code, 200)
+
+    def test_lista_borrar_una_vieja_no_da_304(self):
+        r1 = self.client.get("/propiedades/lista/")
+        # sin Last-Modified: el Max(fecha) no cambia al borrar una fila vieja
+        self.assertFalse(r1.has_header("Last-Modified"))
+        Propiedad.objects.filter(estado_publicacion="publicada").order_by("fecha_actualizacion").first().delete()
+        r2 = self.client.get("/propiedades/lista/", HTTP_IF_NONE_MATCH=r1["ETag"])
+        self.assertEqual(r2.status_code, 200)
+
+    def test_detalle_304_y_galeria_toca_al_padre(self):
+        from .models import PropiedadImagen
+        p = Propiedad.objects.first()
+        r1 = self._revalidar(f"/propiedades/{p.pk}/")
+        PropiedadImagen.objects.create(propiedad=p, imagen="propiedades/galeria/x.jpg")
+        r2 = self.client.get(f"/propiedades/{p.pk}/", HTTP_IF_NONE_MATCH=r1["ETag"])
+        self.assertEqual(r2.status_code, 200)
+
+    def test_detalle_inexistente_404(self):
+        self.assertEqual(self.client.get("/propiedades/999999/").status_code, 404)
+
+
+@override_settings(STORAGES=STATIC_SIN_MANIFEST)
+class DetalleQueriesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        from .models import PropiedadImagen
+        _seed_propiedades(1)
+        cls.prop = Propiedad.objects.get()
+        cls.prop.imagen_principal.name = "propiedades/imagenes_principal/1_principal.jpg"
+        cls.prop.save(update_fields=["imagen_principal"])
+        PropiedadImagen.objects.bulk_create([
+            PropiedadImagen(propiedad=cls.prop, imagen=f"propiedades/galeria/1_{i:02d}.jpg", orden=orden)
+            for i, orden in enumerate([2, 0, 1, 0])
+        ])
+
+    def test_detalle_en_dos_consultas(self):
+        with self.assertNumQueries(2):
+            resp = self.client.get(f"/propiedades/{self.prop.pk}/")
+        self.assertEqual(resp.status_code, 200)
+
+    def test_galeria_ordenada(self):
+        resp = self.client.get(f"/propiedades/{self.prop.pk}/")
+        nombres = [foto.imagen.name for foto, _ in resp.context["galeria"]]
+        # orden, y a igual orden el id: determinístico
+        self.assertEqual(nombres, [
+            "propiedades/galeria/1_01.jpg", "propiedades/galeria/1_03.jpg",
+            "propiedades/galeria/1_02.jpg", "propiedades/galeria/1_00.jpg",
+        ])
+
+
+@override_settings(STORAGES=STATIC_SIN_MANIFEST)
+class CardCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        _seed_propiedades(1)
+
+    def setUp(self):
+        caches["propiedades"].clear()
+
+    def _card(self):
+        from .cache import render_card
+        return render_card(Propiedad.objects.cards().get())
+
+    def test_hit_sin_consultas_ni_render(self):
+        from .cache import render_card
+        html = self._card()
+        prop = Propiedad.objects.cards().get()
+        with self.assertNumQueries(0), mock.patch("propiedades.cache.render_to_string") as render:
+            self.assertEqual(render_card(prop), html)
+        render.assert_not_called()
+
+    def test_fecha_distinta_se_vuelve_a_renderizar(self):
+        from django.db.models.functions import Now
+        self._card()
+        # update() no dispara signals: la card queda en cache con la fecha vieja
+        Propiedad.objects.update(titulo="Título nuevo", fecha_actualizacion=Now())
+        self.assertIn("Título nuevo", self._card())
+
+    def test_save_y_delete_invalidan(self):
+        from .cache import card_key
+        prop = Propiedad.objects.get()
+        key = card_key(prop.pk)
+        self._card()
+        prop.titulo = "Guardado"
+        prop.save()
+        self.assertIsNone(caches["propiedades"].get(key))
+        self.assertIn("Guardado", self._card())
+
+        prop.delete()
+        self.assertIsNone(caches["propiedades"].get(key))
+
+
+@override_settings(STORAGES=STATIC_SIN_MANIFEST, PROPIEDADES_PAGINACION="keyset")
+class ProyeccionCardsTests(TestCase):
+    """
+    Los listados traen sólo CARD_FIELDS: nunca los textos largos.
+    """
+    BLOBS = ("descripcion", "amenidades", "search_vector")
+
+    @classmethod
+    def setUpTestData(cls):
+        _seed_propiedades(80)
+
+    def setUp(self):
+        caches["propiedades"].clear()
+
+    def _columnas(self, sql):
+        # lista de columnas del SELECT más externo
+        return sql[:sql.upper().index(" FROM ")]
+
+    def test_listados_sin_blobs(self):
+        urls = [
+            "/propiedades/",
+            "/propiedades/lista/",
+            "/propiedades/busqueda/?tipo_operacion=venta&localidad=a",
+            "/propiedades/busqueda/?tipo_operacion=venta&localidad=a",   # cache de ids
+            "/propiedades/busqueda/?q=casa+luminosa",
+        ]
+        for url in urls:
+            with CaptureQueriesContext(connection) as ctx:
+                resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            selects = [q["sql"] for q in ctx.captured_queries if 'FROM "propiedades_propiedad"' in q["sql"]]
+            self.assertTrue(selects, url)
+            for sql in selects:
+                for blob in self.BLOBS:
+                    with self.subTest(url=url, blob=blob):
+                        self.assertNotIn(blob, self._columnas(sql))
+            # y ninguna card dispara una consulta por campo diferido
+            self.assertLessEqual(len(ctx.captured_queries), 3, url)
+
+
+@override_settings(STORAGES=STATIC_SIN_MANIFEST)
+class FacetasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        _seed_propiedades(120)
+
+    def setUp(self):
+        caches["propiedades"].clear()
+
+    def test_conteos_en_una_consulta_y_cacheados(self):
+        url = "/propiedades/busqueda/?tipo_operacion=venta&dormitorios=2"
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        agregadas = [q for q in ctx.captured_queries if "GROUP BY" in q["sql"].upper()]
+        self.assertEqual(len(agregadas), 1)
+
+        facetas = resp.context["facetas"]
+        publicadas = Propiedad.objects.filter(estado_publicacion="publicada")
+        qs = publicadas.filter(tipo_operacion="venta", dormitorios__gte=2)
+        self.assertEqual(facetas["total"], qs.count())
+        for key, _, n in facetas["tipo"]:
+            self.assertEqual(n, qs.filter(tipo=key).count(), key)
+        for nombre, n, _ in facetas["localidad"]:
+            self.assertEqual(n, qs.filter(localidad=nombre).count(), nombre)
+        self.assertEqual(sum(n for _, n, _ in facetas["precio"]), qs.filter(precio_pesos__isnull=False).count())
+        # disyuntivas: cada faceta sin su propio filtro
+        for key, _, n in facetas["tipo_operacion"]:
+            self.assertEqual(n, publicadas.filter(dormitorios__gte=2, tipo_operacion=key).count(), key)
+        for d, n in zip((1, 2, 3, 4), (n for _, n, _ in facetas["dormitorios"])):
+            self.assertEqual(n, publicadas.filter(tipo_operacion="venta", dormitorios__gte=d).count(), d)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        self.assertFalse([q for q in ctx.captured_queries if "GROUP BY" in q["sql"].upper()])
+
+    def test_otros_valores_de_la_faceta_elegida(self):
+        facetas = self.client.get("/propiedades/busqueda/?tipo=casa&localidad=posadas").context["facetas"]
+        publicadas = Propiedad.objects.filter(estado_publicacion="publicada")
+        for key, _, n in facetas["tipo"]:
+            self.assertEqual(n, publicadas.filter(tipo=key, localidad="Posadas").count(), key)
+        self.assertGreater(sum(n for key, _, n in facetas["tipo"] if key != "casa"), 0)
+        localidades = dict((nombre, n) for nombre, n, _ in facetas["localidad"])
+        self.assertEqual(localidades["Oberá"], publicadas.filter(tipo="casa", localidad="Oberá").count())
+
+    def test_select_muestra_conteos_y_la_pagina_vacia_no_calcula(self):
+        n = Propiedad.objects.filter(estado_publicacion="publicada", tipo_operacion="venta").count()
+        self.assertContains(self.client.get("/propiedades/busqueda/?tipo_operacion=venta"), f"Venta ({n})")
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get("/propiedades/busqueda/")
+        self.assertFalse(ctx.captured_queries)
+        self.assertIsNone(resp.context["facetas"])
+        self.assertContains(resp, ">Venta</option>")
+
+
+@override_settings(STORAGES=STATIC_SIN_MANIFEST)
+class ApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        _seed_propiedades(90)
+
+    def setUp(self):
+        caches["propiedades"].clear()
+
+    def test_lista_keyset_completa(self):
+        vistos = []
+        url = "/propiedades/api/?limit=7&fields=titulo,precio_usd"
+        while url:
+            data = self.client.get(url).json()
+            self.assertLessEqual(len(data["results"]), 7)
+            self.assertEqual(set(data["results"][0]), {"id", "titulo", "precio_usd"})
+            vistos += [r["id"] for r in data["results"]]
+            url = data["next"]
+        esperados = list(
+            Propiedad.objects.filter(estado_publicacion="publicada")
+            .order_by("-fecha_actualizacion", "-id").values_list("id", flat=True)
+        )
+        self.assertEqual(vistos, esperados)
+
+    def test_busqueda_mismos_filtros_que_html(self):
+        params = "tipo_operacion=venta&localidad=obera"
+        data = self.client.get(f"/propiedades/api/busqueda/?{params}&facetas=1&limit=100").json()
+        html = self.client.get(f"/propiedades/busqueda/?{params}")
+        self.assertEqual(len(data["results"]), html.context["facetas"]["total"])
+        self.assertEqual(data["facetas"]["total"], len(data["results"]))
+        self.assertTrue(all(r["tipo_operacion"] == "venta" for r in data["results"]))
+
+    def test_campos_y_detalle(self):
+        self.assertEqual(self.client.get("/propiedades/api/?fields=search_vector").status_code, 400)
+        p = Propiedad.objects.filter(estado_publicacion="publicada").first()
+        with self.assertNumQueries(2):
+            data = self.client.get(f"/propiedades/api/{p.pk}/").json()
+        self.assertEqual(data["codigo_unico"], p.codigo_unico)
+        self.assertEqual(data["galeria"], [])
+        borrador = Propiedad.objects.exclude(estado_publicacion="publicada").first()
+        self.assertEqual(self.client.get(f"/propiedades/api/{borrador.pk}/").status_code, 404)
+
+    def test_fields_fuera_de_la_lista_blanca(self):
+        p = Propiedad.objects.filter(estado_publicacion="publicada").first()
+        for url in ("/propiedades/api/?fields=titulo,password",
+                    "/propiedades/api/?fields=galeria",            # sólo en el detalle
+                    "/propiedades/api/busqueda/?tipo=casa&fields=search_vector",
+                    f"/propiedades/api/{p.pk}/?fields=estado_publicacion"):
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 400, url)
+            self.assertIn("error", resp.json())
+        data = self.client.get(f"/propiedades/api/{p.pk}/?fields=titulo").json()
+        self.assertEqual(data, {"id": p.pk, "titulo": p.titulo})
+
+    def test_cursor_adelante_y_atras(self):
+        url = "/propiedades/api/?limit=5&fields=titulo"
+        p1 = self.client.get(url).json()
+        self.assertIsNone(p1["previous"])
+        p2 = self.client.get(p1["next"]).json()
+        p3 = self.client.get(p2["next"]).json()
+        self.assertEqual(self.client.get(p3["previous"]).json()["results"], p2["results"])
+        self.assertEqual(self.client.get(p2["previous"]).json()["results"], p1["results"])
+        # cursor adulterado: primera página, no 500
+        self.assertEqual(self.client.get(url + "&cursor=xxx").json()["results"], p1["results"])
+
+    def test_relevancia_por_numero_de_pagina(self):
+        url = "/propiedades/api/busqueda/?q=casa&limit=4&fields=titulo"
+        esperados = self.client.get("/propiedades/busqueda/?q=casa").context["page_obj"].paginator.count
+        vistos, pagina = [], self.client.get(url).json()
+        self.assertIn("page=2", pagina["next"])
+        self.assertNotIn("cursor", pagina["next"])
+        while True:
+            vistos += [r["id"] for r in pagina["results"]]
+            if not pagina["next"]:
+                break
+            pagina = self.client.get(pagina["next"]).json()
+        self.assertEqual(len(vistos), esperados)
+        self.assertEqual(len(set(vistos)), len(vistos))
+        self.assertIn("page=", pagina["previous"])
+
+    def test_detalle_inexistente_404(self):
+        resp = self.client.get("/propiedades/api/999999/")
+        self.assertEqual(resp.status_code, 404)
+        self.assertEqual(resp.json(), {"error": "No existe la propiedad."})
+
+    def test_gzip(self):
+        resp = self.client.get("/propiedades/api/?limit=50", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(resp["Content-Encoding"], "gzip")
+
+    def test_precios_no_finitos_se_ignoran(self):
+        from .busqueda import _num
+        for valor in ("inf", "-inf", "1e400", "nan", "NaN", "infk"):
+            self.assertIsNone(_num(valor), valor)
+            for url in ("/propiedades/busqueda/", "/propiedades/api/busqueda/"):
+                self.assertEqual(self.client.get(url, {"price_min": valor, "usd_max": valor}).status_code, 200)
+        self.assertEqual(_num("150k"), 150000)
+
+
+class FullTextTests(SimpleTestCase):
+    """
+    Armado de la búsqueda full-text (fulltext.py): no consulta la DB, así que
+    corre en cualquier motor; el comportamiento en Postgres está en
+    FullTextPostgresTests.
+    """
+
+    def _lookups(self, nodo):
+        for hijo in nodo.children:
+            if hasattr(hijo, "children"):
+                yield from self._lookups(hijo)
+            else:
+                yield hijo
+
+    @override_settings(PROPIEDADES_FUZZY_UMBRAL=0.45)
+    def test_umbral_configurado_va_en_la_consulta(self):
+        from django.db.models.functions import Greatest
+        from .fulltext import filtrar_fulltext
+        qs = filtrar_fulltext(Propiedad.objects.all(), "posdas")
+        umbrales = [
+            l.rhs for l in self._lookups(qs.query.where)
+            if l.lookup_name == "gte" and isinstance(l.lhs, Greatest)
+        ]
+        self.assertEqual(umbrales, [0.45])
+
+    def test_build_tsquery(self):
+        from .fulltext import build_tsquery
+        casos = {
+            # sinónimos en OR dentro de cada palabra, palabras en AND, prefijos :*
+            "depto posadas": "(apartamento:* | depto:*) & (posadas:*)",
+            "DEPTO": "(apartamento:* | depto:*)",
+            # sin tildes, igual que f_unaccent en el vector
+            "Oberá Garupá": "(obera:*) & (garupa:*)",
+            "galpón": "(galpon:*)",
+            # lo que no es lexema parte el token: no se puede inyectar sintaxis
+            "casa&|!():x": "(casa:* & x:*)",
+            "a:* | b": "(a:*) & (b:*)",
+            "dúplex-2 ambientes": "(duplex:* & 2:*) & (ambientes:*)",
+            "&|!(): <->": "",
+            "": "",
+            "   ": "",
+            None: "",
+        }
+        for q, esperado in casos.items():
+            with self.subTest(q=q):
+                self.assertEqual(build_tsquery(q), esperado)
+
+    def test_nada_que_buscar(self):
+        from .fulltext import filtrar_fulltext
+        for q in ("", "   ", None):
+            with self.subTest(q=q):
+                self.assertTrue(filtrar_fulltext(Propiedad.objects.all(), q).query.is_empty())
+        # sólo símbolos: no queda ningún lexema para el tsquery
+        self.assertTrue(filtrar_fulltext(Propiedad.objects.all(), "&|!", fuzzy=False).query.is_empty())
+
+
+class BusquedaSpecTests(SimpleTestCase):
+
+    def _spec(self, query):
+        from django.http import QueryDict
+        from .busqueda import BusquedaSpec
+        return BusquedaSpec.desde_query(QueryDict(query))
+
+    def test_spec_canonica_y_hashable(self):
+        a = self._spec("dormitorios=02&tipo=casa&localidad=Oberá&currency=usd")
+        b = self._spec("localidad=obera&tipo=casa&dormitorios=2")
+        self.assertEqual(a, b)
+        self.assertEqual(hash(a), hash(b))
+        self.assertEqual(repr(a.clave()), repr(b.clave()))   # misma clave de cache
+        self.assertNotEqual(a, self._spec("dormitorios=3&tipo=casa&localidad=obera"))
+        self.assertFalse(self._spec("page=2&currency=usd").tiene_filtros())
+        self.assertEqual(self._spec("price_max=150k&currency=usd").precio, ("usd", None, 150000))
+
+    def test_columna_normalizada_una_sola_vez(self):
+        spec = self._spec("q=casa posadas&localidad=Oberá&provincia=misiones")
+        qs = spec.compilar(Propiedad.objects.all())
+        for campo in ("localidad", "provincia", "titulo"):
+            with self.subTest(campo=campo):
+                self.assertEqual(len([a for a in qs.query.annotations if a.endswith(campo)]), 1)
+        self.assertEqual([k for k, _ in spec.chips()], ["q", "localidad", "provincia"])
+
+
+@override_settings(STORAGES=STATIC_SIN_MANIFEST)
+class DestacadasHomeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        _seed_propiedades(40)
+        Propiedad.objects.filter(estado_publicacion="publicada").update(is_destacada=True)
+
+    def setUp(self):
+        caches["propiedades"].clear()
+
+    def test_home_tibia_sin_consultas(self):
+        self.client.get("/propiedades/")
+        with self.assertNumQueries(0):
+            resp = self.client.get("/propiedades/")
+        self.assertEqual(resp.status_code, 200)
+
+    def test_save_rearma_el_bloque(self):
+        from .cache import refrescar_destacadas
+        self.client.get("/propiedades/")
+        p = Propiedad.objects.filter(is_destacada=True, estado_publicacion="publicada").last()
+        p.titulo = "Recién destacada"
+        # el thread de fondo usaría otra conexión, que no ve la transacción del test
+        with mock.patch("propiedades.signals.refrescar_destacadas_en_segundo_plano",
+                        side_effect=refrescar_destacadas) as refrescar, \
+                self.captureOnCommitCallbacks(execute=True) as callbacks:
+            p.save()
+        self.assertIn(refrescar, callbacks)
+        refrescar.assert_called_once_with()
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get("/propiedades/"), "Recién destacada")
+
+    @override_settings(PROPIEDADES_DESTACADAS_FRESCO=0)
+    def test_vencido_se_sirve_y_refresca_de_fondo(self):
+        primera = self.client.get("/propiedades/").content
+        with mock.patch("propiedades.cache.refrescar_destacadas_en_segundo_plano") as refrescar, \
+                self.assertNumQueries(0):
+            resp = self.client.get("/propiedades/")
+        self.assertEqual(resp.content, primera)
+        refrescar.assert_called_once()
+
+
+@mock.patch("propiedades.sitemap.SITEMAP_TAMANO", 10)
+class SitemapTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        _seed_propiedades(60)
+
+    def _contenido(self, resp):
+        return b"".join(resp.streaming_content).decode()
+
+    def test_indice_y_shards(self):
+        from . import sitemap
+        partes = sitemap.shards()
+        indice = self._contenido(self.client.get("/propiedades/sitemap.xml"))
+        self.assertEqual(indice.count("<sitemap>"), len(partes))
+
+        total = 0
+        for k, n, ultima, _ in partes:
+            resp = self.client.get(f"/propiedades/sitemap-{k}.xml")
+            xml = self._contenido(resp)
+            self.assertEqual(xml.count("<url>"), n)
+            total += n
+            r304 = self.client.get(f"/propiedades/sitemap-{k}.xml", HTTP_IF_MODIFIED_SINCE=resp["Last-Modified"])
+            self.assertEqual(r304.status_code, 304)
+        self.assertEqual(total, Propiedad.objects.filter(estado_publicacion="publicada").count())
+        self.assertEqual(self.client.get("/propiedades/sitemap-999.xml").status_code, 404)
+
+    def test_comando_reescribe_solo_lo_que_cambio(self):
+        import tempfile
+        from django.core.management import call_command
+        from django.core.files.storage import default_storage
+
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media, STORAGES={
+            **STATIC_SIN_MANIFEST,
+            "default": {"BACKEND": "django.core.files.storage.FileSystemStorage", "OPTIONS": {"location": media}},
+        }):
+            def correr():
+                out = []
+                with mock.patch.object(default_storage, "save", wraps=default_storage.save) as save:
+                    call_command("generar_sitemap", base_url="https://ejemplo.com", stdout=mock.MagicMock())
+                    out = [c.args[0] for c in save.call_args_list]
+                return out
+
+            primera = correr()
+            self.assertIn("sitemaps/propiedades.xml", primera)
+            self.assertEqual(correr(), [])
+
+            p = Propiedad.objects.filter(estado_publicacion="publicada").order_by("id").last()
+            p.titulo = "Cambiada"
+            p.save()
+            from . import sitemap
+            k = p.pk // sitemap.SITEMAP_TAMANO
+            self.assertEqual(
+                sorted(correr()),
+                sorted(["sitemaps/manifest.json", "sitemaps/propiedades.xml", f"sitemaps/propiedades-{k}.xml"]),
+            )
+            with default_storage.open(f"sitemaps/propiedades-{k}.xml") as fh:
+                self.assertIn(f"https://ejemplo.com/propiedades/{p.pk}/", fh.read().decode())
+
+
+@override_settings(STORAGES=STATIC_SIN_MANIFEST)
+class VistasAsyncTests(TestCase):
+    """Las vistas ASGI (PROPIEDADES_VISTAS_ASYNC) responden igual que las sync."""
+
+    @classmethod
+    def setUpTestData(cls):
+        _seed_propiedades(10)
+        cls.prop = Propiedad.objects.filter(estado_publicacion="publicada").first()
+        cls.borrador = Propiedad.objects.exclude(estado_publicacion="publicada").first()
+
+    def _llamar(self, view, path, **kwargs):
+        from asgiref.sync import async_to_sync
+        from django.test import RequestFactory
+        headers = kwargs.pop("headers", {})
+        return async_to_sync(view)(RequestFactory().get(path, headers=headers), **kwargs)
+
+    def test_detalle_mismos_validadores_304_y_404(self):
+        from django.http import Http404
+        from .views import detalle_propiedad_async
+
+        url = f"/propiedades/{self.prop.pk}/"
+        sync = self.client.get(url)
+        r1 = self._llamar(detalle_propiedad_async, url, pk=self.prop.pk)
+        self.assertEqual(r1.status_code, 200)
+        self.assertEqual(r1["ETag"], sync["ETag"])
+        self.assertEqual(r1["Last-Modified"], sync["Last-Modified"])
+        self.assertIn("public", r1["Cache-Control"])
+        self.assertIn(self.prop.titulo, r1.content.decode())
+
+        with self.assertNumQueries(1):
+            r2 = self._llamar(detalle_propiedad_async, url, pk=self.prop.pk, headers={"If-None-Match": r1["ETag"]})
+        self.assertEqual(r2.status_code, 304)
+        with self.assertRaises(Http404):
+            self._llamar(detalle_propiedad_async, "/propiedades/999999/", pk=999999)
+
+    def test_contacto_y_api_detalle(self):
+        from django.http import Http404
+        from . import api
+        from .views import contacto_view_async
+
+        resp = self._llamar(contacto_view_async, f"/propiedades/contacto/?propiedad_id={self.prop.pk}")
+        self.assertIn(f"Consulta por {self.prop.titulo}", resp.content.decode())
+        with self.assertRaises(Http404):
+            self._llamar(contacto_view_async, f"/propiedades/contacto/?propiedad_id={self.borrador.pk}")
+
+        url = f"/propiedades/api/{self.prop.pk}/"
+        resp = self._llamar(api.detalle_async, url, pk=self.prop.pk)
+        self.assertEqual(json.loads(resp.content), self.client.get(url).json())
+        resp = self._llamar(api.detalle_async, url, pk=self.borrador.pk)
+        self.assertEqual(resp.status_code, 404)
+
+
+@override_settings(STORAGES=STATIC_SIN_MANIFEST)
+class LotesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        _seed_propiedades(30)
+
+    def test_accion_un_update_e_invalida_una_vez(self):
+        from . import lotes
+        borradores = Propiedad.objects.exclude(estado_publicacion="publicada")
+        pks = list(borradores.values_list("pk", flat=True))
+        antes = dict(borradores.values_list("pk", "fecha_actualizacion"))
+
+        with mock.patch("propiedades.lotes.bump_busqueda_version") as bump, \
+                mock.patch("propiedades.lotes.refrescar_destacadas_en_segundo_plano") as refrescar, \
+                self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(1):
+                n = lotes.aplicar_accion(Propiedad.objects.filter(pk__in=pks), "publicar")
+        self.assertEqual(n, len(pks))
+        self.assertEqual(bump.call_count, 1)
+        self.assertEqual(refrescar.call_count, 1)
+        for pk, fecha in Propiedad.objects.filter(pk__in=pks).values_list("pk", "fecha_actualizacion"):
+            self.assertGreater(fecha, antes[pk])
+        # repetirla no toca nada (ni fechas ni caches)
+        self.assertEqual(lotes.aplicar_accion(Propiedad.objects.filter(pk__in=pks), "publicar"), 0)
+
+    def test_admin_destacar(self):
+        from django.contrib.auth.models import User
+        self.client.force_login(User.objects.create_superuser("admin", "a@b.c", "x"))
+        pks = list(Propiedad.objects.filter(is_destacada=False).values_list("pk", flat=True)[:5])
+        resp = self.client.post("/admin/propiedades/propiedad/", {
+            "action": "destacar", "_selected_action": pks,
+        })
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(Propiedad.objects.filter(pk__in=pks, is_destacada=True).count(), 5)
+
+    def test_csv_vista_previa_y_aplicar(self):
+        import tempfile
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        a, b, c = Propiedad.objects.order_by("pk")[:3]
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", encoding="utf-8", delete=False) as fh:
+            fh.write("codigo_unico,estado_publicacion,is_destacada,precio_usd\n")
+            fh.write(f"{a.codigo_unico},archivada,sí,99000\n")
+            fh.write(f"{b.codigo_unico},publicada,,null\n")
+            fh.write(f"{c.codigo_unico},{c.estado_publicacion},,\n")
+            fh.write("NO-EXISTE,publicada,,\n")
+        call_command("editar_propiedades", fh.name, stdout=mock.MagicMock())
+        self.assertEqual(Propiedad.objects.get(pk=a.pk).estado_publicacion, a.estado_publicacion)
+
+        with CaptureQueriesContext(connection) as ctx:
+            call_command("editar_propiedades", fh.name, yes=True, stdout=mock.MagicMock())
+        sentencias = [q["sql"].split()[0] for q in ctx.captured_queries if "SAVEPOINT" not in q["sql"]]
+        self.assertEqual(sentencias, ["SELECT", "UPDATE"])  # comparación + un UPDATE para el lote
+        a2, b2, c2 = Propiedad.objects.order_by("pk")[:3]
+        self.assertEqual((a2.estado_publicacion, a2.is_destacada, a2.precio_usd), ("archivada", True, Decimal("99000")))
+        self.assertEqual((b2.estado_publicacion, b2.precio_usd), ("publicada", None))
+        self.assertEqual(c2.fecha_actualizacion, c.fecha_actualizacion)
+
+        with open(fh.name, "w", encoding="utf-8") as out:
+            out.write(f"id,estado_publicacion\n{a.pk},vendida\n")
+        with self.assertRaises(CommandError):
+            call_command("editar_propiedades", fh.name, yes=True, stdout=mock.MagicMock(), stderr=mock.MagicMock())
+
+
+class ReconciliarMediaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        from .models import PropiedadImagen
+        _seed_propiedades(2)
+        cls.a, cls.b = Propiedad.objects.order_by("pk")
+        Propiedad.objects.filter(pk=cls.a.pk).update(imagen_principal="propiedades/imagenes_principal/a.jpg")
+        Propiedad.objects.filter(pk=cls.b.pk).update(imagen_principal="propiedades/imagenes_principal/falta.jpg")
+        PropiedadImagen.objects.bulk_create([
+            PropiedadImagen(propiedad=cls.a, imagen="propiedades/galeria/ok.jpg"),
+            PropiedadImagen(propiedad=cls.a, imagen="propiedades/galeria/falta_1.jpg"),
+            PropiedadImagen(propiedad=cls.b, imagen="propiedades/galeria/falta_2.jpg"),
+        ])
+
+    def setUp(self):
+        import tempfile
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        ctx = override_settings(MEDIA_ROOT=media.name, STORAGES={
+            **STATIC_SIN_MANIFEST,
+            "default": {"BACKEND": "django.core.files.storage.FileSystemStorage", "OPTIONS": {"location": media.name}},
+        })
+        ctx.enable()
+        self.addCleanup(ctx.disable)
+        for name in ("propiedades/imagenes_principal/a.jpg", "propiedades/galeria/ok.jpg",
+                     "propiedades/galeria/ok__w480.webp", "propiedades/galeria/huerfano.jpg",
+                     "propiedades/galeria/huerfano__w480.webp"):
+            default_storage.save(name, ContentFile(b"x"))
+        self.storage = default_storage
+
+    def _correr(self, **opts):
+        from django.core.management import call_command
+        call_command("reconciliar_media", borrar_huerfanos=True, limpiar_faltantes=True,
+                     stdout=mock.MagicMock(), **opts)
+
+    def test_vista_previa_no_cambia_nada(self):
+        self._correr()
+        self.assertTrue(self.storage.exists("propiedades/galeria/huerfano.jpg"))
+        self.assertEqual(Propiedad.objects.get(pk=self.b.pk).imagen_principal.name,
+                         "propiedades/imagenes_principal/falta.jpg")
+        self.assertEqual(self.a.imagenes.count() + self.b.imagenes.count(), 3)
+
+    def test_huerfanos_y_faltantes(self):
+        from django.db.models.signals import post_delete
+        from .models import PropiedadImagen
+        antes = Propiedad.objects.get(pk=self.a.pk).fecha_actualizacion
+        # el resto de los receivers de la galería sigue corriendo
+        otro = mock.Mock()
+        post_delete.connect(otro, sender=PropiedadImagen, weak=False, dispatch_uid="test_otro_receiver")
+        self.addCleanup(post_delete.disconnect, sender=PropiedadImagen, dispatch_uid="test_otro_receiver")
+        with mock.patch("propiedades.lotes.bump_busqueda_version") as bump, \
+                mock.patch("propiedades.signals.bump_busqueda_version") as bump_senal, \
+                mock.patch("propiedades.lotes.refrescar_destacadas_en_segundo_plano"), \
+                self.captureOnCommitCallbacks(execute=True):
+            self._correr(yes=True)
+
+        # huérfano y su variante borrados; lo referenciado (y sus variantes) queda
+        self.assertFalse(self.storage.exists("propiedades/galeria/huerfano.jpg"))
+        self.assertFalse(self.storage.exists("propiedades/galeria/huerfano__w480.webp"))
+        self.assertTrue(self.storage.exists("propiedades/galeria/ok.jpg"))
+        self.assertTrue(self.storage.exists("propiedades/galeria/ok__w480.webp"))
+
+        a, b = Propiedad.objects.order_by("pk")
+        self.assertEqual(a.imagen_principal.name, "propiedades/imagenes_principal/a.jpg")
+        self.assertEqual(b.imagen_principal.name, "")
+        self.assertEqual([f.imagen.name for f in a.imagenes.all()], ["propiedades/galeria/ok.jpg"])
+        self.assertEqual(b.imagenes.count(), 0)
+        self.assertGreater(a.fecha_actualizacion, antes)
+        # una invalidación por lote, ninguna por fila borrada
+        self.assertEqual(bump.call_count, 1)
+        self.assertEqual(bump_senal.call_count, 0)
+        self.assertEqual(otro.call_count, 2)
+
+    def test_sin_tocar_propiedad_solo_dentro_del_bloque(self):
+        from .signals import sin_tocar_propiedad
+        antes = Propiedad.objects.get(pk=self.a.pk).fecha_actualizacion
+        with sin_tocar_propiedad():
+            self.a.imagenes.filter(imagen="propiedades/galeria/falta_1.jpg").delete()
+        self.assertEqual(Propiedad.objects.get(pk=self.a.pk).fecha_actualizacion, antes)
+        self.a.imagenes.filter(imagen="propiedades/galeria/ok.jpg").delete()
+        self.assertGreater(Propiedad.objects.get(pk=self.a.pk).fecha_actualizacion, antes)
+
+    def test_listado_vacio_o_con_error_aborta(self):
+        from django.core.management.base import CommandError
+        ruta = "propiedades.management.commands.reconciliar_media.walk_media_prefix"
+        with mock.patch(ruta, return_value=[]), self.assertRaises(CommandError):
+            self._correr(yes=True)
+        with mock.patch(ruta, side_effect=OSError("AccessDenied")), self.assertRaises(OSError):
+            self._correr(yes=True)
+        self.assertEqual(Propiedad.objects.get(pk=self.b.pk).imagen_principal.name,
+                         "propiedades/imagenes_principal/falta.jpg")
+        self.assertEqual(self.a.imagenes.count() + self.b.imagenes.count(), 3)
+
+
+class PropsReportTests(TestCase):
+    """
+    props_report sobre 3 propiedades con un storage simulado: existe, falta,
+    error del storage (sólo en pool) y sin imagen.
+    """
+
+    EXISTENTES = {"propiedades/imagenes_principal/ok.jpg", "propiedades/galeria/ok.jpg"}
+
+    @classmethod
+    def setUpTestData(cls):
+        from .models import PropiedadImagen
+        _seed_propiedades(3)
+        cls.a, cls.b, cls.c = Propiedad.objects.order_by("pk")
+        Propiedad.objects.filter(pk=cls.a.pk).update(imagen_principal="propiedades/imagenes_principal/ok.jpg")
+        Propiedad.objects.filter(pk=cls.b.pk).update(imagen_principal="propiedades/imagenes_principal/falta.jpg")
+        Propiedad.objects.filter(pk=cls.c.pk).update(imagen_principal="")
+        PropiedadImagen.objects.bulk_create([
+            PropiedadImagen(propiedad=cls.a, imagen="propiedades/galeria/ok.jpg"),
+            PropiedadImagen(propiedad=cls.b, imagen="propiedades/galeria/throttle.jpg"),
+        ])
+
+    def _exists(self, name):
+        if "throttle" in name:
+            raise OSError("SlowDown")
+        return name in self.EXISTENTES
+
+    def _correr(self, modo, walk=None):
+        import contextlib
+        import csv
+        import io
+        import tempfile
+        from django.core.management import call_command
+
+        ruta = "propiedades.management.commands.props_report"
+        salida = tempfile.NamedTemporaryFile(suffix=".csv", delete=False)
+        salida.close()
+        self.addCleanup(os.unlink, salida.name)
+        with mock.patch(f"{ruta}.default_storage") as storage, \
+                mock.patch(f"{ruta}.walk_media_prefix", side_effect=walk or (lambda d: [])), \
+                contextlib.redirect_stdout(io.StringIO()) as out:
+            storage.exists.side_effect = self._exists
+            storage.url.side_effect = lambda name: f"/media/{name}"
+            call_command("props_report", related=True, csv=salida.name, exists=modo, workers=2, limit=0)
+        with open(salida.name, newline="", encoding="utf-8") as fh:
+            filas = list(csv.DictReader(fh))
+        return {(f["prop_id"], f["file_name"]): (f["exists"], f["error"]) for f in filas}, out.getvalue(), storage
+
+    def test_pool_separa_errores_de_faltantes(self):
+        filas, out, _ = self._correr("pool")
+        a, b, c = (str(p.pk) for p in (self.a, self.b, self.c))
+        self.assertEqual(filas, {
+            (a, "propiedades/imagenes_principal/ok.jpg"): ("True", ""),
+            (a, "propiedades/galeria/ok.jpg"): ("True", ""),
+            (b, "propiedades/imagenes_principal/falta.jpg"): ("False", ""),
+            (b, "propiedades/galeria/throttle.jpg"): ("error", "OSError: SlowDown"),
+            (c, ""): ("False", ""),
+        })
+        self.assertIn("(faltantes: 1, sin verificar por error: 1)", out)
+
+    def test_list_usa_el_listado_y_no_hace_heads(self):
+        listado = {
+            "propiedades/imagenes_principal": ["propiedades/imagenes_principal/ok.jpg"],
+            "propiedades/galeria": ["propiedades/galeria/ok.jpg"],
+        }
+        filas, out, storage = self._correr("list", walk=lambda d: listado[d])
+        a, b = str(self.a.pk), str(self.b.pk)
+        self.assertEqual(filas[(a, "propiedades/galeria/ok.jpg")], ("True", ""))
+        self.assertEqual(filas[(b, "propiedades/galeria/throttle.jpg")], ("False", ""))
+        self.assertEqual(filas[(b, "propiedades/imagenes_principal/falta.jpg")], ("False", ""))
+        storage.exists.assert_not_called()
+        self.assertIn("(faltantes: 2, sin verificar por error: 0)", out)
+
+    def test_list_no_oculta_errores_del_listado(self):
+        with self.assertRaises(OSError):
+            self._correr("list", walk=mock.Mock(side_effect=OSError("AccessDenied")))
+
+
+class ResetAndSeedTests(TestCase):
+    """
+    Smoke test de reset_and_seed_props contra un FileSystemStorage temporal:
+    3 carpetas de origen con principal + 1 foto de galería cada una.
+    """
+
+    def setUp(self):
+        import tempfile
+        from pathlib import Path
+        from PIL import Image
+        from django.core.files.storage import default_storage
+
+        media, src = tempfile.TemporaryDirectory(), tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.addCleanup(src.cleanup)
+        ctx = override_settings(MEDIA_ROOT=media.name, STORAGES={
+            **STATIC_SIN_MANIFEST,
+            "default": {"BACKEND": "django.core.files.storage.FileSystemStorage", "OPTIONS": {"location": media.name}},
+        })
+        ctx.enable()
+        self.addCleanup(ctx.disable)
+        for g in range(3):
+            carpeta = Path(src.name, f"grupo{g}")
+            carpeta.mkdir()
+            for i in range(2):
+                Image.new("RGB", (64, 48), "blue").save(carpeta / f"{i}.jpg", "JPEG")
+        self.src, self.storage = src.name, default_storage
+        _seed_propiedades(2)  # las borra el comando
+
+    def _correr(self, **opts):
+        import contextlib
+        import io
+        from django.core.management import call_command
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command("reset_and_seed_props", src=self.src, yes=True, workers=3, **opts)
+
+    def _subidos(self, carpeta):
+        return sorted(n for n in self.storage.listdir(f"propiedades/{carpeta}")[1] if "__" not in n)
+
+    def test_copia_en_paralelo(self):
+        from .models import PropiedadImagen
+        self._correr()
+        props = list(Propiedad.objects.order_by("pk"))
+        self.assertEqual(len(props), 3)
+        self.assertEqual(PropiedadImagen.objects.count(), 3)
+        self.assertEqual(self._subidos("imagenes_principal"), sorted(f"{p.pk}_principal.jpg" for p in props))
+        self.assertEqual(self._subidos("galeria"), sorted(f"{p.pk}_01.jpg" for p in props))
+        for p in props:
+            self.assertEqual(p.imagen_principal.name, f"propiedades/imagenes_principal/{p.pk}_principal.jpg")
+            self.assertEqual([f.imagen.name for f in p.imagenes.all()], [f"propiedades/galeria/{p.pk}_01.jpg"])
+
+    def test_bulk_reparte_imagenes_y_usa_el_asignador(self):
+        from .models import PropiedadImagen
+        reservados, reservar = [], codigos.reservar_secuencia
+
+        def registrar(n):
+            out = reservar(n)
+            reservados.extend(out)
+            return out
+
+        with mock.patch.object(codigos, "reservar_secuencia", side_effect=registrar):
+            self._correr(bulk=True, count=7, batch_size=4)
+        self.assertEqual(Propiedad.objects.count(), 7)
+        self.assertEqual(PropiedadImagen.objects.count(), 7)
+        # cada grupo se sube una sola vez y se reparte entre las propiedades
+        self.assertEqual(self._subidos("imagenes_principal"), [f"seed_{g:04d}_principal.jpg" for g in (1, 2, 3)])
+        self.assertEqual(self._subidos("galeria"), [f"seed_{g:04d}_01.jpg" for g in (1, 2, 3)])
+
+        # los códigos son los de la permutación para la secuencia reservada,
+        # y el save() siguiente no choca con ninguno
+        bulk = set(Propiedad.objects.values_list("codigo_unico", flat=True))
+        self.assertEqual(bulk, {codigos.codigo_para(s) for s in reservados})
+        nueva = Propiedad.objects.create(titulo="n", descripcion="x", tipo="casa", tipo_operacion="venta",
+                                         direccion="x", localidad="Posadas", provincia="Misiones")
+        self.assertNotIn(nueva.codigo_unico, bulk)
+
+
+class VariantesImagenTests(SimpleTestCase):
+
+    def setUp(self):
+        import tempfile
+        from django.core.files.storage import default_storage
+
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        ctx = override_settings(MEDIA_ROOT=media.name, MEDIA_URL="/media/", STORAGES={
+            **STATIC_SIN_MANIFEST,
+            "default": {"BACKEND": "django.core.files.storage.FileSystemStorage", "OPTIONS": {"location": media.name}},
+        })
+        ctx.enable()
+        self.addCleanup(ctx.disable)
+        caches["propiedades"].clear()
+        self.storage = default_storage
+
+    def _subir(self, name, img, fmt):
+        from io import BytesIO
+        from django.core.files.base import ContentFile
+        buf = BytesIO()
+        img.save(buf, fmt)
+        return self.storage.save(name, ContentFile(buf.getvalue()))
+
+    def _abrir(self, name):
+        from PIL import Image
+        with self.storage.open(name, "rb") as fh:
+            img = Image.open(fh)
+            img.load()
+        return img
+
+    def test_nombres(self):
+        from .imagenes import base_de_variante, es_variante, variant_name
+        self.assertEqual(variant_name("propiedades/galeria/12_34.png", 480, "webp"), "propiedades/galeria/12_34__w480.webp")
+        self.assertTrue(es_variante("propiedades/galeria/12_34__w960.jpg"))
+        self.assertFalse(es_variante("propiedades/galeria/12_34.jpg"))
+        self.assertEqual(base_de_variante("propiedades/galeria/12_34__w160.webp"), "propiedades/galeria/12_34")
+        self.assertIsNone(base_de_variante("propiedades/galeria/12_34.jpg"))
+
+    def test_no_agranda_y_conserva_alfa_en_webp(self):
+        from PIL import Image
+        from .imagenes import generar_variantes, variant_name
+        name = self._subir("propiedades/galeria/logo.png", Image.new("RGBA", (300, 200), (255, 0, 0, 0)), "PNG")
+
+        escritos = generar_variantes(name)
+        self.assertEqual(len(escritos), 6)
+        self.assertEqual(generar_variantes(name), [])  # ya existen
+        self.assertEqual(self._abrir(variant_name(name, 160, "webp")).size, (160, 107))
+        for width in (480, 960):  # más chico que el ancho nominal: queda en 300
+            self.assertEqual(self._abrir(variant_name(name, width, "jpg")).size, (300, 200))
+        webp = self._abrir(variant_name(name, 480, "webp"))
+        self.assertEqual(webp.mode, "RGBA")
+        self.assertEqual(webp.getpixel((0, 0))[3], 0)
+        jpg = self._abrir(variant_name(name, 480, "jpg"))
+        self.assertEqual(jpg.mode, "RGB")
+        self.assertGreater(min(jpg.getpixel((0, 0))), 240)  # aplanada sobre blanco
+
+    def test_srcset_y_fallback_sin_variantes(self):
+        from PIL import Image
+        from .imagenes import generar_variantes, srcset
+        name = self._subir("propiedades/galeria/foto.jpg", Image.new("RGB", (1200, 800), "blue"), "JPEG")
+
+        with mock.patch.object(self.storage, "exists", wraps=self.storage.exists) as exists:
+            self.assertEqual(srcset(name, "webp"), "")
+            self.assertEqual(srcset(name, "jpg"), "")
+        self.assertEqual(exists.call_count, 1)  # la ausencia también se recuerda
+
+        generar_variantes(name)  # pisa la marca de "sin variantes"
+        self.assertEqual(srcset(name, "webp"), ", ".join(
+            f"/media/propiedades/galeria/foto__w{w}.webp {w}w" for w in (160, 480, 960)
+        ))
+        self.assertEqual(srcset(name, "gif"), "")
+        self.assertEqual(srcset("", "webp"), "")
+
+    def test_segundo_plano_genera_y_avisa(self):
+        from PIL import Image
+        from .imagenes import generar_variantes_en_segundo_plano, variantes_disponibles
+        name = self._subir("propiedades/galeria/foto.jpg", Image.new("RGB", (600, 400), "blue"), "JPEG")
+        despues = mock.Mock()
+        generar_variantes_en_segundo_plano(name, despues).join()
+        self.assertTrue(variantes_disponibles(name))
+        despues.assert_called_once_with()
+        # ya generadas: no vuelve a escribir ni a avisar
+        generar_variantes_en_segundo_plano(name, despues).join()
+        despues.assert_called_once_with()
+
+
+class VariantesAlGuardarTests(TestCase):
+    """
+    Los signals sólo programan variantes si cambió la imagen, y las generan
+    fuera del request: un save común no toca el storage.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        _seed_propiedades(1)
+        Propiedad.objects.update(imagen_principal="propiedades/imagenes_principal/1_principal.jpg")
+
+    def _guardar(self, obj, **kwargs):
+        with mock.patch("propiedades.signals.generar_variantes_en_segundo_plano") as generar, \
+                mock.patch("propiedades.imagenes.default_storage") as storage, \
+                mock.patch("propiedades.signals.refrescar_destacadas_en_segundo_plano"), \
+                self.captureOnCommitCallbacks(execute=True):
+            obj.save(**kwargs)
+        self.assertFalse(storage.method_calls)
+        return generar
+
+    def test_editar_otro_campo_no_toca_el_storage(self):
+        prop = Propiedad.objects.get()
+        prop.titulo = "Otro título"
+        self._guardar(prop).assert_not_called()
+        # cargada sin la imagen (cards() / only()): tampoco
+        prop = Propiedad.objects.only("titulo").get()
+        prop.titulo = "Diferido"
+        self._guardar(prop).assert_not_called()
+
+    def test_imagen_nueva_se_genera_de_fondo(self):
+        from .models import PropiedadImagen
+        prop = Propiedad.objects.get()
+        prop.imagen_principal.name = "propiedades/imagenes_principal/1_nueva.jpg"
+        generar = self._guardar(prop)
+        generar.assert_called_once()
+        self.assertEqual(generar.call_args.args[0], "propiedades/imagenes_principal/1_nueva.jpg")
+        # otro save sin cambios ya no la programa
+        self._guardar(prop).assert_not_called()
+        # update_fields sin la imagen: tampoco
+        prop.imagen_principal.name = "propiedades/imagenes_principal/1_otra.jpg"
+        self._guardar(prop, update_fields=["titulo"]).assert_not_called()
+
+        foto = PropiedadImagen(propiedad=prop, imagen="propiedades/galeria/1_01.jpg")
+        self._guardar(foto).assert_called_once_with("propiedades/galeria/1_01.jpg", None)
+        foto.orden = 3
+        self._guardar(foto).assert_not_called()
+
+
+class PaginacionKeysetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        from datetime import datetime, timezone as dt_timezone
+        _seed_propiedades(60)
+        # empates: 4 fechas para todas las filas, el id desempata
+        fechas = [datetime(2025, 1, d, 12, tzinfo=dt_timezone.utc) for d in (1, 2, 3, 4)]
+        for i, pk in enumerate(Propiedad.objects.order_by("pk").values_list("pk", flat=True)):
+            Propiedad.objects.filter(pk=pk).update(fecha_actualizacion=fechas[i % 4])
+        cls.qs = Propiedad.objects.filter(estado_publicacion="publicada")
+        cls.orden = list(cls.qs.order_by("-fecha_actualizacion", "-id").values_list("pk", flat=True))
+
+    def _paginas(self, token, direccion, per_page=4):
+        from .pagination import keyset_page
+        paginas = []
+        while True:
+            page = keyset_page(self.qs, token, per_page)
+            paginas.append([p.pk for p in page])
+            token = page.next_cursor if direccion == "n" else page.previous_cursor
+            if token is None:
+                return paginas, page
+
+    def test_adelante_y_atras_con_empates(self):
+        adelante, ultima = self._paginas(None, "n")
+        self.assertEqual([pk for pagina in adelante for pk in pagina], self.orden)
+        self.assertTrue(all(len(p) == 4 for p in adelante[:-1]))
+
+        atras, primera = self._paginas(ultima.previous_cursor, "p")
+        self.assertEqual(list(reversed(atras)), adelante[:-1])
+        self.assertIsNone(primera.previous_cursor)
+
+    def test_lista_de_ids_igual_que_la_db(self):
+        from .pagination import keyset_page, keyset_page_ids
+
+        def cargar(pks):
+            filas = Propiedad.objects.in_bulk(pks)
+            return [filas[pk] for pk in pks]
+
+        for direccion, token in (("n", None), ("p", self._paginas(None, "n")[1].previous_cursor)):
+            while True:
+                db = keyset_page(self.qs, token, 4)
+                lista = keyset_page_ids(self.orden, token, 4, cargar)
+                with self.subTest(direccion=direccion, token=token):
+                    self.assertEqual([p.pk for p in lista], [p.pk for p in db])
+                    self.assertEqual(lista.previous_cursor, db.previous_cursor)
+                    self.assertEqual(lista.next_cursor, db.next_cursor)
+                token = db.next_cursor if direccion == "n" else db.previous_cursor
+                if token is None:
+                    break
+
+    def test_cursor_invalido_es_la_primera_pagina(self):
+        import base64
+        from .pagination import decode_cursor, encode_cursor, keyset_page
+
+        primera = [p.pk for p in keyset_page(self.qs, None, 4)]
+        b64 = lambda raw: base64.urlsafe_b64encode(raw.encode()).decode()
+        for token in ("xxx", "!!!", b64("no es json"), b64('["2025-01-01T00:00:00", 5, "z"]'),
+                      b64('["ayer", 5, "n"]'), b64('["2025-01-01T00:00:00", "abc", "n"]'), b64("[1, 2]")):
+            with self.subTest(token=token):
+                self.assertIsNone(decode_cursor(token))
+                self.assertEqual([p.pk for p in keyset_page(self.qs, token, 4)], primera)
+
+        p = self.qs.first()
+        self.assertEqual(decode_cursor(encode_cursor(p, "n")), (p.fecha_actualizacion, p.pk, "n"))
+
+    @skipUnless(connection.vendor != "postgresql", "fuera de Postgres el conteo es exacto")
+    def test_conteo_estimado_fuera_de_postgres(self):
+        from .pagination import estimated_count, keyset_page
+        self.assertEqual(estimated_count(self.qs), len(self.orden))
+        with override_settings(PROPIEDADES_CONTEO_ESTIMADO=True):
+            self.assertEqual(keyset_page(self.qs, None, 4).estimated_count, len(self.orden))
+        self.assertIsNone(keyset_page(self.qs, None, 4).estimated_count)
@@ -1,13 +1,28 @@
+from django.conf import settings
 from django.urls import path
-from . import views 
-from propiedades.views import contacto_view
+from . import api, views
+
+# Bajo ASGI (uvicorn) las vistas de detalle y contacto tienen versión async (ver README)
+if getattr(settings, 'PROPIEDADES_VISTAS_ASYNC', False):
+    detalle, contacto, api_detalle = views.detalle_propiedad_async, views.contacto_view_async, api.detalle_async
+else:
+    detalle, contacto, api_detalle = views.detalle_propiedad, views.contacto_view, api.detalle
 
 app_name = 'propiedades'
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('lista/', views.propiedad_list_view, name='lista'),
-    path('<int:pk>/', views.detalle_propiedad, name='detalle'),
+    path('<int:pk>/', detalle, name='detalle'),
     path('busqueda/', views.busqueda_propiedades, name='busqueda'),
-    path("contacto/", contacto_view, name="contacto"),
+    path("contacto/", contacto, name="contacto"),
+
+    # Sitemap para crawlers (índice + shards de 50k URLs)
+    path('sitemap.xml', views.sitemap_indice, name='sitemap'),
+    path('sitemap-<int:k>.xml', views.sitemap_shard, name='sitemap_shard'),
+
+    # API JSON de sólo lectura
+    path('api/', api.lista, name='api_lista'),
+    path('api/busqueda/', api.busqueda, name='api_busqueda'),
+    path('api/<int:pk>/', api_detalle, name='api_detalle'),
 ]
@@ -1,17 +1,32 @@
 # views.py
-from django.shortcuts import render, get_object_or_404, redirect
+import hashlib
+import time
+from calendar import timegm
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, render, get_object_or_404, redirect
+from django.urls import reverse
 from urllib.parse import urlencode
 
 from .models import Propiedad
 from .forms import PropiedadForm
 
+from django.conf import settings
+from django.core.files.storage import default_storage
 from django.core.paginator import Paginator
-from django.db.models import Q, F, Func
-from django.db.models.functions import Lower, Greatest
-from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import Max, Count
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.utils.safestring import mark_safe
+from django.views.decorators.http import condition
 
-# Importá sinónimos y la normalización canónica desde el config
-from .search_config import SYNONYMS, norm as _norm
+from .busqueda import BusquedaSpec, _fmt_int, facetas_busqueda, resultado_cacheado
+from . import sitemap
+from .cache import destacadas_html
+from .pagination import KEYSET_ORDER, keyset_activo, keyset_page, keyset_page_ids
 
 
 # =========================
@@ -19,27 +34,128 @@ from .search_config import SYNONYMS, norm as _norm
 # =========================
 def home(request):
     """
-    Home: muestra hasta 6 propiedades destacadas y publicadas.
+    Home: hasta 6 propiedades destacadas y publicadas. El bloque ya viene
+    renderizado del cache (stale-while-revalidate, ver cache.destacadas_html).
     """
-    propiedades_destacadas = (
-        Propiedad.objects
-        .filter(is_destacada=True, estado_publicacion='publicada')
-        .order_by('-fecha_actualizacion')[:6]
-    )
     return render(request, 'propiedades/home.html', {
-        'propiedades_destacadas': propiedades_destacadas
+        'destacadas_html': mark_safe(destacadas_html()),
     })
 
 
+# =========================
+# GET condicional (ETag / Last-Modified)
+# =========================
+def _epoca_urls():
+    """
+    Con URLs pre-firmadas (S3) el HTML embebe URLs que vencen: el validador
+    cambia en cada ventana de url_min_validity() segundos para que un 304
+    nunca deje al cliente con URLs vencidas. Devuelve (número, inicio) o None.
+    """
+    validez = getattr(default_storage, "url_min_validity", None)
+    vida = validez() if validez else None
+    if not vida:
+        return None
+    numero = int(time.time() // vida)
+    return numero, datetime.fromtimestamp(numero * vida, tz=dt_timezone.utc)
+
+
+def _validadores(clave, ultima):
+    """(etag, last_modified) para `ultima` (+ clave de página y época de URLs)."""
+    epoca = _epoca_urls()
+    if epoca is not None and ultima is not None:
+        ultima = max(ultima, epoca[1])
+    base = f"{clave}|{ultima.timestamp() if ultima else ''}|{epoca[0] if epoca else ''}"
+    return hashlib.sha1(base.encode()).hexdigest(), ultima
+
+
+def _estado_lista(request):
+    """
+    Max(fecha_actualizacion) + count de publicadas: una sola consulta,
+    memoizada en el request. Sólo da ETag: borrar o despublicar una fila que
+    no es la más reciente baja el count sin mover el Max, así que un
+    Last-Modified con el Max respondería 304 con la lista vieja.
+    """
+    if not hasattr(request, '_propiedades_validadores'):
+        est = (
+            Propiedad.objects.filter(estado_publicacion='publicada')
+            .aggregate(ultima=Max('fecha_actualizacion'), n=Count('id'))
+        )
+        clave = f"lista|{est['n']}|{request.GET.urlencode()}"
+        request._propiedades_validadores = _validadores(clave, est['ultima'])
+    return request._propiedades_validadores
+
+
+def _estado_detalle(request, pk):
+    """
+    Validadores desde fecha_actualizacion de la fila ((None, None) si no existe
+    → la vista da 404). La fila completa se trae acá y queda en el request:
+    un 304 cuesta 1 consulta y la vista no vuelve a buscarla.
+    """
+    if not hasattr(request, '_propiedades_validadores'):
+        propiedad = Propiedad.objects.filter(pk=pk).first()
+        request._propiedad_detalle = propiedad
+        request._propiedades_validadores = (
+            _validadores(f"detalle|{pk}", propiedad.fecha_actualizacion) if propiedad else (None, None)
+        )
+    return request._propiedades_validadores
+
+
+def _cache_publico(view):
+    """
+    Cache-Control: public, max-age=PROPIEDADES_HTTP_MAX_AGE en 200/304, para que
+    un CDN o reverse proxy absorba los hits repetidos (revalidando con ETag).
+    """
+    def _patch(response):
+        if response.status_code in (200, 304):
+            patch_cache_control(response, public=True, max_age=getattr(settings, "PROPIEDADES_HTTP_MAX_AGE", 60))
+        return response
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def _wrapped_async(request, *args, **kwargs):
+            return _patch(await view(request, *args, **kwargs))
+        return _wrapped_async
+
+    @wraps(view)
+    def _wrapped(request, *args, **kwargs):
+        return _patch(view(request, *args, **kwargs))
+    return _wrapped
+
+
+def _condicional(request, etag, ultima):
+    """
+    Lo que hace @condition, para las vistas async: el decorador llama a
+    etag_func de forma sync (dentro del event loop, sin poder consultar la DB).
+    Devuelve (304/412 o None, función que agrega ETag/Last-Modified al 200).
+    """
+    res_etag = quote_etag(etag)
+    res_last_modified = int(timegm(ultima.utctimetuple())) if ultima else None
+    respuesta = get_conditional_response(request, etag=res_etag, last_modified=res_last_modified)
+
+    def _validar(response):
+        if request.method in ('GET', 'HEAD'):
+            if res_last_modified and not response.has_header('Last-Modified'):
+                response.headers['Last-Modified'] = http_date(res_last_modified)
+            response.headers.setdefault('ETag', res_etag)
+        return response
+    return respuesta, _validar
+
+
+@_cache_publico
+@condition(etag_func=lambda request: _estado_lista(request)[0])
 def propiedad_list_view(request):
     qs = (
-        Propiedad.objects
+        Propiedad.objects.cards()
         .filter(estado_publicacion='publicada')
         .order_by('-fecha_actualizacion')
     )
-    paginator = Paginator(qs, 18)  # 18 por página
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    if keyset_activo():
+        # Keyset: ?cursor=<token>, sin COUNT ni OFFSET
+        page_obj = keyset_page(qs, request.GET.get('cursor'), 18)
+    else:
+        paginator = Paginator(qs, 18)  # 18 por página
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
 
     return render(request, 'propiedades/lista.html', {
         'propiedades': page_obj,          # iterable en el for
@@ -48,101 +164,145 @@ def propiedad_list_view(request):
     })
 
 
+@_cache_publico
+@condition(
+    etag_func=lambda request, pk: _estado_detalle(request, pk)[0],
+    last_modified_func=lambda request, pk: _estado_detalle(request, pk)[1],
+)
 def detalle_propiedad(request, pk):
     """
     Detalle de una propiedad por PK.
+    La fila ya la trajo el chequeo condicional (_estado_detalle); la galería
+    es una consulta más (orden, id del Meta). Cada URL se calcula una vez.
     """
-    propiedad = get_object_or_404(Propiedad, pk=pk)
-    return render(request, 'propiedades/detalle.html', {'propiedad': propiedad})
+    _estado_detalle(request, pk)
+    propiedad = request._propiedad_detalle
+    if propiedad is None:
+        raise Http404("No existe la propiedad.")
+    return _render_detalle(request, propiedad, propiedad.imagenes.all())
 
 
-# =========================
-# Helpers para la búsqueda
-# =========================
-def _qs_pop(qd, key):
+def _render_detalle(request, propiedad, fotos):
     """
-    Devuelve una copia de QueryDict sin la clave dada.
-    Se usa para construir la URL de 'remover filtro' en los chips.
+    Render del detalle. Sin consultas a la DB (fotos ya viene o se evalúa acá),
+    pero con I/O de storage: firma de URLs y exists() de las variantes (srcset).
     """
-    c = qd.copy()
-    if key in c:
-        c.pop(key)
-    return c
+    principal_url = propiedad.imagen_principal.url if propiedad.imagen_principal else None
+    galeria = [(foto, foto.imagen.url) for foto in fotos]
+    return render(request, 'propiedades/detalle.html', {
+        'propiedad': propiedad,
+        'principal_url': principal_url,
+        'galeria': galeria,
+    })
 
 
-def _fmt_int(n):
+@_cache_publico
+async def detalle_propiedad_async(request, pk):
     """
-    Formatea enteros con separador de miles estilo '10.000'.
-    Si no puede castear, devuelve str(n).
+    detalle_propiedad para ASGI (PROPIEDADES_VISTAS_ASYNC): mismas respuestas
+    y validadores. Las dos consultas van por el ORM async; la firma de URLs,
+    los exists() de S3 y el render corren en un thread, fuera del event loop.
     """
-    try:
-        return f"{int(float(n)):,}".replace(",", ".")
-    except Exception:
-        return str(n)
+    propiedad = await Propiedad.objects.filter(pk=pk).afirst()
+    if propiedad is None:
+        raise Http404("No existe la propiedad.")
+    etag, ultima = _validadores(f"detalle|{pk}", propiedad.fecha_actualizacion)
+    no_modificado, validar = _condicional(request, etag, ultima)
+    if no_modificado is not None:
+        return no_modificado
 
+    fotos = [foto async for foto in propiedad.imagenes.all()]
+    response = await sync_to_async(_render_detalle, thread_sensitive=False)(request, propiedad, fotos)
+    return validar(response)
 
-# Función DB para usar unaccent() en consultas
-class Unaccent(Func):
-    function = 'unaccent'
-    template = '%(function)s(%(expressions)s)'
 
+# =========================
+# Sitemap (shards por rango de id, ver sitemap.py)
+# =========================
+def _ultima_shard(request, k):
+    """Max(fecha_actualizacion) del shard, memoizada (Last-Modified + 404)."""
+    if not hasattr(request, '_propiedades_sitemap_ultima'):
+        request._propiedades_sitemap_ultima = sitemap.ultima_del_shard(k)
+    return request._propiedades_sitemap_ultima
 
-def _normalize_q(s: str) -> str:
-    """
-    Normaliza usando la misma función del config:
-    - minúsculas
-    - sin tildes
-    - espacios colapsados
-    """
-    return _norm(s or "")
 
+@_cache_publico
+def sitemap_indice(request):
+    def url_de(k):
+        return request.build_absolute_uri(reverse('propiedades:sitemap_shard', args=[k]))
+
+    return StreamingHttpResponse(
+        sitemap.indice(sitemap.shards(), url_de), content_type='application/xml; charset=utf-8',
+    )
 
-def _expand_tokens(q: str):
-    """
-    Expande tokens con sinónimos pre-normalizados.
-    """
-    # normaliza cada token con la MISMA función del config
-    base = [_norm(t) for t in q.split()]
-    out = set(base)
-    for t in base:
-        syn = SYNONYMS.get(t)
-        if syn:
-            out.add(syn)
-    return list(out)
 
+@_cache_publico
+@condition(last_modified_func=lambda request, k: _ultima_shard(request, k))
+def sitemap_shard(request, k):
+    if _ultima_shard(request, k) is None:
+        raise Http404("Shard vacío.")
+    return StreamingHttpResponse(
+        sitemap.urlset(k, request.build_absolute_uri('/')),
+        content_type='application/xml; charset=utf-8',
+    )
 
-def _num(x):
+
+# =========================
+# Helpers para la búsqueda
+# =========================
+def _qs_pop(qd, key):
     """
-    Convierte strings de precios/filtros a número:
-    soporta '$', 'ars', 'usd', puntos, comas y sufijos 'k'/'m'.
+    Devuelve una copia de QueryDict sin la clave dada.
+    Se usa para construir la URL de 'remover filtro' en los chips.
     """
-    if not x:
-        return None
-    x = str(x).strip().lower().replace('.', '').replace(',', '')
-    x = x.replace('$', '').replace('ars', '').replace('usd', '')
-    if x.endswith('k'):
-        x = x[:-1]
-        try:
-            return int(float(x) * 1000)
-        except:
-            return None
-    if x.endswith('m'):
-        x = x[:-1]
-        try:
-            return int(float(x) * 1_000_000)
-        except:
-            return None
-    try:
-        return int(float(x))
-    except:
-        return None
+    c = qd.copy()
+    if key in c:
+        c.pop(key)
+    return c
 
 
-def _to_int(v):
-    try:
-        return int(v)
-    except Exception:
-        return None
+def _contexto_facetas(facetas, GET, path):
+    """
+    Facetas listas para el template: opciones de los selects con su conteo y
+    links que aplican localidad / dormitorios / rango de precio.
+    """
+    def _url(**cambios):
+        params = GET.copy()
+        for k in ('page', 'cursor'):
+            params.pop(k, None)
+        for k, v in cambios.items():
+            params.pop(k, None)
+            if v is not None:
+                params[k] = v
+        return f"{path}?{urlencode(params, doseq=True)}"
+
+    simbolo = 'USD' if facetas['currency'] == 'usd' else '$'
+
+    def _rango(lo, hi):
+        if lo is None:
+            return f"hasta {simbolo} {_fmt_int(hi)}"
+        if hi is None:
+            return f"más de {simbolo} {_fmt_int(lo)}"
+        return f"{simbolo} {_fmt_int(lo)}–{_fmt_int(hi)}"
+
+    return {
+        'total': facetas['total'],
+        'tipo': [(k, label, facetas['tipo'].get(k, 0)) for k, label in Propiedad.TIPO_PROPIEDAD_CHOICES],
+        'tipo_operacion': [
+            (k, label, facetas['tipo_operacion'].get(k, 0)) for k, label in Propiedad.TIPO_OPERACION_CHOICES
+        ],
+        'localidad': [(nombre, n, _url(localidad=nombre)) for nombre, n in facetas['localidad']],
+        'dormitorios': [(f"{d}+", n, _url(dormitorios=str(d))) for d, n in facetas['dormitorios']],
+        'precio': [
+            (_rango(lo, hi), n, _url(
+                currency=facetas['currency'],
+                price_min=None if lo is None else str(lo),
+                price_max=None if hi is None else str(hi),
+                usd_min=None, usd_max=None, ars_min=None, ars_max=None,
+            ))
+            for lo, hi, n in facetas['precio']
+        ],
+    }
 
 
 # =========================
@@ -153,12 +313,16 @@ def busqueda_propiedades(request):
     Búsqueda avanzada combinable con paginación.
     - No muestra resultados por defecto (hasta que haya algún filtro).
     - 12 resultados por página.
-    - Sin tildes (unaccent), sinónimos y fallback fuzzy (trigram).
+    - Sin tildes (unaccent), sinónimos y coincidencias fuzzy (trigram, sólo Postgres).
+    - En Postgres el texto libre usa el índice full-text y ordena por relevancia.
+    - Facetas (conteos por tipo, operación, localidad, dormitorios y precio)
+      del filtro actual, en una consulta y cacheadas con los resultados.
+    El parseo y el armado del queryset están en busqueda.BusquedaSpec.
     """
     base_qs = (
-        Propiedad.objects
+        Propiedad.objects.cards()
         .filter(estado_publicacion='publicada')
-        .order_by('-fecha_actualizacion')
+        .order_by(*KEYSET_ORDER)
     )
 
     GET = request.GET.copy()
@@ -177,130 +341,16 @@ def busqueda_propiedades(request):
         remove_url = f"{request.path}?{urlencode(params, doseq=True)}" if params else request.path
         chips.append({'key': 'price_range', 'label': label, 'remove_url': remove_url})
 
-    qs = base_qs
-    applied_any = False
-
-    # -------- Texto libre (q) --------
-    q = (GET.get('q') or '').strip()
-    if q:
-        tokens = _expand_tokens(q)
-        qs = qs.annotate(
-            ntitulo=Lower(Unaccent(F('titulo'))),
-            ndesc=Lower(Unaccent(F('descripcion'))),
-            nloc=Lower(Unaccent(F('localidad'))),
-            nprov=Lower(Unaccent(F('provincia'))),
-            namen=Lower(Unaccent(F('amenidades'))),
-            ncodigo=Lower(Unaccent(F('codigo_unico'))),
-        )
-        # AND de ORs: todos los tokens deben aparecer en algún campo
-        for t in tokens:
-            qs = qs.filter(
-                Q(ntitulo__icontains=t) |
-                Q(ndesc__icontains=t)   |
-                Q(nloc__icontains=t)    |
-                Q(nprov__icontains=t)   |
-                Q(namen__icontains=t)   |
-                Q(ncodigo__icontains=t)
-            )
-        add_chip('q', f'“{q}”')
-        applied_any = True
-
-    # -------- Selects --------
-    tipo = GET.get('tipo')
-    if tipo:
-        qs = qs.filter(tipo=tipo)
-        add_chip('tipo', f"Tipo: {dict(Propiedad.TIPO_PROPIEDAD_CHOICES).get(tipo, tipo)}")
-        applied_any = True
-
-    tipo_operacion = GET.get('tipo_operacion')
-    if tipo_operacion:
-        qs = qs.filter(tipo_operacion=tipo_operacion)
-        add_chip('tipo_operacion', f"Operación: {dict(Propiedad.TIPO_OPERACION_CHOICES).get(tipo_operacion, tipo_operacion)}")
-        applied_any = True
-
-    localidad = _normalize_q(GET.get('localidad') or '')
-    if localidad:
-        qs = qs.annotate(nloc=Lower(Unaccent(F('localidad')))).filter(nloc__icontains=localidad)
-        add_chip('localidad', f"Localidad: {GET.get('localidad')}")
-        applied_any = True
-
-    provincia = _normalize_q(GET.get('provincia') or '')
-    if provincia:
-        qs = qs.annotate(nprov=Lower(Unaccent(F('provincia')))).filter(nprov__icontains=provincia)
-        add_chip('provincia', f"Provincia: {GET.get('provincia')}")
-        applied_any = True
-
-    # -------- Numéricos (>=) --------
-    dormitorios = _to_int(GET.get('dormitorios'))
-    if dormitorios is not None:
-        qs = qs.filter(dormitorios__gte=dormitorios)
-        add_chip('dormitorios', f"Dormitorios: {dormitorios}")
-        applied_any = True
-
-    banios = _to_int(GET.get('banios'))
-    if banios is not None:
-        qs = qs.filter(banios__gte=banios)
-        add_chip('banios', f"Baños: {banios}")
-        applied_any = True
-
-    cocheras = _to_int(GET.get('cocheras'))
-    if cocheras is not None:
-        qs = qs.filter(cocheras__gte=cocheras)
-        add_chip('cocheras', f"Cocheras: {cocheras}")
-        applied_any = True
-
-    # -------- Precio (solo si lo pidieron) --------
-    currency = GET.get('currency') or 'ars'
-    price_min = _num(GET.get('price_min'))
-    price_max = _num(GET.get('price_max'))
-    usd_min = _num(GET.get('usd_min')); usd_max = _num(GET.get('usd_max'))
-    ars_min = _num(GET.get('ars_min')); ars_max = _num(GET.get('ars_max'))
-
-    has_price_filters = any(v is not None for v in [price_min, price_max, usd_min, usd_max, ars_min, ars_max])
-
-    if has_price_filters:
-        if price_min is not None or price_max is not None:
-            if currency == 'usd':
-                if price_min is not None:
-                    qs = qs.filter(precio_usd__gte=price_min)
-                if price_max is not None:
-                    qs = qs.filter(precio_usd__lte=price_max)
-                add_price_chip(f"USD {price_min or 0}–{price_max or '∞'}")
-            else:
-                if price_min is not None:
-                    qs = qs.filter(precio_pesos__gte=price_min)
-                if price_max is not None:
-                    qs = qs.filter(precio_pesos__lte=price_max)
-                add_price_chip(f"$ {price_min or 0}–{price_max or '∞'}")
+    spec = BusquedaSpec.desde_query(GET)
+    qs = spec.compilar(base_qs)
+    for key, label in spec.chips():
+        if key == 'price_range':
+            add_price_chip(label)
         else:
-            if usd_min is not None:
-                qs = qs.filter(precio_usd__gte=usd_min); add_chip('usd_min', f"USD mín: {_fmt_int(usd_min)}")
-            if usd_max is not None:
-                qs = qs.filter(precio_usd__lte=usd_max); add_chip('usd_max', f"USD máx: {_fmt_int(usd_max)}")
-            if ars_min is not None:
-                qs = qs.filter(precio_pesos__gte=ars_min); add_chip('ars_min', f"$ mín: {_fmt_int(ars_min)}")
-            if ars_max is not None:
-                qs = qs.filter(precio_pesos__lte=ars_max); add_chip('ars_max', f"$ máx: {_fmt_int(ars_max)}")
-        applied_any = True
-    # Si NO hay filtros de precio, no restringimos por moneda ni por campos no nulos.
-
-    # -------- Fuzzy fallback si hubo texto y no hay resultados --------
-    if q and not qs.exists():
-        qn = _norm(q)  # usa la normalización canónica
-        qs = base_qs.annotate(
-            sim_t=TrigramSimilarity(Unaccent(F('titulo')), qn),
-            sim_l=TrigramSimilarity(Unaccent(F('localidad')), qn),
-            sim_p=TrigramSimilarity(Unaccent(F('provincia')), qn),
-        ).annotate(
-            sim=Greatest('sim_t', 'sim_l', 'sim_p')
-        ).filter(
-            sim__gte=0.20  # si querés más permisivo, bajá a 0.10
-        ).order_by('-sim', '-fecha_actualizacion')
-        add_chip('fuzzy', "Coincidencias aproximadas")
-        applied_any = True
+            add_chip(key, label)
 
-    # -------- Sin filtros => no mostrar resultados --------
-    if not applied_any:
+    # -------- Sin filtros => no mostrar resultados (ni facetas) --------
+    if not spec.tiene_filtros():
         contexto = {
             'show_results': False,
             'propiedades': None,
@@ -310,18 +360,53 @@ def busqueda_propiedades(request):
             'chips': [],
             'val': GET,
             'propiedad': Propiedad,
+            'facetas': None,
         }
         return render(request, 'propiedades/busqueda.html', contexto)
 
+    facetas = _contexto_facetas(facetas_busqueda(spec, base_qs), GET, request.path)
+
     # -------- Paginación --------
-    paginator = Paginator(qs, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    resultado = resultado_cacheado(spec, qs)
+    if resultado is not None:
+        # Ids ordenados en cache: la página es un slice de la lista (sin filtro
+        # ni COUNT) y una sola consulta por pk para las 12 filas. Sin texto
+        # libre la lista está en el orden del keyset y se usa el mismo cursor
+        # que sobre la DB; con texto (relevancia) va por número de página.
+        ids, aproximadas = resultado
+
+        def cargar(pks):
+            filas = Propiedad.objects.cards().in_bulk(list(pks))
+            return [filas[pk] for pk in pks if pk in filas]
+
+        if keyset_activo() and not spec.palabras:
+            page_obj = keyset_page_ids(ids, request.GET.get('cursor'), 12, cargar)
+            if page_obj is None:
+                # El id del cursor ya no está en la lista: seguir sobre la DB
+                page_obj = keyset_page(qs, request.GET.get('cursor'), 12)
+        else:
+            page_obj = Paginator(ids, 12).get_page(request.GET.get('page'))
+            page_obj.object_list = cargar(page_obj.object_list)
+    else:
+        # Keyset cuando el orden es por fecha; con texto libre el orden es por
+        # relevancia (rank/similitud) y se sigue paginando por número de página.
+        if keyset_activo() and not spec.palabras:
+            page_obj = keyset_page(qs, request.GET.get('cursor'), 12)
+        else:
+            paginator = Paginator(qs, 12)
+            page_number = request.GET.get('page')
+            page_obj = paginator.get_page(page_number)
+        # Fuzzy: viene en la misma consulta; si la página trae aproximadas, avisamos
+        aproximadas = spec.usa_fulltext() and any(not getattr(p, 'exacto', 1) for p in page_obj)
     is_paginated = page_obj.has_other_pages()
 
+    if aproximadas:
+        add_chip('fuzzy', "Coincidencias aproximadas")
+
     base_params = GET.copy()
-    if 'page' in base_params:
-        base_params.pop('page')
+    for k in ('page', 'cursor'):
+        if k in base_params:
+            base_params.pop(k)
     base_query = urlencode(base_params, doseq=True)
 
     contexto = {
@@ -333,10 +418,12 @@ def busqueda_propiedades(request):
         'chips': chips,
         'val': GET,
         'propiedad': Propiedad,
+        'facetas': facetas,
     }
     return render(request, 'propiedades/busqueda.html', contexto)
 
 
+
 # --- CONTACTO (EmailJS) ---
 from django.shortcuts import render, get_object_or_404
 from .models import Propiedad
@@ -348,35 +435,50 @@ def _precio_str(p: Propiedad) -> str:
         return f"$ {int(p.precio_pesos):,}".replace(",", ".")
     return "A consultar"
 
+def _prefill_contacto(prop):
+    """Asunto + mensaje precargados con los datos de la propiedad."""
+    precio = _precio_str(prop)
+    desc = (prop.descripcion or "").strip()
+    # recorte amable (no JSON, texto para humanos)
+    desc_corta = (desc[:400] + "…") if len(desc) > 420 else desc
+
+    return {
+        "asunto": f"Consulta por {prop.titulo}",
+        "mensaje": (
+            f"Hola, me interesa más información sobre la propiedad "
+            f"{prop.codigo_unico} — {prop.titulo}.\n\n"
+            f"• Precio: {precio}\n"
+            f"• Ubicación: {prop.direccion}, {prop.localidad}, {prop.provincia}\n\n"
+            f"Descripción breve: {desc_corta}\n\n"
+            f"Quedo atento/a a más detalles. ¡Gracias!"
+        ),
+        "propiedad_id": prop.pk,
+        "propiedad_titulo": prop.titulo,
+        "propiedad_codigo": prop.codigo_unico,
+        "propiedad_precio": precio,
+    }
+
+
 def contacto_view(request):
     """
     Si llega ?propiedad_id, precarga asunto + mensaje con datos reales desde la DB.
     """
-    prop = None
     prefill = {}
     prop_id = request.GET.get("propiedad_id")
     if prop_id:
         # Sólo propiedades publicadas (ajustá si querés permitir otras)
         prop = get_object_or_404(Propiedad, pk=prop_id, estado_publicacion="publicada")
-        precio = _precio_str(prop)
-        desc = (prop.descripcion or "").strip()
-        # recorte amable (no JSON, texto para humanos)
-        desc_corta = (desc[:400] + "…") if len(desc) > 420 else desc
-
-        prefill = {
-            "asunto": f"Consulta por {prop.titulo}",
-            "mensaje": (
-                f"Hola, me interesa más información sobre la propiedad "
-                f"{prop.codigo_unico} — {prop.titulo}.\n\n"
-                f"• Precio: {precio}\n"
-                f"• Ubicación: {prop.direccion}, {prop.localidad}, {prop.provincia}\n\n"
-                f"Descripción breve: {desc_corta}\n\n"
-                f"Quedo atento/a a más detalles. ¡Gracias!"
-            ),
-            "propiedad_id": prop.pk,
-            "propiedad_titulo": prop.titulo,
-            "propiedad_codigo": prop.codigo_unico,
-            "propiedad_precio": precio,
-        }
+        prefill = _prefill_contacto(prop)
+
+    return render(request, "propiedades/contacto.html", {"prefill": prefill})
+
+
+async def contacto_view_async(request):
+    """contacto_view para ASGI: la consulta por el ORM async, el render (sin I/O) en el loop."""
+    prefill = {}
+    prop_id = request.GET.get("propiedad_id")
+    if prop_id:
+        prop = await aget_object_or_404(Propiedad, pk=prop_id, estado_publicacion="publicada")
+        prefill = _prefill_contacto(prop)
 
     return render(request, "propiedades/contacto.html", {"prefill": prefill})